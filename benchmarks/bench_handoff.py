@@ -0,0 +1,122 @@
+"""Load-test the handoff queue with concurrent users and agents.
+
+Producer threads submit handoff requests (a mix of accounts, leads and
+visitors, with some users escalating twice) while agent threads claim them in
+small batches, against the in-memory and the SQLite backends. Reports the
+submit and claim throughput, submit latency percentiles, and how many
+requests were merged or rejected once the queue filled up::
+
+    python benchmarks/bench_handoff.py --producers 16 --agents 4 --requests 20000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+
+from react_agent.handoff import (
+    HandoffNotifier,
+    HandoffQueue,
+    HandoffQueueFull,
+    HandoffRequest,
+    MemoryHandoffStore,
+    SQLiteHandoffStore,
+)
+from react_agent.tools.user_info import ACCOUNT, LEAD, VISITOR
+
+USER_TYPES = (ACCOUNT, LEAD, VISITOR, VISITOR)
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """Return the p50, p95 and p99 of ``values`` in milliseconds."""
+    ordered = sorted(values) or [0.0]
+    return {
+        f"p{p}_ms": round(1000 * ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+        for p in (50, 95, 99)
+    }
+
+
+def run(store, args) -> dict:
+    """Queue and claim ``args.requests`` handoffs against ``store``; report throughput and latency."""
+    notified = []
+    notifier = HandoffNotifier(lambda batch: notified.append(len(batch)), max_delay=0.05)
+    queue = HandoffQueue(store, capacity=args.capacity, notifier=notifier, poll_interval=0.005)
+    per_producer = args.requests // args.producers
+    latencies: list[list[float]] = [[] for _ in range(args.producers)]
+    outcomes = {"queued": 0, "merged": 0, "rejected": 0}
+    claimed = [0] * args.agents
+    lock = threading.Lock()
+    producing = threading.Event()
+    producing.set()
+
+    def produce(i: int) -> None:
+        rng = random.Random(i)
+        for n in range(per_producer):
+            # Roughly one user in ten escalates again while still waiting.
+            user = f"{i}-{n - 1 if n and rng.random() < 0.1 else n}"
+            request = HandoffRequest(key=user, user_type=rng.choice(USER_TYPES), request="help")
+            started = time.perf_counter()
+            try:
+                outcome = "merged" if queue.submit(request, args.timeout).merged else "queued"
+            except HandoffQueueFull:
+                outcome = "rejected"
+            latencies[i].append(time.perf_counter() - started)
+            with lock:
+                outcomes[outcome] += 1
+
+    def claim(i: int) -> None:
+        while producing.is_set() or sum(queue.depth().values()):
+            batch = queue.claim(args.claim_batch)
+            claimed[i] += len(batch)
+            if not batch:
+                time.sleep(0.001)
+
+    producers = [threading.Thread(target=produce, args=(i,)) for i in range(args.producers)]
+    agents = [threading.Thread(target=claim, args=(i,)) for i in range(args.agents)]
+    started = time.perf_counter()
+    for thread in producers + agents:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    submitted = time.perf_counter() - started
+    producing.clear()
+    for thread in agents:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    notifier.close()
+    return {
+        "submits_per_second": round(per_producer * args.producers / submitted, 1),
+        "claims_per_second": round(sum(claimed) / elapsed, 1),
+        "submit": percentiles([s for worker in latencies for s in worker]),
+        **outcomes,
+        "claimed": sum(claimed),
+        "notifications": len(notified),
+    }
+
+
+def main() -> None:
+    """Run the benchmark for each store and print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--producers", type=int, default=16)
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--claim-batch", type=int, default=5)
+    parser.add_argument("--capacity", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            "memory": MemoryHandoffStore(),
+            "sqlite": SQLiteHandoffStore(f"{directory}/handoffs.sqlite"),
+        }
+        for name, store in stores.items():
+            report[name] = run(store, args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure how long it takes to import the agent graph in a fresh interpreter.
+
+Importing ``react_agent.graph`` must not build clients, embed the knowledge base
+or compile the graph. Run this after changes to module-level code::
+
+    python benchmarks/bench_import.py --runs 5 --max-seconds 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+from react_agent import registry
+print(json.dumps({{"seconds": elapsed, "initialized": registry.initialized()}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter and return its timings."""
+    # Drop credentials so that any eager client construction fails loudly.
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY")}
+    out = subprocess.run(
+        [sys.executable, "-c", _SNIPPET.format(module=module)],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    """Time importing ``--module`` in fresh interpreters; print the report and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="react_agent.graph")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    samples = [measure(args.module) for _ in range(args.runs)]
+    seconds = [s["seconds"] for s in samples]
+    result = {
+        "module": args.module,
+        "runs": args.runs,
+        "median_seconds": statistics.median(seconds),
+        "max_seconds": max(seconds),
+        "initialized": samples[-1]["initialized"],
+    }
+    print(json.dumps(result, indent=2))
+
+    if result["initialized"]:
+        print(f"error: import built {result['initialized']}", file=sys.stderr)
+        return 1
+    if args.max_seconds is not None and result["median_seconds"] > args.max_seconds:
+        print(f"error: median import time exceeds {args.max_seconds}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
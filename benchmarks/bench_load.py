@@ -0,0 +1,261 @@
+r"""Load-test the support agent graph offline with fake model and embedding backends.
+
+Replays conversation scenarios (an FAQ answer, a human handoff, a "no thanks"
+exit from the human assistant and a return to the primary assistant through
+``CompleteOrEscalate``) against the compiled graph at the given concurrency.
+The primary assistant's model is replaced by a scripted stand-in with a
+simulated time to first token and response time, and the OpenAI clients by
+the fake embedder with a simulated round trip.
+
+Reports throughput, p50/p95/p99 latency per graph node and per turn, and the
+memory retained per conversation (checkpoints included). ``--write-baseline``
+saves the report as JSON; ``--baseline`` compares against a saved report and
+exits with status 1 if a p50 or p95 latency or the throughput regressed::
+
+    python benchmarks/bench_load.py --conversations 400 --concurrency 32 \
+        --baseline benchmarks/baselines/load.json
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+from fakes import FakeAsyncEmbeddingsClient, FakeChatModel, FakeEmbeddingsClient
+from langgraph.checkpoint.memory import MemorySaver
+
+from react_agent import registry
+from react_agent.assistant import (
+    assistant_runnable_resource,
+    fast_assistant_runnable_resource,
+)
+from react_agent.graph import build_graph
+from react_agent.tools.lookup_knowledge_base import (
+    async_openai_client,
+    openai_client,
+)
+from react_agent.utils import get_message_text
+
+# Scenario -> the user's messages, and text the agent's last reply must contain.
+SCENARIOS = {
+    "faq": (["Is there a free trial?"], "From our docs"),
+    "handoff": (["I want to talk to a human"], "in line"),
+    "no_thanks_exit": (["Can I speak to an agent?", "no thanks"], "anything else"),
+    "complete_or_escalate_return": (
+        ["Connect me with a person", "no thanks", "What is SuperMarketer?"],
+        "From our docs",
+    ),
+}
+
+PERCENTILES = (50, 95, 99)
+# p99 of the sub-millisecond nodes is dominated by event-loop scheduling noise.
+COMPARED = ("p50_ms", "p95_ms")
+
+
+class NodeTimings(logging.Handler):
+    """Collects the per-node wall times logged by ``react_agent.telemetry``."""
+
+    def __init__(self):
+        """Create a handler that records INFO and above."""
+        super().__init__(logging.INFO)
+        self.seconds: dict[str, list[float]] = defaultdict(list)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Keep the wall time of each ``node`` event."""
+        event = json.loads(record.getMessage())
+        if event["event"] == "node":
+            self.seconds[event["node"]].append(event["seconds"])
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """Return the ``PERCENTILES`` of ``values`` in milliseconds."""
+    ordered = sorted(values)
+    return {
+        f"p{p}_ms": round(1000 * ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+        for p in PERCENTILES
+    }
+
+
+async def converse(graph, scenario: str, configurable: dict, turn_seconds: list) -> bool:
+    """Play one conversation of ``scenario``; return whether it ended as expected."""
+    messages, expected = SCENARIOS[scenario]
+    config = {"configurable": {**configurable, "thread_id": uuid.uuid4().hex}}
+    result = None
+    for text in messages:
+        started = time.perf_counter()
+        result = await graph.ainvoke({"messages": [("user", text)]}, config)
+        turn_seconds.append(time.perf_counter() - started)
+    return expected.lower() in get_message_text(result["messages"][-1]).lower()
+
+
+async def run(graph, conversations: int, concurrency: int, configurable: dict, scenarios) -> dict:
+    """Play ``conversations`` conversations, ``concurrency`` at a time; report throughput and latency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    turn_seconds: list[float] = []
+    by_scenario = itertools.cycle(scenarios)
+
+    async def one(scenario: str) -> bool:
+        async with semaphore:
+            return await converse(graph, scenario, configurable, turn_seconds)
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(one(next(by_scenario)) for _ in range(conversations)))
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": elapsed,
+        "conversations_per_second": conversations / elapsed,
+        "turns_per_second": len(turn_seconds) / elapsed,
+        "failed_conversations": outcomes.count(False),
+        "turn": percentiles(turn_seconds),
+    }
+
+
+async def measure_memory(graph, conversations: int, concurrency: int, configurable, scenarios):
+    """Report the memory retained per conversation and the peak per concurrent one."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    await run(graph, conversations, concurrency, configurable, scenarios)
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "retained_bytes_per_conversation": (after - before) // conversations,
+        "peak_bytes_per_concurrent_conversation": (peak - before) // min(concurrency, conversations),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list[str]:
+    """Return a description of every regression beyond ``tolerance`` (a fraction)."""
+    regressions = []
+    latencies = {"turn": (report["turn"], baseline["turn"])}
+    for node, stats in report["nodes"].items():
+        if node in baseline["nodes"]:
+            latencies[f"node {node}"] = (stats, baseline["nodes"][node])
+    for name, (now, then) in latencies.items():
+        for key in COMPARED:
+            value = now[key]
+            if key in then and value > then[key] * (1 + tolerance) + min_delta_ms:
+                regressions.append(f"{name} {key}: {then[key]} -> {value}")
+    throughput, reference = report["turns_per_second"], baseline["turns_per_second"]
+    if throughput < reference * (1 - tolerance):
+        regressions.append(f"turns_per_second: {reference:.1f} -> {throughput:.1f}")
+    return regressions
+
+
+def parse_value(raw: str):
+    """Parse a ``--set`` value as JSON, falling back to the raw string."""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def main() -> int:
+    """Run the load test and compare it with the baseline, if any; return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=120.0)
+    parser.add_argument(
+        "--fast-llm-latency-ms",
+        type=float,
+        default=100.0,
+        help="latency of the fast tier's model, used with --set model_tiering=true",
+    )
+    parser.add_argument("--embed-latency-ms", type=float, default=60.0)
+    parser.add_argument("--memory-conversations", type=int, default=50)
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="a configurable value for every conversation, e.g. kb_prefetch=true",
+    )
+    parser.add_argument("--write-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=25.0,
+        help="absolute slack on each latency, enough to absorb an occasional event-loop stall",
+    )
+    args = parser.parse_args()
+
+    # The knowledge base is embedded by the fake client on every run.
+    os.environ["EMBEDDING_CACHE_DIR"] = ""
+    configurable = {key: parse_value(value) for key, value in (s.split("=", 1) for s in args.set)}
+    scenarios = args.scenario or list(SCENARIOS)
+    embed_latency = args.embed_latency_ms / 1000
+    openai_client.override(FakeEmbeddingsClient(latency=embed_latency))
+    async_openai_client.override(FakeAsyncEmbeddingsClient(latency=embed_latency))
+    model = FakeChatModel(latency=args.llm_latency_ms / 1000, ttft=args.llm_ttft_ms / 1000)
+    assistant_runnable_resource.override(model)
+    fast_latency = args.fast_llm_latency_ms / 1000
+    fast_model = FakeChatModel(
+        latency=fast_latency, ttft=min(args.llm_ttft_ms / 1000, fast_latency)
+    )
+    fast_assistant_runnable_resource.override(fast_model)
+    graph = build_graph(checkpointer=MemorySaver())
+    registry.warm_up()
+    # One conversation per scenario first, so that the report reflects a warm
+    # process (query embedding cache included) rather than its first requests.
+    asyncio.run(run(graph, len(scenarios), 1, configurable, scenarios))
+
+    timings = NodeTimings()
+    telemetry = logging.getLogger("react_agent.telemetry")
+    telemetry.addHandler(timings)
+    telemetry.setLevel(logging.INFO)
+    telemetry.propagate = False
+    calls = model.calls + fast_model.calls
+    report = asyncio.run(run(graph, args.conversations, args.concurrency, configurable, scenarios))
+    telemetry.removeHandler(timings)
+
+    report["nodes"] = {node: percentiles(seconds) for node, seconds in sorted(timings.seconds.items())}
+    report["model_calls_per_conversation"] = (
+        model.calls + fast_model.calls - calls
+    ) / args.conversations
+    report["memory"] = asyncio.run(
+        measure_memory(
+            build_graph(checkpointer=MemorySaver()),
+            args.memory_conversations,
+            args.concurrency,
+            configurable,
+            scenarios,
+        )
+    )
+    report["parameters"] = {
+        key: value for key, value in vars(args).items() if key not in ("write_baseline", "baseline")
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if report["failed_conversations"]:
+        print(f"{report['failed_conversations']} conversations ended unexpectedly", file=sys.stderr)
+        return 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Compare vector-only and hybrid (BM25 + vector) knowledge-base retrieval.
+
+Reports mean latency per query, recall@k against a labeled query set, the
+tool-output tokens left after applying the result token budget and how many
+embeddings requests each mode makes. By default a deterministic fake
+embedder with a simulated network delay is used; pass ``--live`` to use the
+OpenAI API (requires ``OPENAI_API_KEY``)::
+
+    python benchmarks/bench_retrieval.py --k 6 --token-budget 500 --embed-latency-ms 80
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from fakes import FakeEmbeddingsClient
+
+from react_agent.bm25 import LexicalThreshold
+from react_agent.chunking import select_within_budget
+from react_agent.tools.lookup_knowledge_base import VectorStoreRetriever, docs
+
+# Query -> the start of the heading of the relevant section.
+LABELED_QUERIES = [
+    ("How do I sign up for SuperSales?", "1. How do i Signup"),
+    ("Is there a free trial?", "2. Is there a free trial"),
+    ("Do you charge per seat?", "3. Does SuperSales have seat based pricing"),
+    ("Does it integrate with Hubspot?", "4. What are the various integrations"),
+    ("What is Business Super Intelligence?", "5. How does SuperAGI"),
+    ("How much is the Growth Plan?", "6. What are the different pricing plans"),
+    ("How does omnichannel support work?", "7. How does SuperSupport"),
+    ("What lead scoring do you provide?", "8. What kind of lead scoring"),
+    ("LinkedIn outreach automation", "9. How does SuperSales integrate with LinkedIn"),
+    ("What is the sales co-pilot?", "10. Can you explain the AI-suggested"),
+    ("Can I book a demo?", "11. Can I book a demo"),
+    ("Features of the open-source agent framework", "12. What are the key features"),
+    ("How does SuperSales compare with Apollo?", "SuperSales: Comparisons"),
+    ("SuperSales pricing tiers", "SuperSales: Pricing"),
+    ("What is SuperMarketer?", "SuperMarketer: Overview"),
+    ("What is SuperSupport?", "SuperSupport: Overview"),
+]
+
+
+def evaluate(
+    retriever: VectorStoreRetriever, client: FakeEmbeddingsClient, k: int, token_budget: int
+) -> dict:
+    """Run the labeled queries; report latency, recall, result tokens and embedding requests."""
+    latencies, found, tokens = [], 0, []
+    requests_before = getattr(client, "requests", 0)
+    for query, heading in LABELED_QUERIES:
+        start = time.perf_counter()
+        results = retriever.query(query, k=k)
+        latencies.append(time.perf_counter() - start)
+        results = select_within_budget(results, token_budget)
+        found += any(r["heading"].startswith(heading) for r in results)
+        tokens.append(sum(r["tokens"] for r in results))
+    return {
+        "mean_latency_ms": 1000 * statistics.mean(latencies),
+        "p95_latency_ms": 1000 * sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        f"recall@{k}": found / len(LABELED_QUERIES),
+        "mean_result_tokens": statistics.mean(tokens),
+        "embedding_requests": getattr(client, "requests", 0) - requests_before,
+    }
+
+
+def main() -> None:
+    """Evaluate each retrieval mode and print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--token-budget", type=int, default=500)
+    parser.add_argument("--embed-latency-ms", type=float, default=80.0)
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32")
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.live:
+        import openai
+
+        client = openai.Client()
+    else:
+        client = FakeEmbeddingsClient(latency=args.embed_latency_ms / 1000)
+
+    modes = {
+        "vector": VectorStoreRetriever.from_docs(docs, client, dtype=args.dtype),
+        "hybrid": VectorStoreRetriever.from_docs(
+            docs, client, hybrid=True, lexical_threshold=LexicalThreshold(), dtype=args.dtype
+        ),
+        "hybrid_always_embed": VectorStoreRetriever.from_docs(
+            docs, client, hybrid=True, dtype=args.dtype
+        ),
+    }
+    results = {name: evaluate(retriever, client, args.k, args.token_budget) for name, retriever in modes.items()}
+    print(json.dumps({"queries": len(LABELED_QUERIES), "modes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Evaluate the fast-path pre-router against labeled user messages.
+
+Reports accuracy, coverage (the share of turns that skip the primary
+assistant's first model call) and per-intent precision and recall, for rules
+only and for rules plus embedding centroids. By default a deterministic fake
+embedder is used; pass ``--live`` to use the OpenAI API (requires
+``OPENAI_API_KEY``)::
+
+    python benchmarks/bench_router.py --min-similarity 0.55 --min-margin 0.05
+"""
+
+import argparse
+import json
+
+from fakes import FakeEmbeddingsClient
+
+from react_agent.embedding_cache import embed_texts
+from react_agent.router import FAQ, HANDOFF, OTHER, IntentRouter, evaluate
+
+# The last user message of real support transcripts, labeled with what the turn
+# needed: a handoff, a knowledge-base answer, or the model's judgement.
+LABELED_TRANSCRIPTS = [
+    ("talk to a human", HANDOFF),
+    ("agent please", HANDOFF),
+    ("Can I speak to a real person?", HANDOFF),
+    ("I'd like to chat with someone from support", HANDOFF),
+    ("human", HANDOFF),
+    ("Please connect me to a customer service rep", HANDOFF),
+    ("I want to talk to your sales team", HANDOFF),
+    ("Transfer me to an agent now", HANDOFF),
+    ("Is anyone actually there? I need a person", HANDOFF),
+    ("what's the pricing", FAQ),
+    ("How much is the Growth plan?", FAQ),
+    ("Is there a free trial?", FAQ),
+    ("Do you have a free tier?", FAQ),
+    ("How do I sign up for SuperSales?", FAQ),
+    ("Can I book a demo?", FAQ),
+    ("Does SuperSales integrate with Hubspot?", FAQ),
+    ("Do you charge per seat?", FAQ),
+    ("What is SuperMarketer?", FAQ),
+    ("How does your lead scoring work?", FAQ),
+    ("What can the open-source SuperAGI framework do?", FAQ),
+    ("How is SuperSales different from Apollo?", FAQ),
+    ("hello", OTHER),
+    ("thanks!", OTHER),
+    ("no thanks, that's all", OTHER),
+    ("My invoice shows the wrong company name", OTHER),
+    ("I can't log in", OTHER),
+    ("Can you change the email on my account?", OTHER),
+    ("The AI agent builder keeps failing on my workflow", OTHER),
+    ("ok cool", OTHER),
+    ("Why was I charged twice this month?", OTHER),
+    ("I don't want to talk to a human, just tell me the price", OTHER),
+    ("Why is the price on my invoice wrong?", OTHER),
+    ("the integration is broken", OTHER),
+]
+
+
+def main() -> None:
+    """Evaluate the router with rules only and with centroids; print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-similarity", type=float, default=0.55)
+    parser.add_argument("--min-margin", type=float, default=0.05)
+    parser.add_argument("--model", default="text-embedding-3-small")
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.live:
+        import openai
+
+        client = openai.Client()
+    else:
+        client = FakeEmbeddingsClient()
+
+    def embed_many(texts: list[str]):
+        return embed_texts(client, args.model, texts)
+
+    def embed(text: str):
+        return embed_many([text])[0]
+
+    thresholds = {"min_similarity": args.min_similarity, "min_margin": args.min_margin}
+    modes = {
+        "rules": evaluate(IntentRouter(**thresholds), LABELED_TRANSCRIPTS),
+        "rules+centroids": evaluate(
+            IntentRouter.from_examples(embed_many, **thresholds), LABELED_TRANSCRIPTS, embed
+        ),
+    }
+    print(json.dumps(modes, indent=2))
+
+
+if __name__ == "__main__":
+    main()
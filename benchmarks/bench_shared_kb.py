@@ -0,0 +1,166 @@
+"""Compare per-worker memory and startup time of private and shared knowledge bases.
+
+Publishes a synthetic knowledge base as a generation, then forks 1, 8 and 32
+workers that each load it and answer a few queries, in two modes:
+
+* ``private``: each worker parses the chunks and reads the embedding matrix
+  into its own memory, as workers do when they build the retriever themselves.
+* ``shared``: each worker serves the generation with :func:`load_generation`,
+  memory-mapping the matrix, the index and the packed chunks.
+
+While every worker is alive, each reports its RSS, PSS (shared pages divided
+among the processes mapping them) and USS (pages only it maps) from
+``/proc/self/smaps_rollup``. RSS counts shared pages in full in every worker;
+PSS summed over the workers is the memory they really use::
+
+    python benchmarks/bench_shared_kb.py --workers 1,8,32 --chunks 10000 --dim 768
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from fakes import FakeEmbeddingsClient
+
+from react_agent.ingest import (
+    GENERATIONS,
+    PackedDocs,
+    current_generation,
+    load_generation,
+    publish_documents,
+)
+from react_agent.tools.lookup_knowledge_base import VectorStoreRetriever
+from react_agent.vector_index import load_index
+
+WORDS = (
+    "account agent analytics billing campaign contact crm demo email export forecast "
+    "inbox integration invoice lead meeting onboarding pipeline plan pricing refund "
+    "report schedule seat sequence signup sla support template ticket trial workflow"
+).split()
+QUERIES = ("How do refunds work?", "Is there a free trial?", "Which CRM integrations exist?")
+
+
+def synthetic_docs(n: int, words: int, seed: int = 0) -> list[dict]:
+    """Return ``n`` chunks of ``words`` random words each."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "page_content": " ".join(rng.choice(WORDS, size=words)),
+            "title": f"Article {i // 8}",
+            "source": f"articles/{i // 8}.md",
+        }
+        for i in range(n)
+    ]
+
+
+def memory_kb() -> dict[str, int]:
+    """Return this process's resident, proportional and unique set sizes in kB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[key] = int(value.split()[0])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def load_private(root: str, client) -> VectorStoreRetriever:
+    """Load the current generation into private memory, as before the shared layout."""
+    path = Path(root, GENERATIONS, current_generation(root))
+    docs = list(PackedDocs.load(path, mmap=False))
+    return VectorStoreRetriever(docs, load_index(path, mmap=False), client)
+
+
+def load_shared(root: str, client) -> VectorStoreRetriever:
+    """Load the current generation memory-mapped, sharing its pages between workers."""
+    generation = load_generation(root)
+    return VectorStoreRetriever(
+        generation.docs, generation.index, client, generation=generation.name
+    )
+
+
+LOADERS = {"private": load_private, "shared": load_shared}
+
+
+def worker(mode, root, dim, loaded, measured, results) -> None:
+    """Load the knowledge base in a worker process and report its startup time and memory."""
+    client = FakeEmbeddingsClient(dim=dim)
+    started = time.perf_counter()
+    retriever = LOADERS[mode](root, client)
+    for query in QUERIES:
+        retriever.query(query, k=5)
+    startup = time.perf_counter() - started
+    # Measure once every worker has loaded, so that shared pages are split between all of them.
+    loaded.wait()
+    results.put({"startup_seconds": startup, **memory_kb()})
+    measured.wait()
+
+
+def run(mode: str, workers: int, root: str, dim: int) -> dict:
+    """Start ``workers`` processes loading in ``mode``; report their startup time and memory per worker."""
+    context = multiprocessing.get_context("fork")
+    loaded, measured = context.Barrier(workers), context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, root, dim, loaded, measured, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    def mean_mb(key: str) -> float:
+        return round(statistics.mean(r[key] for r in reports) / 1024, 1)
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "startup_ms_mean": round(1000 * statistics.mean(r["startup_seconds"] for r in reports), 1),
+        "startup_ms_max": round(1000 * max(r["startup_seconds"] for r in reports), 1),
+        "rss_mb_per_worker": mean_mb("rss"),
+        "pss_mb_per_worker": mean_mb("pss"),
+        "uss_mb_per_worker": mean_mb("uss"),
+        "pss_mb_total": round(sum(r["pss"] for r in reports) / 1024, 1),
+    }
+
+
+def main() -> None:
+    """Publish a synthetic knowledge base and compare private and shared loading."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,8,32")
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32")
+    parser.add_argument("--modes", default="private,shared")
+    args = parser.parse_args()
+
+    docs = synthetic_docs(args.chunks, args.words)
+    client = FakeEmbeddingsClient(dim=args.dim)
+    vectors = np.array([client.vector(doc["page_content"]) for doc in docs], dtype=np.float32)
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.TemporaryDirectory(dir=base) as root:
+        publish_documents(root, docs, vectors, "synthetic", dtype=args.dtype)
+        del docs, vectors
+        report = [
+            run(mode, int(workers), root, args.dim)
+            for mode in args.modes.split(",")
+            for workers in args.workers.split(",")
+        ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Measure the per-step cost of the messages reducer and its checkpoint at growing lengths.
+
+Each graph step merges the node's messages into ``State.messages`` and, with a
+checkpointer, serializes the channel. For conversations of 10, 100 and 1000
+messages, this reports the time of one step that appends a tool round trip
+(an assistant tool call and its result):
+
+* ``reducer``: LangGraph's ``add_messages`` against :func:`merge_messages`;
+* ``checkpoint``: :class:`SQLiteSaver` writing the channel as a plain list
+  against a :class:`MessageLog`, whose messages are serialized once.
+
+::
+
+    python benchmarks/bench_state.py --lengths 10,100,1000 --steps 200
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph.message import add_messages
+
+from react_agent.checkpoint import SQLiteSaver
+from react_agent.message_log import MessageLog, merge_messages
+
+
+def conversation(n: int) -> list:
+    """Return ``n`` messages of alternating questions and answers."""
+    messages = []
+    for i in range(n // 2):
+        messages.append(HumanMessage(f"Question {i} about pricing and plans", id=f"h{i}"))
+        messages.append(AIMessage(f"Answer {i}: " + "details " * 40, id=f"a{i}"))
+    return messages
+
+
+def round_trip(step: int) -> list:
+    """Return an assistant tool call and its result for graph step ``step``."""
+    call = {"name": "lookup_knowledge_base", "args": {"query": "pricing"}, "id": f"c{step}"}
+    return [
+        AIMessage("", tool_calls=[call], id=f"s{step}-call"),
+        ToolMessage("From our docs: " + "pricing " * 40, tool_call_id=call["id"], id=f"s{step}"),
+    ]
+
+
+def per_step_us(step, initial, steps: int) -> dict[str, float]:
+    """Time ``steps`` single steps, each on a fresh conversation after one warm-up step."""
+    seconds = []
+    for _ in range(steps):
+        state = step(initial(), 0)
+        started = time.perf_counter()
+        step(state, 1)
+        seconds.append(time.perf_counter() - started)
+    return {
+        "median_us": round(1e6 * statistics.median(seconds), 1),
+        "mean_us": round(1e6 * statistics.mean(seconds), 1),
+    }
+
+
+def main() -> None:
+    """Time each reducer and checkpoint at every length and print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", default="10,100,1000")
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    report = []
+    with tempfile.TemporaryDirectory() as directory:
+        saver = SQLiteSaver(f"{directory}/checkpoints.sqlite")
+
+        def reduce_plain(state, i):
+            return add_messages(state, round_trip(i))
+
+        def reduce_indexed(state, i):
+            return merge_messages(state, round_trip(i))
+
+        def checkpoint_plain(state, i):
+            state = add_messages(state, round_trip(i))
+            with saver._pool.connection() as conn:
+                saver._dump_channel(conn, "plain", state)
+            return state
+
+        def checkpoint_indexed(state, i):
+            state = merge_messages(state, round_trip(i))
+            with saver._pool.connection() as conn:
+                saver._dump_channel(conn, "indexed", state)
+            return state
+
+        for length in map(int, args.lengths.split(",")):
+            messages = conversation(length)
+
+            def plain():
+                return list(messages)
+
+            def indexed():
+                return MessageLog(messages)
+
+            report.append(
+                {
+                    "messages": length,
+                    "reducer": {
+                        "add_messages": per_step_us(reduce_plain, plain, args.steps),
+                        "merge_messages": per_step_us(reduce_indexed, indexed, args.steps),
+                    },
+                    "checkpoint": {
+                        "list": per_step_us(checkpoint_plain, plain, args.steps),
+                        "message_log": per_step_us(checkpoint_indexed, indexed, args.steps),
+                    },
+                }
+            )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
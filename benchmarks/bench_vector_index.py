@@ -0,0 +1,92 @@
+"""Compare exact and IVF vector search over synthetic knowledge bases.
+
+For each corpus size, reports build time, per-query latency and recall@k
+(against exact search) for each ``n_probe``. Each IVF index is saved and loaded
+back memory-mapped before it is queried, as a worker would load it::
+
+    python benchmarks/bench_vector_index.py --sizes 1000,10000,100000 --probes 1,4,16,64
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from react_agent.vector_index import ExactIndex, IVFIndex, load_index
+from react_agent.vectors import EmbeddingMatrix
+
+
+def clustered_vectors(rng: np.random.Generator, n: int, dim: int, topics: int) -> np.ndarray:
+    """Documents drawn around ``topics`` centres, like articles about a set of products."""
+    centres = rng.normal(size=(topics, dim))
+    return centres[rng.integers(topics, size=n)] + 0.6 * rng.normal(size=(n, dim))
+
+
+def timed_search(index, queries: np.ndarray, k: int) -> tuple[np.ndarray, list[float]]:
+    """Search ``queries`` one at a time; return the results and per-query latencies."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        idx, _ = index.search(query, k)
+        latencies.append(time.perf_counter() - start)
+        results.append(idx[0])
+    return np.array(results), latencies
+
+
+def summarize(latencies: list[float]) -> dict:
+    """Return the mean and p95 of ``latencies`` in milliseconds."""
+    return {
+        "mean_latency_ms": 1000 * statistics.mean(latencies),
+        "p95_latency_ms": 1000 * sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """Return the mean share of the true neighbours found per query."""
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main() -> None:
+    """Compare the exact and IVF indexes and print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--probes", default="1,4,16,64")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = []
+    for n in map(int, args.sizes.split(",")):
+        topics = max(10, n // 100)
+        matrix = EmbeddingMatrix(clustered_vectors(rng, n, args.dim, topics), args.dtype)
+        queries = clustered_vectors(rng, args.queries, args.dim, topics)
+
+        truth, latencies = timed_search(ExactIndex(matrix), queries, args.k)
+        row = {"documents": n, "exact": summarize(latencies), "ivf": {}}
+
+        start = time.perf_counter()
+        ivf = IVFIndex.build(matrix)
+        row["ivf_build_seconds"] = time.perf_counter() - start
+        row["ivf_lists"] = len(ivf.centroids)
+        with tempfile.TemporaryDirectory() as directory:
+            ivf.save(directory)
+            for n_probe in map(int, args.probes.split(",")):
+                loaded = load_index(directory, n_probe=n_probe)
+                found, latencies = timed_search(loaded, queries, args.k)
+                row["ivf"][f"n_probe={n_probe}"] = {
+                    **summarize(latencies),
+                    f"recall@{args.k}": recall(found, truth),
+                }
+                del loaded
+        report.append(row)
+    print(json.dumps({"dim": args.dim, "dtype": args.dtype, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
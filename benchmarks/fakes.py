@@ -0,0 +1,194 @@
+"""Deterministic stand-ins for the model APIs used by the benchmarks and unit tests."""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+import uuid
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+import numpy as np
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    ToolMessage,
+    convert_to_messages,
+    message_chunk_to_message,
+)
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from react_agent.utils import get_message_text
+
+
+class FakeEmbeddingsClient:
+    """A bag-of-words hashing embedder shaped like ``openai.Client()``.
+
+    ``latency`` seconds are spent per request to stand in for the network round
+    trip. ``inputs`` logs the texts of each embeddings request. Shared by the
+    benchmarks and the unit tests.
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        """Create an embedder of ``dim``-dimensional vectors."""
+        self.dim = dim
+        self.latency = latency
+        self.inputs: list[list[str]] = []
+        self.embeddings = self
+
+    @property
+    def requests(self) -> int:
+        """Return the number of embeddings requests made."""
+        return len(self.inputs)
+
+    def vector(self, text: str) -> list[float]:
+        """Return the unit-length embedding of ``text``."""
+        vec = np.zeros(self.dim)
+        for word in re.findall(r"\w+", text.lower()):
+            vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        return (vec / (np.linalg.norm(vec) or 1.0)).tolist()
+
+    def _response(self, input: list[str]) -> SimpleNamespace:
+        self.inputs.append(list(input))
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=self.vector(text))
+                for i, text in enumerate(input)
+            ]
+        )
+
+    def create(self, model: str, input: list[str]) -> SimpleNamespace:
+        """Embed ``input`` as ``client.embeddings.create`` would."""
+        if self.latency:
+            time.sleep(self.latency)
+        return self._response(input)
+
+
+class FakeAsyncEmbeddingsClient(FakeEmbeddingsClient):
+    """Async variant of :class:`FakeEmbeddingsClient`, shaped like ``openai.AsyncClient()``."""
+
+    @classmethod
+    def sharing(cls, sync: FakeEmbeddingsClient) -> "FakeAsyncEmbeddingsClient":
+        """Return an async client with the vectors and request log of ``sync``."""
+        client = cls(sync.dim, sync.latency)
+        client.inputs = sync.inputs
+        return client
+
+    async def create(self, model: str, input: list[str]) -> SimpleNamespace:  # type: ignore[override]
+        """Embed ``input`` as ``client.embeddings.create`` would."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._response(input)
+
+
+# Users asking for a person are handed off; everything else is looked up.
+_HANDOFF = re.compile(r"\b(human|person|agent|representative|someone)\b", re.IGNORECASE)
+
+
+def support_script(messages: list[BaseMessage]) -> AIMessage:
+    """Reply as the default tool-call script of :class:`FakeChatModel`.
+
+    A user message is answered with a ``ToHumanAssistant`` call if it asks for
+    a person and with a ``lookup_knowledge_base`` call otherwise. A lookup
+    result is answered with its first line, and any other tool result (such as
+    the human assistant handing the dialog back) with a follow-up question.
+    """
+    last = messages[-1]
+    if isinstance(last, ToolMessage):
+        if last.name == "lookup_knowledge_base":
+            first_line = next((line for line in get_message_text(last).splitlines() if line.strip()), "")
+            return AIMessage(f"From our docs: {first_line}")
+        return AIMessage("Welcome back! Is there anything else I can help you with?")
+    text = get_message_text(last)
+    if _HANDOFF.search(text):
+        call = ("ToHumanAssistant", {"email": "", "request": text})
+    else:
+        call = ("lookup_knowledge_base", {"query": text})
+    return AIMessage(
+        "",
+        tool_calls=[{"name": call[0], "args": call[1], "id": f"call_{uuid.uuid4().hex[:12]}"}],
+    )
+
+
+class FakeChatModel(Runnable):
+    """A stand-in for the primary assistant's prompt and ``ChatAnthropic`` model.
+
+    Takes the assistant's prompt input and streams the reply chosen by
+    ``script`` from the conversation. The first chunk arrives after ``ttft``
+    seconds and the last after ``latency`` seconds. Token usage is estimated
+    from the prompt length, with ``cached_tokens`` of system prompt and tool
+    schemas read from the prompt cache.
+    """
+
+    def __init__(
+        self,
+        script: Callable[[list[BaseMessage]], AIMessage] = support_script,
+        latency: float = 0.0,
+        ttft: float = 0.0,
+        cached_tokens: int = 1200,
+    ):
+        """Create a model that answers with ``script``."""
+        self.script = script
+        self.latency = latency
+        self.ttft = min(ttft, latency)
+        self.cached_tokens = cached_tokens
+        self.calls = 0
+
+    def _chunks(self, input: dict) -> tuple[AIMessageChunk, AIMessageChunk]:
+        self.calls += 1
+        messages = convert_to_messages(input["messages"])
+        reply = self.script(messages)
+        prompt_tokens = sum(len(get_message_text(m)) for m in messages) // 4
+        output_tokens = len(get_message_text(reply)) // 4 + 20 * len(reply.tool_calls)
+        usage = {
+            "input_tokens": self.cached_tokens + prompt_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": self.cached_tokens + prompt_tokens + output_tokens,
+            "input_token_details": {"cache_read": self.cached_tokens, "cache_creation": 0},
+        }
+        text = get_message_text(reply)
+        tool_call_chunks = [
+            {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+            for i, c in enumerate(reply.tool_calls)
+        ]
+        first = AIMessageChunk(text[: len(text) // 2])
+        rest = AIMessageChunk(
+            text[len(text) // 2 :], tool_call_chunks=tool_call_chunks, usage_metadata=usage
+        )
+        return first, rest
+
+    def invoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs) -> AIMessage:
+        """Return the scripted reply after the full latency."""
+        first, rest = self._chunks(input)
+        time.sleep(self.latency)
+        return message_chunk_to_message(first + rest)
+
+    async def ainvoke(
+        self, input: dict, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> AIMessage:
+        """Async counterpart of :meth:`invoke`."""
+        first, rest = self._chunks(input)
+        await asyncio.sleep(self.latency)
+        return message_chunk_to_message(first + rest)
+
+    def stream(
+        self, input: dict, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> Iterator[AIMessageChunk]:
+        """Yield the scripted reply in two chunks, the first after ``ttft``."""
+        first, rest = self._chunks(input)
+        time.sleep(self.ttft)
+        yield first
+        time.sleep(self.latency - self.ttft)
+        yield rest
+
+    async def astream(
+        self, input: dict, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> AsyncIterator[AIMessageChunk]:
+        """Async counterpart of :meth:`stream`."""
+        first, rest = self._chunks(input)
+        await asyncio.sleep(self.ttft)
+        yield first
+        await asyncio.sleep(self.latency - self.ttft)
+        yield rest
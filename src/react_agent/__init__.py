@@ -4,6 +4,17 @@ This module defines a custom reasoning and action agent graph.
 It invokes tools in a simple loop.
 """
 
-from react_agent.graph import support_agent_graph
+from typing import Any
 
-__all__ = ["support_agent_graph"]
+from react_agent.registry import warm_up
+
+__all__ = ["support_agent_graph", "warm_up"]
+
+
+def __getattr__(name: str) -> Any:
+    # Importing the package must not compile the graph or build any clients.
+    if name == "support_agent_graph":
+        from react_agent.graph import support_agent_graph
+
+        return support_agent_graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,381 @@
+"""Semantic cache of knowledge-base answers.
+
+Customers ask the same few dozen questions worded slightly differently, and
+each one costs a model call that asks for ``lookup_knowledge_base``, the
+lookup and a second model call that writes the answer. With ``answer_cache``
+enabled, the primary assistant embeds the user's question before calling the
+model and replays an earlier answer to a question that is close enough:
+
+* Entries are scoped by user type (visitor, lead or account), because the
+  assistant tailors its answers to who is asking, and by user identity: the
+  prompt carries the user's name, email and account, so an answer written for
+  one user is only replayed to that user. Anonymous visitors share answers.
+* Entries record the knowledge-base generation they were grounded on. Once
+  the retriever serves another generation, the older entries are dropped.
+* Only answers grounded on knowledge-base lookups, with no other tool calls,
+  are stored, and only for the question that opens a conversation: later
+  questions can lean on earlier turns that the embedding does not see.
+* Entries expire after a TTL and the least recently used go first when the
+  cache is full.
+
+``answer_cache_resource.get()`` is also the admin API:
+:meth:`SemanticAnswerCache.entries` lists the entries and
+:meth:`SemanticAnswerCache.purge` removes them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping, Optional
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from react_agent import metrics, registry
+from react_agent.configuration import Configuration
+from react_agent.profiles import state_user_type
+from react_agent.tools.lookup_knowledge_base import (
+    lookup_knowledge_base,
+    retriever_resource,
+)
+from react_agent.utils import get_message_text
+from react_agent.vectors import l2_normalize
+
+logger = logging.getLogger(__name__)
+
+answer_cache_lookups = metrics.counter(
+    "answer_cache_lookups_total", "Semantic answer cache lookups, by result: hit or miss."
+)
+answer_cache_evictions = metrics.counter(
+    "answer_cache_evictions_total",
+    "Answers dropped from the semantic cache, by reason: expired, lru, invalidated or purged.",
+)
+
+
+@dataclass
+class CachedAnswer:
+    """An answer to a user question, as stored in :class:`SemanticAnswerCache`."""
+
+    id: str
+    question: str
+    answer: str
+    scope: str
+    generation: str
+    vector: np.ndarray = field(repr=False)
+    created: float
+    hits: int = 0
+    # Who the answer was written for: a hash of the user's identity, "" if anonymous.
+    owner: str = ""
+
+    def describe(self, now: float) -> dict[str, Any]:
+        """Describe the entry for the admin API."""
+        return {
+            "id": self.id,
+            "question": self.question,
+            "answer": self.answer,
+            "scope": self.scope,
+            "owner": self.owner,
+            "generation": self.generation,
+            "age_seconds": now - self.created,
+            "hits": self.hits,
+        }
+
+
+class SemanticAnswerCache:
+    """A bounded, TTL-limited cache of answers keyed by question embedding.
+
+    Args:
+        maxsize: The most answers kept; the least recently used go first.
+        ttl: Seconds an answer stays valid, or None to keep it until evicted.
+        min_similarity: The least cosine similarity between two questions for
+            one's answer to be served for the other.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl: Optional[float] = 3600.0,
+        min_similarity: float = 0.95,
+    ):
+        """Create an empty cache."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self.generation: Optional[str] = None
+        self._entries: OrderedDict[str, CachedAnswer] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, vector: np.ndarray, scope: str, generation: str, owner: str = ""
+    ) -> Optional[CachedAnswer]:
+        """Return the answer to the closest cached question, if it is close enough."""
+        vector = l2_normalize(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            self._sync(generation)
+            entry = self._closest(vector, scope, owner)
+            if entry is None:
+                self.misses += 1
+                answer_cache_lookups.inc(result="miss")
+                return None
+            entry.hits += 1
+            self._entries.move_to_end(entry.id)
+            self.hits += 1
+            answer_cache_lookups.inc(result="hit")
+            return entry
+
+    def put(
+        self,
+        question: str,
+        vector: np.ndarray,
+        answer: str,
+        scope: str,
+        generation: str,
+        owner: str = "",
+    ) -> CachedAnswer:
+        """Cache ``answer``, replacing the answer to an equivalent question if any."""
+        vector = l2_normalize(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            self._sync(generation)
+            previous = self._closest(vector, scope, owner)
+            if previous is not None:
+                del self._entries[previous.id]
+            entry = CachedAnswer(
+                id=uuid.uuid4().hex[:12],
+                question=question,
+                answer=answer,
+                scope=scope,
+                generation=generation,
+                vector=vector,
+                created=time.monotonic(),
+                owner=owner,
+            )
+            self._entries[entry.id] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                answer_cache_evictions.inc(reason="lru")
+            return entry
+
+    def entries(self, scope: Optional[str] = None) -> list[dict[str, Any]]:
+        """Describe the live entries, most recently used last."""
+        with self._lock:
+            self._expire()
+            now = time.monotonic()
+            return [
+                entry.describe(now)
+                for entry in self._entries.values()
+                if scope is None or entry.scope == scope
+            ]
+
+    def purge(
+        self,
+        *,
+        scope: Optional[str] = None,
+        generation: Optional[str] = None,
+        ids: Optional[Iterable[str]] = None,
+    ) -> int:
+        """Remove the entries matching every given filter (all of them if none); return how many."""
+        ids = set(ids) if ids is not None else None
+        with self._lock:
+            doomed = [
+                entry.id
+                for entry in self._entries.values()
+                if (scope is None or entry.scope == scope)
+                and (generation is None or entry.generation == generation)
+                and (ids is None or entry.id in ids)
+            ]
+            self._drop(doomed, "purged")
+        return len(doomed)
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters, the current size and knowledge-base generation."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "generation": self.generation,
+            }
+
+    def _sync(self, generation: str) -> None:
+        # The knowledge base changed: answers grounded on the old one may be stale.
+        if generation != self.generation:
+            stale = [e.id for e in self._entries.values() if e.generation != generation]
+            self._drop(stale, "invalidated")
+            self.generation = generation
+        self._expire()
+
+    def _expire(self) -> None:
+        if self.ttl is None:
+            return
+        deadline = time.monotonic() - self.ttl
+        expired = [e.id for e in self._entries.values() if e.created < deadline]
+        self._drop(expired, "expired")
+
+    def _drop(self, ids: list[str], reason: str) -> None:
+        for entry_id in ids:
+            del self._entries[entry_id]
+        if ids:
+            answer_cache_evictions.inc(len(ids), reason=reason)
+
+    def _closest(self, vector: np.ndarray, scope: str, owner: str) -> Optional[CachedAnswer]:
+        candidates = [
+            entry
+            for entry in self._entries.values()
+            if entry.scope == scope and entry.owner == owner
+        ]
+        if not candidates:
+            return None
+        similarity = np.stack([entry.vector for entry in candidates]) @ vector
+        best = int(np.argmax(similarity))
+        return candidates[best] if similarity[best] >= self.min_similarity else None
+
+
+def _build_answer_cache() -> SemanticAnswerCache:
+    configuration = Configuration()
+    return SemanticAnswerCache(
+        maxsize=configuration.answer_cache_size,
+        ttl=configuration.answer_cache_ttl_seconds or None,
+        min_similarity=configuration.answer_cache_min_similarity,
+    )
+
+
+answer_cache_resource = registry.register("answer_cache", _build_answer_cache)
+
+
+def answer_owner(state: Mapping[str, Any], configuration: Configuration) -> str:
+    """Return the key of the user an answer is written for, or "" for an anonymous visitor.
+
+    The identity is hashed so that the admin API does not list emails.
+    """
+    try:
+        profile = json.loads(state.get("user_info") or "{}")
+    except ValueError:
+        profile = {}
+    identity = [
+        (profile.get("email") or configuration.email or "").strip().lower(),
+        profile.get("account_id") or configuration.account_id or "",
+        profile.get("name") or configuration.name or "",
+    ]
+    if not any(identity):
+        return ""
+    return hashlib.sha256(json.dumps(identity).encode()).hexdigest()[:16]
+
+
+class AnswerCacheTurn:
+    """The answer cache's view of one primary assistant model call."""
+
+    def __init__(
+        self,
+        cache: SemanticAnswerCache,
+        question: str,
+        scope: str,
+        grounded: bool,
+        owner: str = "",
+    ):
+        """Use ``cache`` for one call's question; see :meth:`for_turn`.
+
+        Args:
+            cache: The cache to look the question up in and store the answer to.
+            question: The turn's question.
+            scope: The user type whose answers may be shared.
+            grounded: Whether the turn already looked up the knowledge base.
+            owner: The :func:`answer_owner` key of the user, or "" for a visitor.
+        """
+        self.cache = cache
+        self.question = question
+        self.scope = scope
+        self.grounded = grounded
+        self.owner = owner
+
+    @classmethod
+    def for_turn(
+        cls, state: Mapping[str, Any], config: RunnableConfig
+    ) -> Optional[AnswerCacheTurn]:
+        """Return the cache's view of this call, or None if the cache does not apply."""
+        configuration = Configuration.from_runnable_config(config)
+        if not configuration.answer_cache:
+            return None
+        messages = state["messages"]
+        questions = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if len(questions) != 1:
+            return None
+        question = get_message_text(messages[questions[0]]).strip()
+        calls = [
+            call
+            for message in messages[questions[0] + 1 :]
+            if isinstance(message, AIMessage)
+            for call in message.tool_calls
+        ]
+        if not question or any(call["name"] != lookup_knowledge_base.name for call in calls):
+            return None
+        scope = state_user_type(state, configuration)
+        owner = answer_owner(state, configuration)
+        return cls(answer_cache_resource.get(), question, scope, bool(calls), owner)
+
+    def lookup(self) -> Optional[AIMessage]:
+        """Return a cached answer to the question, if there is one."""
+        retriever = retriever_resource.get()
+        try:
+            vector = retriever.embed_query(self.question)
+        except Exception:
+            logger.warning("Answer cache lookup failed", exc_info=True)
+            return None
+        return self._replay(self.cache.get(vector, self.scope, retriever.generation, self.owner))
+
+    async def alookup(self) -> Optional[AIMessage]:
+        """Async counterpart of :meth:`lookup`."""
+        retriever = retriever_resource.get()
+        try:
+            vector = await retriever.aembed_query(self.question)
+        except Exception:
+            logger.warning("Answer cache lookup failed", exc_info=True)
+            return None
+        return self._replay(self.cache.get(vector, self.scope, retriever.generation, self.owner))
+
+    def store(self, message: AIMessage) -> None:
+        """Cache the model's answer if it is a final answer grounded on the knowledge base."""
+        if not self._cacheable(message):
+            return
+        retriever = retriever_resource.get()
+        try:
+            vector = retriever.embed_query(self.question)
+        except Exception:
+            logger.warning("Could not cache the answer to %r", self.question, exc_info=True)
+            return
+        self._put(message, vector, retriever.generation)
+
+    async def astore(self, message: AIMessage) -> None:
+        """Async counterpart of :meth:`store`."""
+        if not self._cacheable(message):
+            return
+        retriever = retriever_resource.get()
+        try:
+            vector = await retriever.aembed_query(self.question)
+        except Exception:
+            logger.warning("Could not cache the answer to %r", self.question, exc_info=True)
+            return
+        self._put(message, vector, retriever.generation)
+
+    def _cacheable(self, message: AIMessage) -> bool:
+        return self.grounded and not message.tool_calls and bool(get_message_text(message))
+
+    def _put(self, message: AIMessage, vector: np.ndarray, generation: str) -> None:
+        self.cache.put(
+            self.question, vector, get_message_text(message), self.scope, generation, self.owner
+        )
+
+    @staticmethod
+    def _replay(entry: Optional[CachedAnswer]) -> Optional[AIMessage]:
+        if entry is None:
+            return None
+        return AIMessage(content=entry.answer, response_metadata={"answer_cache_id": entry.id})
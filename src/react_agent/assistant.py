@@ -1,35 +1,321 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from langchain_anthropic import ChatAnthropic
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import Runnable, RunnableConfig
+from typing import Any, Mapping, Optional, Sequence, Union, cast
 
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.prompt_values import PromptValue
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
 from pydantic import BaseModel, Field
 
+from react_agent import metrics, prompts, registry
+from react_agent.answer_cache import AnswerCacheTurn
+from react_agent.configuration import Configuration
+from react_agent.context import ContextPolicy, fit_context
+from react_agent.model_tiers import ModelTiers
+from react_agent.prefetch import Prefetch
 from react_agent.state import State
-from react_agent.utils import load_chat_model
+from react_agent.telemetry import log_event, token_usage
 from react_agent.tools.lookup_knowledge_base import lookup_knowledge_base
+from react_agent.utils import get_message_text, is_empty_reply
+
+logger = logging.getLogger(__name__)
+
+# A runnable, or the registry resource that builds it on first use.
+RunnableSource = Union[Runnable[Any, Any], registry.LazyResource[Runnable[Any, Any]]]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How the assistant retries a model call that came back empty."""
+
+    max_attempts: int = 3
+    initial_backoff: float = 0.5
+    max_backoff: float = 4.0
+    jitter: float = 0.5
+    latency_budget: float = 60.0
+
+    @classmethod
+    def from_runnable_config(cls, config: Optional[RunnableConfig] = None) -> "RetryPolicy":
+        """Build the policy from the ``retry_*`` settings of ``config``."""
+        configuration = Configuration.from_runnable_config(config)
+        return cls(
+            max_attempts=max(configuration.retry_max_attempts, 1),
+            initial_backoff=configuration.retry_initial_backoff_seconds,
+            max_backoff=configuration.retry_max_backoff_seconds,
+            jitter=configuration.retry_jitter,
+            latency_budget=configuration.turn_latency_budget_seconds,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Return the delay before retrying after ``attempt`` failed attempts."""
+        delay = min(self.initial_backoff * 2.0 ** (attempt - 1), self.max_backoff)
+        return delay * (1 - self.jitter * random.random())
+
+
+class _TurnAttempts:
+    """Bookkeeping for one assistant turn: retries, budget and telemetry."""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.started = time.monotonic()
+        self.attempts = 0
+        self.nudged = False
+
+    def next_delay(self, result: AIMessage, elapsed: float) -> Optional[float]:
+        """Record an attempt; return the backoff before the next one, or ``None`` to stop."""
+        self.attempts += 1
+        if not is_empty_reply(result):
+            assistant_attempts.inc(outcome="ok")
+            return None
+        assistant_attempts.inc(outcome="empty")
+        retry_seconds.inc(elapsed)
+        retry_tokens.inc((getattr(result, "usage_metadata", None) or {}).get("total_tokens", 0))
+        if self.attempts >= self.policy.max_attempts:
+            return None
+        delay = self.policy.backoff(self.attempts)
+        if time.monotonic() - self.started + delay >= self.policy.latency_budget:
+            return None
+        retry_seconds.inc(delay)
+        return delay
+
+    def nudge(self, state: dict[str, Any]) -> dict[str, Any]:
+        """Ask the model for a real answer; the history is extended once per turn."""
+        if self.nudged:
+            return state
+        self.nudged = True
+        return {**state, "messages": [*state["messages"], ("user", "Respond with a real output.")]}
+
+    def finish(self, result: AIMessage, state: dict[str, Any], tiers: ModelTiers) -> AIMessage:
+        seconds = time.monotonic() - self.started
+        attempts_per_turn.observe(self.attempts)
+        log_event(
+            "assistant_turn",
+            attempts=self.attempts,
+            seconds=round(seconds, 6),
+            empty=is_empty_reply(result),
+            **tiers.report(),
+        )
+        if not is_empty_reply(result):
+            return result
+        retry_fallbacks.inc()
+        logger.warning(
+            "Primary assistant returned no output after %d attempts; handing off to a human",
+            self.attempts,
+        )
+        return human_handoff_message(state, id_prefix="fallback")
 
-llm = load_chat_model("anthropic/claude-3-5-sonnet-20241022")
 
 class Assistant:
-    def __init__(self, runnable: Runnable):
-        self.runnable = runnable
+    def __init__(
+        self,
+        runnable: RunnableSource,
+        fast_runnable: Optional[RunnableSource] = None,
+    ):
+        self._runnable = runnable
+        # Only used with ``model_tiering``; see react_agent.model_tiers.
+        self._fast_runnable = fast_runnable
+
+    @property
+    def runnable(self) -> Runnable[Any, Any]:
+        """The primary model's runnable, built on first use."""
+        return _resolve(self._runnable)
+
+    def _tiers(self, messages: Sequence[AnyMessage], config: RunnableConfig) -> ModelTiers:
+        configuration = Configuration.from_runnable_config(config)
+        fast = None
+        if configuration.model_tiering and self._fast_runnable is not None:
+            fast = _resolve(self._fast_runnable)
+        # The tier is chosen on the whole conversation: the prompt window drops old turns.
+        return ModelTiers(self.runnable, fast, configuration, messages)
+
+    def __call__(self, state: State, config: RunnableConfig) -> dict[str, Any]:
+        """Answer the turn, retrying empty replies and handing off when they persist."""
+        answers = AnswerCacheTurn.for_turn(state, config)
+        prompt_input, updates = self._prepare(state, config)
+        cached = answers.lookup() if answers is not None else None
+        if cached is not None:
+            return self._replay(cached, prompt_input, updates)
+        prefetch = Prefetch.for_turn(prompt_input, config)
+        if prefetch is not None:
+            prefetch.start()
+        try:
+            attempts = _TurnAttempts(RetryPolicy.from_runnable_config(config))
+            tiers = self._tiers(state["messages"], config)
+            while True:
+                started = time.monotonic()
+                result = tiers.call(prompt_input, config)
+                record_prompt_usage(result)
+                delay = attempts.next_delay(result, time.monotonic() - started)
+                if delay is None:
+                    break
+                prompt_input = attempts.nudge(prompt_input)
+                time.sleep(delay)
+            message = attempts.finish(result, prompt_input, tiers)
+            if answers is not None:
+                answers.store(message)
+            if prefetch is not None:
+                updates["kb_prefetch"] = prefetch.resolve(message)
+            elif prompt_input.get("kb_prefetch"):
+                updates["kb_prefetch"] = None
+        finally:
+            # A no-op once resolved: stops the lookup when the model call raised.
+            if prefetch is not None:
+                prefetch.cancel()
+        return {"messages": message, **updates}
+
+    async def acall(self, state: State, config: RunnableConfig) -> dict[str, Any]:
+        """Async counterpart of ``__call__`` used when the graph runs under ``ainvoke``."""
+        answers = AnswerCacheTurn.for_turn(state, config)
+        prompt_input, updates = self._prepare(state, config)
+        cached = await answers.alookup() if answers is not None else None
+        if cached is not None:
+            return self._replay(cached, prompt_input, updates)
+        prefetch = Prefetch.for_turn(prompt_input, config)
+        if prefetch is not None:
+            prefetch.astart()
+        try:
+            attempts = _TurnAttempts(RetryPolicy.from_runnable_config(config))
+            tiers = self._tiers(state["messages"], config)
+            while True:
+                started = time.monotonic()
+                result = await tiers.acall(prompt_input, config)
+                record_prompt_usage(result)
+                delay = attempts.next_delay(result, time.monotonic() - started)
+                if delay is None:
+                    break
+                prompt_input = attempts.nudge(prompt_input)
+                await asyncio.sleep(delay)
+            message = attempts.finish(result, prompt_input, tiers)
+            if answers is not None:
+                await answers.astore(message)
+            if prefetch is not None:
+                updates["kb_prefetch"] = await prefetch.aresolve(message)
+            elif prompt_input.get("kb_prefetch"):
+                updates["kb_prefetch"] = None
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
+        return {"messages": message, **updates}
+
+    @staticmethod
+    def _replay(
+        message: AIMessage, state: dict[str, Any], updates: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Answer from the semantic answer cache without calling the model."""
+        if state.get("kb_prefetch"):
+            updates["kb_prefetch"] = None
+        return {"messages": message, **updates}
+
+    @staticmethod
+    def _prepare(state: State, config: RunnableConfig) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Build the prompt input and the state updates for the rolling summary."""
+        configuration = Configuration.from_runnable_config(config)
+        window = fit_context(
+            state["messages"],
+            ContextPolicy.from_runnable_config(config),
+            summary=state.get("conversation_summary", ""),
+            summarized_through=state.get("summarized_through"),
+            compacted_through=state.get("compacted_through"),
+        )
+        updates = {}
+        if (window.summarized_through, window.compacted_through) != (
+            state.get("summarized_through"),
+            state.get("compacted_through"),
+        ):
+            updates = {
+                "conversation_summary": window.summary,
+                "summarized_through": window.summarized_through,
+                "compacted_through": window.compacted_through,
+            }
+        prompt_input = {
+            **state,
+            "messages": window.messages,
+            # Rounding the time keeps the system prompt byte-identical across calls.
+            "time": format_prompt_time(configuration.prompt_time_granularity_seconds),
+            # After the system prompt, so that a new summary leaves the cached prefix intact.
+            "conversation_summary": (
+                [HumanMessage(prompts.CONVERSATION_SUMMARY.format(summary=window.summary))]
+                if window.summary
+                else []
+            ),
+        }
+        return prompt_input, updates
+
+    def as_runnable(self, name: str) -> Runnable[Any, Any]:
+        """Wrap the assistant as a graph node with native sync and async paths."""
+        return RunnableLambda(self.__call__, afunc=self.acall, name=name)
+
+
+def _resolve(runnable: RunnableSource) -> Runnable[Any, Any]:
+    if isinstance(runnable, registry.LazyResource):
+        return runnable.get()
+    return runnable
+
+
+def human_handoff_message(state: Mapping[str, Any], id_prefix: str) -> AIMessage:
+    """Build a ``ToHumanAssistant`` call on the model's behalf.
+
+    Used when the model keeps returning nothing, and by the fast-path router
+    when the user plainly asks for a human.
+    """
+    try:
+        email = json.loads(state.get("user_info") or "{}").get("email") or ""
+    except ValueError:
+        email = ""
+    request = next(
+        (
+            get_message_text(m)
+            for m in reversed(state["messages"])
+            if isinstance(m, HumanMessage)
+        ),
+        "",
+    )
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "ToHumanAssistant",
+                "args": {"email": email, "request": request},
+                "id": f"{id_prefix}_{uuid.uuid4().hex}",
+                "type": "tool_call",
+            }
+        ],
+    )
 
-    def __call__(self, state: State, config: RunnableConfig):
-        while True:
-            result = self.runnable.invoke(state)
 
-            if not result.tool_calls and (
-                not result.content
-                or isinstance(result.content, list)
-                and not result.content[0].get("text")
-            ):
-                messages = state["messages"] + [("user", "Respond with a real output.")]
-                state = {**state, "messages": messages}
-            else:
-                break
-        return {"messages": result}
+assistant_attempts = metrics.counter(
+    "assistant_attempts_total", "Primary assistant model calls, by outcome."
+)
+retry_seconds = metrics.counter(
+    "assistant_retry_seconds_total",
+    "Seconds spent on empty model outputs and the backoff after them.",
+)
+retry_tokens = metrics.counter(
+    "assistant_retry_tokens_total", "Tokens spent on model calls that returned no output."
+)
+attempts_per_turn = metrics.histogram(
+    "assistant_attempts_per_turn",
+    "Model calls the primary assistant needed per turn, retries included.",
+    buckets=(1, 2, 3, 4, 5, 8),
+)
+retry_fallbacks = metrics.counter(
+    "assistant_retry_fallbacks_total",
+    "Turns handed off to a human because the retry policy was exhausted.",
+)
 
 
 class CompleteOrEscalate(BaseModel):
@@ -77,35 +363,138 @@ class ToHumanAssistant(BaseModel):
 
 # The top-level assistant performs general Q&A and delegates specialized tasks to other assistants.
 # The task delegation is a simple form of semantic routing / does simple intent detection
-# llm = ChatAnthropic(model="claude-3-haiku-20240307")
-llm = ChatAnthropic(model="claude-3-5-sonnet-20241022", temperature=0)
+def _build_llm(fast: bool = False) -> BaseChatModel:
+    from langchain_anthropic import ChatAnthropic
+
+    configuration = Configuration()
+    model = configuration.fast_model if fast else configuration.model
+    return ChatAnthropic(model=model, temperature=0)
+
+
+llm_resource = registry.register("llm", _build_llm)
+fast_llm_resource = registry.register("fast_llm", lambda: _build_llm(fast=True))
+
+# Anthropic caches the prompt prefix up to each breakpoint: tools come first,
+# then the system prompt, then the messages. Everything that changes between
+# calls is kept behind the static instructions.
+CACHE_CONTROL: dict[str, Any] = {"type": "ephemeral"}
+
+
+def format_prompt_time(granularity_seconds: int, now: Optional[float] = None) -> str:
+    """Return the current time rounded down to ``granularity_seconds``."""
+    now = time.time() if now is None else now
+    if granularity_seconds > 0:
+        now -= now % granularity_seconds
+    return datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M")
+
 
 primary_assistant_prompt = ChatPromptTemplate.from_messages(
     [
         (
             "system",
-            "You are a helpful customer support assistant for SuperAGI. "
-            "Your primary role is to lookup knowledge base to answer customer queries regarding SuperAGI's product, pricing, technology, etc. "
-            "If a customer makes any request which you are unable to handle, or asks any query which you are unable to answer, "
-            "delegate the task to the human assistant by invoking the corresponding tool."
-            # " You are not able to book demo calls yourself."
-            # " Only the specialized assistants are given permission to do this for the user."
-            # "The user is not aware of the different specialized assistants, so do not mention them; just quietly delegate through function calls. "
-            # "Provide detailed information to the customer, and always double-check the database before concluding that information is unavailable. "
-            # " When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            # " If a search comes up empty, expand your search before giving up."
-            "\n\nCurrent user information:\n<User>\n{user_info}\n</User>"
-            "\nCurrent time: {time}.",
+            [
+                {
+                    "type": "text",
+                    "text": prompts.PRIMARY_ASSISTANT_INSTRUCTIONS,
+                    "cache_control": CACHE_CONTROL,
+                },
+                {"type": "text", "text": prompts.USER_CONTEXT},
+            ],
         ),
+        ("placeholder", "{conversation_summary}"),
         ("placeholder", "{messages}"),
     ]
-).partial(time=datetime.now)
+).partial(
+    time=lambda: format_prompt_time(Configuration().prompt_time_granularity_seconds),
+    conversation_summary=[],
+)
+
+
+def mark_history_breakpoint(prompt: PromptValue) -> list[BaseMessage]:
+    """Add a cache breakpoint to the last user or tool message of the prompt.
+
+    Each turn then reads the whole earlier conversation from the provider's
+    prompt cache instead of processing it again.
+    """
+    messages = prompt.to_messages()
+    if not messages or not isinstance(messages[-1], (HumanMessage, ToolMessage)):
+        return messages
+    last = messages[-1]
+    if isinstance(last.content, str):
+        blocks: list[dict[str, Any]] = [{"type": "text", "text": last.content}]
+    else:
+        blocks = [b if isinstance(b, dict) else {"type": "text", "text": b} for b in last.content]
+    if not blocks:
+        return messages
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return messages[:-1] + [last.model_copy(update={"content": blocks})]
+
+
+def record_prompt_usage(result: AIMessage) -> None:
+    """Count cached and uncached input tokens reported for a model call."""
+    if not getattr(result, "usage_metadata", None):
+        return
+    tokens = token_usage(result)
+    for kind in ("cache_read", "cache_creation", "uncached"):
+        input_tokens.inc(tokens[kind], kind=kind)
+    logger.debug(
+        "Primary assistant input tokens: cache_read=%d cache_creation=%d uncached=%d",
+        tokens["cache_read"],
+        tokens["cache_creation"],
+        tokens["uncached"],
+    )
+
+
+input_tokens = metrics.counter(
+    "assistant_input_tokens_total",
+    "Input tokens sent to the primary assistant model, by prompt-cache status.",
+)
 primary_assistant_tools = [
     lookup_knowledge_base,
 ]
-assistant_runnable = primary_assistant_prompt | llm.bind_tools(
-    primary_assistant_tools
-    + [
-        ToHumanAssistant
-    ]
-)
\ No newline at end of file
+
+
+def _build_assistant_runnable(
+    llm: registry.LazyResource[BaseChatModel] = llm_resource,
+) -> Runnable[Any, Any]:
+    from langchain_anthropic.chat_models import convert_to_anthropic_tool
+
+    tools = cast(
+        list[dict[str, Any]],
+        [
+            convert_to_anthropic_tool(t)
+            for t in primary_assistant_tools
+            + [
+                ToHumanAssistant
+            ]
+        ],
+    )
+    # A breakpoint on the last tool caches every tool schema.
+    tools[-1] = {**tools[-1], "cache_control": CACHE_CONTROL}
+    return (
+        primary_assistant_prompt
+        | RunnableLambda(mark_history_breakpoint)
+        | llm.get().bind_tools(tools)
+    )
+
+
+assistant_runnable_resource = registry.register(
+    "assistant_runnable", _build_assistant_runnable
+)
+fast_assistant_runnable_resource = registry.register(
+    "fast_assistant_runnable", lambda: _build_assistant_runnable(fast_llm_resource)
+)
+
+_lazy_attributes: dict[str, registry.LazyResource[Any]] = {
+    "llm": llm_resource,
+    "fast_llm": fast_llm_resource,
+    "assistant_runnable": assistant_runnable_resource,
+    "fast_assistant_runnable": fast_assistant_runnable_resource,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # Keep the module-level names available without building the models at import time.
+    if name in _lazy_attributes:
+        return _lazy_attributes[name].get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
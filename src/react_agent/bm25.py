@@ -0,0 +1,95 @@
+"""An in-process BM25 index over the knowledge base.
+
+Queries that name a product, plan or integration ("SuperSales", "Growth Plan",
+"Hubspot") are answered well by exact term matching. The index is built once
+next to the vector matrix; when its best match is decisive the retriever can
+skip the embeddings request altogether.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a about an and are as at be by can do does for from have how i in is it me my "
+    "of on or our please tell that the there this to us was we what when where which "
+    "who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase terms, dropping stopwords."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+@dataclass(frozen=True)
+class LexicalThreshold:
+    """When a lexical match is decisive enough to skip the embedding call.
+
+    The best document must score at least ``min_score`` and beat the runner-up
+    by a factor of ``margin``.
+    """
+
+    min_score: float = 4.0
+    margin: float = 1.5
+
+    def is_decisive(self, hits: Sequence[tuple[int, float]]) -> bool:
+        """Return whether the best of ``hits`` clears both thresholds."""
+        if not hits or hits[0][1] < self.min_score:
+            return False
+        return len(hits) == 1 or hits[0][1] >= self.margin * hits[1][1]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents, backed by an inverted index."""
+
+    def __init__(self, texts: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        """Index ``texts``; ``k1`` and ``b`` are the usual BM25 parameters."""
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self._lengths: list[int] = []
+        for i, text in enumerate(texts):
+            terms = tokenize(text)
+            self._lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self._postings[term].append((i, tf))
+        n = len(self._lengths)
+        self._avg_length = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        """Return the number of documents."""
+        return len(self._lengths)
+
+    def search(self, query: str, k: int = 5) -> list[tuple[int, float]]:
+        """Return up to ``k`` ``(document index, score)`` pairs, best first."""
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self._postings[term]:
+                norm = 1 - self.b + self.b * self._lengths[doc] / (self._avg_length or 1.0)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], k: int = 60
+) -> list[tuple[int, float]]:
+    """Fuse several rankings of document indices into one, best first."""
+    fused: dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            fused[doc] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])
@@ -0,0 +1,722 @@
+"""Checkpointers that persist conversations between requests.
+
+With a checkpointer, the graph keeps ``messages``, ``dialog_state`` and the rest
+of the state per ``thread_id``, so clients only send the new user message on
+each turn. :func:`create_checkpointer` picks a backend from
+:class:`~react_agent.configuration.Configuration`:
+
+* ``"none"``: no persistence (the default, as before);
+* ``"memory"``: LangGraph's in-process ``MemorySaver``;
+* ``"sqlite"``: :class:`SQLiteSaver`, a durable store for a single host.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+from react_agent.configuration import Configuration
+from react_agent.message_log import MessageLog
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    channel_versions TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS channel_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS message_blobs (
+    thread_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB NOT NULL,
+    PRIMARY KEY (thread_id, digest)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# Blob type marking a message list stored as references into ``message_blobs``.
+# The blob is either the full JSON list of digests or, when the list extends the
+# previous version of the channel, ``{"base": version, "tail": [digests]}``.
+_MESSAGE_REFS = "message_refs"
+# Longest chain of tail-only versions before a full digest list is written again.
+_MAX_REF_DEPTH = 16
+
+
+class _ConnectionPool:
+    """A fixed-size pool of SQLite connections in WAL mode."""
+
+    def __init__(self, path: str, size: int = 4):
+        self._connections: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(max(size, 1)):
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._connections.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connections.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class SQLiteSaver(BaseCheckpointSaver[int]):
+    """A durable checkpointer backed by SQLite.
+
+    Each checkpoint stores only the channels that changed since its parent.
+    Message lists are stored as references to individually stored messages, so
+    a turn writes only the messages it added instead of the whole history; the
+    reference list itself only records the digests appended since the previous
+    version of the channel. Only the latest ``max_checkpoints`` checkpoints of
+    each thread are kept, pruned by checkpoint id range.
+    """
+
+    # Message lists remembered per (thread_id, checkpoint_ns, channel), so that
+    # the next version only stores what it appended.
+    _MAX_REMEMBERED = 1024
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        pool_size: int = 4,
+        max_checkpoints: Optional[int] = 20,
+        serde: Optional[SerializerProtocol] = None,
+    ):
+        """Open or create the database at ``path``.
+
+        Args:
+            path: The SQLite database file; its directory is created if needed.
+            pool_size: The number of pooled connections.
+            max_checkpoints: Checkpoints kept per thread, or None to keep them all.
+            serde: The serializer for checkpoints and writes.
+        """
+        super().__init__(serde=serde)
+        self.path = path
+        self.max_checkpoints = max_checkpoints
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._pool = _ConnectionPool(path, pool_size)
+        with self._pool.connection() as conn:
+            conn.executescript(_SCHEMA)
+        # (thread_id, checkpoint_ns, channel) -> (version, digests, chain depth) of the last write.
+        self._last_refs: OrderedDict[tuple[str, str, str], tuple[str, list[str], int]] = OrderedDict()
+        self._last_refs_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self._pool.close()
+
+    # Channel values
+
+    def _dump_channel(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        value: Any,
+        key: Optional[tuple[str, str, str, str]] = None,
+    ) -> tuple[str, bytes]:
+        """Serialize a channel value; ``key`` is (thread_id, checkpoint_ns, channel, version)."""
+        if isinstance(value, list) and value and all(isinstance(m, BaseMessage) for m in value):
+            dumped = [
+                # Messages already in the state were serialized by an earlier checkpoint.
+                value.memoized(message, self._dump_message)
+                if isinstance(value, MessageLog)
+                else self._dump_message(message)
+                for message in value
+            ]
+            digests = [digest for _, _, digest in dumped]
+            previous = self._previous_refs(conn, key, digests)
+            stored = set(previous[1]) if previous else ()
+            conn.executemany(
+                "INSERT OR IGNORE INTO message_blobs (thread_id, digest, type, blob) VALUES (?, ?, ?, ?)",
+                [(thread_id, d, type_, blob) for type_, blob, d in dumped if d not in stored],
+            )
+            if previous is None:
+                refs: Any = digests
+                depth = 0
+            else:
+                refs = {"base": previous[0], "tail": digests[len(previous[1]) :]}
+                depth = previous[2] + 1
+            if key is not None:
+                self._remember_refs(key, digests, depth)
+            return _MESSAGE_REFS, json.dumps(refs).encode()
+        return self.serde.dumps_typed(value)
+
+    def _previous_refs(
+        self,
+        conn: sqlite3.Connection,
+        key: Optional[tuple[str, str, str, str]],
+        digests: list[str],
+    ) -> Optional[tuple[str, list[str], int]]:
+        """Return the last stored version of the channel if ``digests`` extends it."""
+        if key is None:
+            return None
+        thread_id, checkpoint_ns, channel, version = key
+        with self._last_refs_lock:
+            previous = self._last_refs.get((thread_id, checkpoint_ns, channel))
+        if (
+            previous is None
+            or previous[0] == version
+            or previous[2] >= _MAX_REF_DEPTH
+            or digests[: len(previous[1])] != previous[1]
+        ):
+            return None
+        # The base must still be stored: another process may have pruned or deleted it.
+        row = conn.execute(
+            "SELECT 1 FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            (thread_id, checkpoint_ns, channel, previous[0]),
+        ).fetchone()
+        return previous if row else None
+
+    def _remember_refs(
+        self, key: tuple[str, str, str, str], digests: list[str], depth: int
+    ) -> None:
+        thread_id, checkpoint_ns, channel, version = key
+        with self._last_refs_lock:
+            self._last_refs[(thread_id, checkpoint_ns, channel)] = (version, digests, depth)
+            self._last_refs.move_to_end((thread_id, checkpoint_ns, channel))
+            while len(self._last_refs) > self._MAX_REMEMBERED:
+                self._last_refs.popitem(last=False)
+
+    def _dump_message(self, message: BaseMessage) -> tuple[str, bytes, str]:
+        type_, blob = self.serde.dumps_typed(message)
+        return type_, blob, hashlib.sha1(type_.encode() + blob).hexdigest()
+
+    def _load_channel(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        type_: str,
+        blob: bytes,
+        checkpoint_ns: str = "",
+        channel: str = "",
+    ) -> Any:
+        if type_ != _MESSAGE_REFS:
+            return self.serde.loads_typed((type_, blob))
+        digests = self._load_refs(conn, thread_id, checkpoint_ns, channel, blob)
+        stored = {}
+        for start in range(0, len(digests), 500):
+            chunk = digests[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for digest, m_type, m_blob in conn.execute(
+                f"SELECT digest, type, blob FROM message_blobs WHERE thread_id = ? AND digest IN ({placeholders})",
+                (thread_id, *chunk),
+            ):
+                stored[digest] = (m_type, m_blob)
+        return [self.serde.loads_typed(stored[d]) for d in digests]
+
+    def _load_refs(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        checkpoint_ns: str,
+        channel: str,
+        blob: bytes,
+    ) -> list[str]:
+        """Resolve a stored reference list, following its chain of base versions."""
+        tails: list[list[str]] = []
+        refs: Any = json.loads(blob)
+        while isinstance(refs, dict):
+            tails.append(refs["tail"])
+            (base,) = conn.execute(
+                "SELECT blob FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, refs["base"]),
+            ).fetchone()
+            refs = json.loads(base)
+        digests: list[str] = refs
+        for tail in reversed(tails):
+            digests.extend(tail)
+        return digests
+
+    def _load_values(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        checkpoint_ns: str,
+        versions: ChannelVersions,
+    ) -> dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = conn.execute(
+                "SELECT type, blob FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            values[channel] = self._load_channel(
+                conn, thread_id, row[0], row[1], checkpoint_ns, channel
+            )
+        return values
+
+    # Reading
+
+    def _to_tuple(self, conn: sqlite3.Connection, row: Sequence[Any]) -> CheckpointTuple:
+        (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            parent_id,
+            c_type,
+            c_blob,
+            m_type,
+            m_blob,
+        ) = row
+        checkpoint: Checkpoint = self.serde.loads_typed((c_type, c_blob))
+        writes = conn.execute(
+            "SELECT task_id, channel, type, blob FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_values(
+                    conn, thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self.serde.loads_typed((m_type, m_blob)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, blob)))
+                for task_id, channel, type_, blob in writes
+            ],
+        )
+
+    _COLUMNS = (
+        "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+        "checkpoint_type, checkpoint, metadata_type, metadata"
+    )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint, or the latest one of the thread."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        with self._pool.connection() as conn:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = conn.execute(
+                    f"SELECT {self._COLUMNS} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    f"SELECT {self._COLUMNS} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._to_tuple(conn, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first."""
+        clauses, params = [], []
+        if config:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {self._COLUMNS} FROM checkpoints {where} ORDER BY checkpoint_id DESC",
+                params,
+            ).fetchall()
+            results: list[CheckpointTuple] = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                results.append(self._to_tuple(conn, row))
+        yield from results
+
+    # Writing
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint, writing only the channels in ``new_versions``."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        with self._pool.connection() as conn:
+            blobs = []
+            for channel, version in new_versions.items():
+                if channel in values:
+                    type_, blob = self._dump_channel(
+                        conn,
+                        thread_id,
+                        values[channel],
+                        (thread_id, checkpoint_ns, channel, str(version)),
+                    )
+                else:
+                    type_, blob = "empty", None
+                blobs.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+            conn.executemany(
+                "INSERT OR REPLACE INTO channel_blobs "
+                "(thread_id, checkpoint_ns, channel, version, type, blob) VALUES (?, ?, ?, ?, ?, ?)",
+                blobs,
+            )
+            c_type, c_blob = self.serde.dumps_typed(c)
+            m_type, m_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint_type, "
+                "checkpoint, metadata_type, metadata, channel_versions) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    c_type,
+                    c_blob,
+                    m_type,
+                    m_blob,
+                    json.dumps({k: str(v) for k, v in checkpoint["channel_versions"].items()}),
+                ),
+            )
+            if self.max_checkpoints:
+                # Prune in batches so that the cleanup cost is amortized over several turns.
+                self._prune(
+                    conn,
+                    thread_id,
+                    checkpoint_ns,
+                    self.max_checkpoints,
+                    batch=max(self.max_checkpoints // 4, 1),
+                )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the pending writes of a task."""
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    configurable["thread_id"],
+                    configurable.get("checkpoint_ns", ""),
+                    configurable["checkpoint_id"],
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    blob,
+                    task_path,
+                )
+            )
+        # Special writes (errors, interrupts) overwrite; regular ones are idempotent.
+        verb = "REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "IGNORE"
+        with self._pool.connection() as conn:
+            conn.executemany(
+                f"INSERT OR {verb} INTO writes "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, blob, task_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint, write and stored message of a thread."""
+        with self._pool.connection() as conn:
+            for table in ("checkpoints", "channel_blobs", "message_blobs", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        with self._last_refs_lock:
+            for key in [k for k in self._last_refs if k[0] == thread_id]:
+                del self._last_refs[key]
+
+    # Pruning
+
+    def _prune(
+        self,
+        conn: sqlite3.Connection,
+        thread_id: str,
+        checkpoint_ns: str,
+        keep: int,
+        batch: int = 1,
+    ) -> None:
+        """Delete all but the latest ``keep`` checkpoints once ``batch`` of them are stale.
+
+        Only the stale checkpoints and the blobs they referenced are examined:
+        the thread is never rescanned as a whole.
+        """
+
+        def nth_latest(n: int) -> Optional[str]:
+            row = conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+                (thread_id, checkpoint_ns, n - 1),
+            ).fetchone()
+            return row[0] if row else None
+
+        if nth_latest(keep + batch) is None:
+            return
+        cutoff = nth_latest(keep)
+        stale_versions: set[tuple[str, str]] = set()
+        for (versions,) in conn.execute(
+            "SELECT channel_versions FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, cutoff),
+        ):
+            stale_versions.update(json.loads(versions).items())
+        live_versions: set[tuple[str, str]] = set()
+        for (versions,) in conn.execute(
+            "SELECT channel_versions FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id >= ?",
+            (thread_id, checkpoint_ns, cutoff),
+        ):
+            live_versions.update(json.loads(versions).items())
+        for table in ("checkpoints", "writes"):
+            conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, cutoff),
+            )
+
+        def stored_refs(channel: str, version: str) -> Optional[Any]:
+            row = conn.execute(
+                "SELECT blob FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND channel = ? AND version = ? AND type = ?",
+                (thread_id, checkpoint_ns, channel, version, _MESSAGE_REFS),
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+
+        # Message lists of live versions reach back through their base versions.
+        live_digests: set[str] = set()
+        pending = list(live_versions)
+        while pending:
+            channel, version = pending.pop()
+            refs = stored_refs(channel, version)
+            if isinstance(refs, dict):
+                live_digests.update(refs["tail"])
+                if (channel, refs["base"]) not in live_versions:
+                    live_versions.add((channel, refs["base"]))
+                    pending.append((channel, refs["base"]))
+            elif refs is not None:
+                live_digests.update(refs)
+
+        dead_versions = stale_versions - live_versions
+        dead_digests: set[str] = set()
+        for channel, version in dead_versions:
+            refs = stored_refs(channel, version)
+            if refs is not None:
+                dead_digests.update(refs["tail"] if isinstance(refs, dict) else refs)
+        conn.executemany(
+            "DELETE FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(thread_id, checkpoint_ns, channel, version) for channel, version in dead_versions],
+        )
+        dead_digests -= live_digests
+        if dead_digests:
+            # Messages are stored per thread: subgraph namespaces may still refer to them.
+            for (blob,) in conn.execute(
+                "SELECT blob FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns != ? AND type = ?",
+                (thread_id, checkpoint_ns, _MESSAGE_REFS),
+            ):
+                refs = json.loads(blob)
+                dead_digests.difference_update(refs["tail"] if isinstance(refs, dict) else refs)
+        conn.executemany(
+            "DELETE FROM message_blobs WHERE thread_id = ? AND digest = ?",
+            [(thread_id, digest) for digest in dead_digests],
+        )
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """Keep only the latest checkpoint of each thread, or delete the threads."""
+        for thread_id in thread_ids:
+            if strategy == "delete":
+                self.delete_thread(thread_id)
+                continue
+            with self._pool.connection() as conn:
+                namespaces = [
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?",
+                        (thread_id,),
+                    )
+                ]
+                for checkpoint_ns in namespaces:
+                    self._prune(conn, thread_id, checkpoint_ns, 1)
+
+    # Async API: SQLite calls run in the default executor so they never block the event loop.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async counterpart of :meth:`get_tuple`."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async counterpart of :meth:`list`."""
+        items = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async counterpart of :meth:`put`."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async counterpart of :meth:`put_writes`."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.put_writes, config, writes, task_id, task_path
+        )
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async counterpart of :meth:`delete_thread`."""
+        await asyncio.get_running_loop().run_in_executor(None, self.delete_thread, thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """Async counterpart of :meth:`prune`."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.prune(thread_ids, strategy=strategy)
+        )
+
+
+def create_checkpointer(
+    configuration: Optional[Configuration] = None,
+) -> Optional[BaseCheckpointSaver[Any]]:
+    """Create the checkpointer selected by ``configuration.checkpointer``."""
+    configuration = configuration or Configuration()
+    backend = configuration.checkpointer
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemorySaver()
+    if backend == "sqlite":
+        return SQLiteSaver(
+            configuration.checkpoint_path,
+            pool_size=configuration.checkpoint_pool_size,
+            max_checkpoints=configuration.checkpoint_max_per_thread or None,
+        )
+    raise ValueError(f"Unknown checkpointer backend: {backend!r}")
@@ -0,0 +1,172 @@
+"""Split the markdown knowledge base into small, heading-aware chunks.
+
+Every ``#``/``##``/``###`` section becomes its own set of chunks, so a question
+about pricing no longer pulls in the product overview and the competitor
+comparison that share its ``##`` parent. Each chunk starts with a breadcrumb
+of its parent headings ("SuperSales > SuperSales: Pricing") so that it still
+makes sense, and still matches product names, on its own.
+
+Sections longer than the per-chunk token cap are split at paragraph and
+top-level list-item boundaries (numbered FAQ items, bullets), packing
+consecutive pieces together up to the cap.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Iterator, Sequence
+
+from react_agent.context import CHARS_PER_TOKEN
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*$")
+_LIST_ITEM = re.compile(r"^(?:\d+\.|[-*])\s")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+BREADCRUMB_SEPARATOR = " > "
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimate the number of tokens in ``text``."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def clean_heading(text: str) -> str:
+    """Strip markdown emphasis and trailing punctuation from a heading."""
+    return text.replace("**", "").strip().rstrip("-:").strip()
+
+
+@dataclass(frozen=True)
+class Section:
+    """The body of one markdown section and the headings above it."""
+
+    path: tuple[str, ...]
+    body: str
+
+
+def iter_sections(markdown: str) -> Iterator[Section]:
+    """Yield each section of ``markdown`` that has a body, in document order."""
+    path: list[str] = []
+    body: list[str] = []
+    for line in markdown.splitlines():
+        match = _HEADING.match(line)
+        if match is None:
+            body.append(line)
+            continue
+        if "\n".join(body).strip():
+            yield Section(tuple(path), "\n".join(body).strip())
+        body = []
+        level = len(match.group(1))
+        del path[level - 1 :]
+        # Pad skipped levels so that the path depth always matches the heading level.
+        path.extend([""] * (level - 1 - len(path)))
+        path.append(clean_heading(match.group(2)))
+    if "\n".join(body).strip():
+        yield Section(tuple(path), "\n".join(body).strip())
+
+
+def split_blocks(body: str) -> list[str]:
+    """Split a section body into paragraphs and top-level list items.
+
+    Indented lines (nested list items, continuations) stay with the item above
+    them.
+    """
+    blocks: list[list[str]] = []
+    for paragraph in re.split(r"\n\s*\n", body):
+        current: list[str] = []
+        for line in paragraph.strip("\n").splitlines():
+            if current and _LIST_ITEM.match(line):
+                blocks.append(current)
+                current = []
+            current.append(line.rstrip())
+        if current:
+            blocks.append(current)
+    return ["\n".join(block) for block in blocks if "".join(block).strip()]
+
+
+def _split_oversized(block: str, max_tokens: int) -> list[str]:
+    """Break a block that exceeds ``max_tokens`` at sentence, then word, boundaries."""
+    max_chars = max(max_tokens * CHARS_PER_TOKEN, 1)
+    pieces: list[str] = []
+    for sentence in _SENTENCE_END.split(block):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut].rstrip())
+            sentence = sentence[cut:].lstrip()
+        pieces.append(sentence)
+    return pieces
+
+
+def pack_blocks(blocks: Sequence[str], max_tokens: int) -> list[str]:
+    """Greedily join consecutive blocks into pieces of at most ``max_tokens``."""
+    pieces: list[str] = []
+    current = ""
+    used = 0
+    for block in blocks:
+        if estimate_text_tokens(block) > max_tokens:
+            # Sentences of one paragraph are rejoined with spaces, blocks with newlines.
+            parts = _split_oversized(block, max_tokens)
+            separators = ["\n"] + [" "] * (len(parts) - 1)
+        else:
+            parts, separators = [block], ["\n"]
+        for part, separator in zip(parts, separators):
+            cost = estimate_text_tokens(part) + 1
+            if current and used + cost > max_tokens:
+                pieces.append(current)
+                current, used = "", 0
+            current = f"{current}{separator}{part}" if current else part
+            used += cost
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_markdown(markdown: str, max_tokens: int = 256) -> list[dict[str, Any]]:
+    """Split ``markdown`` into chunks of at most roughly ``max_tokens`` tokens.
+
+    Args:
+        markdown: The knowledge-base document.
+        max_tokens: The token cap per chunk, including its breadcrumb.
+
+    Returns:
+        Documents with ``page_content`` (breadcrumb line followed by the text),
+        ``breadcrumbs`` (the heading path), ``heading`` (the innermost heading)
+        and ``tokens`` (the estimated size of ``page_content``).
+    """
+    chunks = []
+    for section in iter_sections(markdown):
+        breadcrumbs = [heading for heading in section.path if heading]
+        breadcrumb = BREADCRUMB_SEPARATOR.join(breadcrumbs)
+        budget = max(max_tokens - estimate_text_tokens(breadcrumb) - 1, 1)
+        for piece in pack_blocks(split_blocks(section.body), budget):
+            page_content = f"{breadcrumb}\n{piece}" if breadcrumb else piece
+            chunks.append(
+                {
+                    "page_content": page_content,
+                    "breadcrumbs": breadcrumbs,
+                    "heading": breadcrumbs[-1] if breadcrumbs else "",
+                    "tokens": estimate_text_tokens(page_content),
+                }
+            )
+    return chunks
+
+
+def select_within_budget(
+    results: Sequence[dict[str, Any]], token_budget: int
+) -> list[dict[str, Any]]:
+    """Keep ranked results, best first, while their combined size fits ``token_budget``.
+
+    The best result is always kept. Lower-ranked chunks that do not fit are
+    skipped in favour of smaller ones further down the ranking.
+    """
+    selected: list[dict[str, Any]] = []
+    used = 0
+    for result in results:
+        tokens = result.get("tokens")
+        if tokens is None:
+            tokens = estimate_text_tokens(result["page_content"])
+        if selected and used + tokens > token_budget:
+            continue
+        selected.append(result)
+        used += tokens
+    return selected
@@ -2,13 +2,36 @@
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass, field, fields
-from typing import Annotated, Optional
+from typing import Annotated, Any, Optional
 
 from langchain_core.runnables import RunnableConfig, ensure_config
 
 from react_agent import prompts
 
+# Where LangGraph passes the run's ``Runtime``, whose ``context`` holds the settings.
+_RUNTIME_KEY = "__pregel_runtime"
+
+
+def _env_field(name: str, default: Any) -> Any:
+    """Declare a field whose deployment-wide default can be set from the environment.
+
+    The value of the environment variable is cast to the type of ``default``.
+    """
+
+    def factory() -> Any:
+        raw = os.environ.get(name)
+        if raw is None:
+            return default
+        if isinstance(default, bool):
+            return raw.strip().lower() in ("1", "true", "yes", "on")
+        if default is None:
+            return raw
+        return type(default)(raw)
+
+    return field(default_factory=factory)
+
 
 @dataclass(kw_only=True)
 class Configuration:
@@ -17,12 +40,125 @@ class Configuration:
     name: str = field(default=None)
     account_id: str = field(default=None)
 
+    embedding_model: str = _env_field("EMBEDDING_MODEL", "text-embedding-3-small")
+    embedding_cache_dir: str = _env_field(
+        "EMBEDDING_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "react_agent", "embeddings"),
+    )
+    embedding_dtype: str = _env_field("EMBEDDING_DTYPE", "float32")
+    vector_index: str = _env_field("VECTOR_INDEX", "exact")
+    ivf_lists: int = _env_field("IVF_LISTS", 0)
+    ivf_probe: int = _env_field("IVF_PROBE", 8)
+    embedding_batch_window_ms: float = _env_field("EMBEDDING_BATCH_WINDOW_MS", 5.0)
+    embedding_batch_max_items: int = _env_field("EMBEDDING_BATCH_MAX_ITEMS", 64)
+    query_cache_size: int = _env_field("QUERY_CACHE_SIZE", 1024)
+    query_cache_ttl_seconds: float = _env_field("QUERY_CACHE_TTL_SECONDS", 3600.0)
+    query_cache_path: str = _env_field("QUERY_CACHE_PATH", "")
+    hybrid_retrieval: bool = _env_field("HYBRID_RETRIEVAL", True)
+    lexical_min_score: float = _env_field("LEXICAL_MIN_SCORE", 4.0)
+    lexical_margin: float = _env_field("LEXICAL_MARGIN", 1.5)
+    kb_path: str = _env_field("KB_PATH", "")
+    kb_reload_interval_seconds: float = _env_field("KB_RELOAD_INTERVAL_SECONDS", 30.0)
+    kb_chunk_max_tokens: int = _env_field("KB_CHUNK_MAX_TOKENS", 256)
+    kb_max_chunks: int = _env_field("KB_MAX_CHUNKS", 6)
+    kb_result_token_budget: int = _env_field("KB_RESULT_TOKEN_BUDGET", 500)
+    kb_prefetch: bool = _env_field("KB_PREFETCH", False)
+
+    fast_router: bool = _env_field("FAST_ROUTER", False)
+    fast_router_embeddings: bool = _env_field("FAST_ROUTER_EMBEDDINGS", True)
+    fast_router_min_similarity: float = _env_field("FAST_ROUTER_MIN_SIMILARITY", 0.55)
+    fast_router_min_margin: float = _env_field("FAST_ROUTER_MIN_MARGIN", 0.05)
+
+    answer_cache: bool = _env_field("ANSWER_CACHE", False)
+    answer_cache_size: int = _env_field("ANSWER_CACHE_SIZE", 512)
+    answer_cache_ttl_seconds: float = _env_field("ANSWER_CACHE_TTL_SECONDS", 3600.0)
+    answer_cache_min_similarity: float = _env_field("ANSWER_CACHE_MIN_SIMILARITY", 0.95)
+
+    prompt_time_granularity_seconds: int = _env_field("PROMPT_TIME_GRANULARITY_SECONDS", 300)
+
+    model: str = _env_field("MODEL", "claude-3-5-sonnet-20241022")
+    fast_model: str = _env_field("FAST_MODEL", "claude-3-haiku-20240307")
+    model_tiering: bool = _env_field("MODEL_TIERING", False)
+    fast_model_max_words: int = _env_field("FAST_MODEL_MAX_WORDS", 40)
+    fast_model_max_turns: int = _env_field("FAST_MODEL_MAX_TURNS", 3)
+    hedged_requests: bool = _env_field("HEDGED_REQUESTS", False)
+    hedge_percentile: float = _env_field("HEDGE_PERCENTILE", 95.0)
+    hedge_initial_delay_seconds: float = _env_field("HEDGE_INITIAL_DELAY_SECONDS", 5.0)
+    hedge_min_samples: int = _env_field("HEDGE_MIN_SAMPLES", 20)
+
+    metrics_port: int = _env_field("METRICS_PORT", 0)
+    metrics_host: str = _env_field("METRICS_HOST", "127.0.0.1")
+    model_input_usd_per_mtok: float = _env_field("MODEL_INPUT_USD_PER_MTOK", 3.0)
+    model_output_usd_per_mtok: float = _env_field("MODEL_OUTPUT_USD_PER_MTOK", 15.0)
+    model_cache_read_usd_per_mtok: float = _env_field("MODEL_CACHE_READ_USD_PER_MTOK", 0.3)
+    model_cache_write_usd_per_mtok: float = _env_field("MODEL_CACHE_WRITE_USD_PER_MTOK", 3.75)
+    fast_model_input_usd_per_mtok: float = _env_field("FAST_MODEL_INPUT_USD_PER_MTOK", 0.25)
+    fast_model_output_usd_per_mtok: float = _env_field("FAST_MODEL_OUTPUT_USD_PER_MTOK", 1.25)
+    fast_model_cache_read_usd_per_mtok: float = _env_field(
+        "FAST_MODEL_CACHE_READ_USD_PER_MTOK", 0.03
+    )
+    fast_model_cache_write_usd_per_mtok: float = _env_field(
+        "FAST_MODEL_CACHE_WRITE_USD_PER_MTOK", 0.3
+    )
+
+    retry_max_attempts: int = _env_field("RETRY_MAX_ATTEMPTS", 3)
+    retry_initial_backoff_seconds: float = _env_field("RETRY_INITIAL_BACKOFF_SECONDS", 0.5)
+    retry_max_backoff_seconds: float = _env_field("RETRY_MAX_BACKOFF_SECONDS", 4.0)
+    retry_jitter: float = _env_field("RETRY_JITTER", 0.5)
+    turn_latency_budget_seconds: float = _env_field("TURN_LATENCY_BUDGET_SECONDS", 60.0)
+
+    context_max_tokens: int = _env_field("CONTEXT_MAX_TOKENS", 6000)
+    context_keep_recent_turns: int = _env_field("CONTEXT_KEEP_RECENT_TURNS", 1)
+    context_compacted_tool_chars: int = _env_field("CONTEXT_COMPACTED_TOOL_CHARS", 300)
+    context_summary_max_chars: int = _env_field("CONTEXT_SUMMARY_MAX_CHARS", 2000)
+    context_refill_fraction: float = _env_field("CONTEXT_REFILL_FRACTION", 0.5)
+
+    checkpointer: str = _env_field("CHECKPOINTER", "none")
+    checkpoint_path: str = _env_field(
+        "CHECKPOINT_PATH",
+        os.path.join(os.path.expanduser("~"), ".cache", "react_agent", "checkpoints.sqlite"),
+    )
+    checkpoint_pool_size: int = _env_field("CHECKPOINT_POOL_SIZE", 4)
+    checkpoint_max_per_thread: int = _env_field("CHECKPOINT_MAX_PER_THREAD", 20)
+
+    profile_backend: str = _env_field("PROFILE_BACKEND", "none")
+    profile_db_path: str = _env_field(
+        "PROFILE_DB_PATH",
+        os.path.join(os.path.expanduser("~"), ".cache", "react_agent", "profiles.sqlite"),
+    )
+    profile_cache_ttl_seconds: float = _env_field("PROFILE_CACHE_TTL_SECONDS", 900.0)
+    profile_cache_size: int = _env_field("PROFILE_CACHE_SIZE", 10000)
+    profile_batch_size: int = _env_field("PROFILE_BATCH_SIZE", 64)
+    profile_batch_delay_seconds: float = _env_field("PROFILE_BATCH_DELAY_SECONDS", 0.005)
+
+    handoff_backend: str = _env_field("HANDOFF_BACKEND", "memory")
+    handoff_db_path: str = _env_field(
+        "HANDOFF_DB_PATH",
+        os.path.join(os.path.expanduser("~"), ".cache", "react_agent", "handoffs.sqlite"),
+    )
+    handoff_capacity: int = _env_field("HANDOFF_CAPACITY", 1000)
+    handoff_enqueue_timeout_seconds: float = _env_field("HANDOFF_ENQUEUE_TIMEOUT_SECONDS", 2.0)
+    handoff_notify_batch_size: int = _env_field("HANDOFF_NOTIFY_BATCH_SIZE", 20)
+    handoff_notify_interval_seconds: float = _env_field("HANDOFF_NOTIFY_INTERVAL_SECONDS", 5.0)
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
     ) -> Configuration:
-        """Create a Configuration instance from a RunnableConfig object."""
+        """Create a Configuration instance from a RunnableConfig object.
+
+        Inside a graph run, the run's ``context`` (see the graph's
+        ``context_schema``) provides the values; ``configurable`` keys override
+        them, so callers that still pass settings there keep working.
+        """
         config = ensure_config(config)
         configurable = config.get("configurable") or {}
         _fields = {f.name for f in fields(cls) if f.init}
-        return cls(**{k: v for k, v in configurable.items() if k in _fields})
+        values: dict[str, Any] = {}
+        context = getattr(configurable.get(_RUNTIME_KEY), "context", None)
+        if isinstance(context, cls):
+            values = {name: getattr(context, name) for name in _fields}
+        elif isinstance(context, dict):
+            values = {k: v for k, v in context.items() if k in _fields}
+        values.update((k, v) for k, v in configurable.items() if k in _fields)
+        return cls(**values)
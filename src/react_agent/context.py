@@ -0,0 +1,195 @@
+"""Fit the conversation history into a token budget before each model call.
+
+The full history stays in the graph state. What the primary assistant sees is
+a window of the most recent turns that fits ``context_max_tokens``; older turns
+are folded into a rolling summary kept in ``State.conversation_summary``, and
+tool results outside the most recent turns are shortened.
+
+The window only moves when it overflows the budget, and then in one step: it
+is refilled to ``context_refill_fraction`` of the budget, and tool results are
+shortened in every turn but the most recent ones at that moment. Between two
+steps, each prompt extends the previous one, so the provider's cached history
+prefix (see :mod:`react_agent.assistant`) keeps being read back.
+
+A turn starts at a user message, so an AI tool call and the tool messages that
+answer it are always kept or dropped together.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import NamedTuple, Optional, Sequence
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+from react_agent.configuration import Configuration
+from react_agent.utils import get_message_text
+
+# A rough but cheap estimate: English text averages about four characters per token.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass(frozen=True)
+class ContextPolicy:
+    """How much history to send to the model."""
+
+    max_tokens: int = 6000
+    keep_recent_turns: int = 1
+    compacted_tool_chars: int = 300
+    summary_max_chars: int = 2000
+    summary_line_chars: int = 200
+    refill_fraction: float = 0.5
+
+    @classmethod
+    def from_runnable_config(cls, config: Optional[RunnableConfig] = None) -> ContextPolicy:
+        """Read the policy from the ``context_*`` configuration fields."""
+        configuration = Configuration.from_runnable_config(config)
+        return cls(
+            max_tokens=configuration.context_max_tokens,
+            keep_recent_turns=configuration.context_keep_recent_turns,
+            compacted_tool_chars=configuration.context_compacted_tool_chars,
+            summary_max_chars=configuration.context_summary_max_chars,
+            refill_fraction=configuration.context_refill_fraction,
+        )
+
+
+class ContextWindow(NamedTuple):
+    """The messages to send to the model and the updated rolling summary.
+
+    ``summarized_through`` and ``compacted_through`` are the ids of the last
+    message folded into the summary and of the last message whose turn has its
+    tool results shortened.
+    """
+
+    messages: list[AnyMessage]
+    summary: str
+    summarized_through: Optional[str]
+    compacted_through: Optional[str] = None
+
+
+def estimate_tokens(message: AnyMessage) -> int:
+    """Estimate the number of prompt tokens a message costs."""
+    size = len(get_message_text(message))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        size += sum(len(json.dumps(tc["args"])) + len(tc["name"]) for tc in message.tool_calls)
+    return size // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def split_turns(messages: Sequence[AnyMessage]) -> list[list[AnyMessage]]:
+    """Group messages into turns, each starting at a user message."""
+    turns: list[list[AnyMessage]] = []
+    for message in messages:
+        if not turns or isinstance(message, HumanMessage):
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def compact_tool_message(message: ToolMessage, max_chars: int) -> ToolMessage:
+    """Shorten a tool result that is no longer part of the current exchange."""
+    text = get_message_text(message)
+    if len(text) <= max_chars:
+        return message
+    return message.model_copy(
+        update={"content": text[:max_chars].rstrip() + " ... [truncated]"}
+    )
+
+
+def summarize_turns(turns: Sequence[Sequence[AnyMessage]], line_chars: int) -> list[str]:
+    """Extract one short line per user message, answer and handoff in ``turns``.
+
+    Tool results are left out; they are knowledge-base dumps the model can
+    fetch again.
+    """
+    lines = []
+    for turn in turns:
+        for message in turn:
+            if isinstance(message, HumanMessage):
+                role = "User"
+            elif isinstance(message, AIMessage):
+                for call in message.tool_calls:
+                    if call["name"] == "ToHumanAssistant":
+                        lines.append("Assistant handed the conversation off to a human.")
+                role = "Assistant"
+            else:
+                continue
+            text = " ".join(get_message_text(message).split())
+            if text:
+                if len(text) > line_chars:
+                    text = text[:line_chars].rstrip() + "..."
+                lines.append(f"{role}: {text}")
+    return lines
+
+
+def _turn_after(turns: Sequence[Sequence[AnyMessage]], message_id: Optional[str]) -> int:
+    """Return the index of the turn following the one that contains ``message_id``, or 0."""
+    if message_id is not None:
+        for i, turn in enumerate(turns):
+            if any(m.id == message_id for m in turn):
+                return i + 1
+    return 0
+
+
+def fit_context(
+    messages: Sequence[AnyMessage],
+    policy: ContextPolicy,
+    summary: str = "",
+    summarized_through: Optional[str] = None,
+    compacted_through: Optional[str] = None,
+) -> ContextWindow:
+    """Select the recent turns that fit the token budget and roll older ones into the summary."""
+    if policy.max_tokens <= 0:
+        return ContextWindow(list(messages), summary, summarized_through, compacted_through)
+
+    turns = split_turns(messages)
+    # Turns already folded into the summary never come back into the window.
+    floor = max(min(_turn_after(turns, summarized_through), len(turns) - 1), 0)
+    compacted = _turn_after(turns, compacted_through)
+
+    def shortened(end: int) -> list[list[AnyMessage]]:
+        return [
+            [
+                compact_tool_message(m, policy.compacted_tool_chars)
+                if isinstance(m, ToolMessage) and i < end
+                else m
+                for m in turn
+            ]
+            for i, turn in enumerate(turns)
+        ]
+
+    budget = policy.max_tokens - len(summary) // CHARS_PER_TOKEN
+    window = shortened(compacted)
+    if sum(estimate_tokens(m) for turn in window[floor:] for m in turn) <= budget:
+        kept = [m for turn in window[floor:] for m in turn]
+        return ContextWindow(kept, summary, summarized_through, compacted_through)
+
+    # Overflow: shorten the older tool results, then keep the latest turn and add
+    # older ones while they fit the refill target.
+    compacted = max(compacted, len(turns) - policy.keep_recent_turns)
+    window = shortened(compacted)
+    target = budget * policy.refill_fraction
+    start = len(turns)
+    used = 0
+    while start > floor:
+        cost = sum(estimate_tokens(m) for m in window[start - 1])
+        if start < len(turns) and used + cost > target:
+            break
+        used += cost
+        start -= 1
+
+    new_turns = turns[floor:start]
+    if new_turns:
+        lines = summarize_turns(new_turns, policy.summary_line_chars)
+        summary = "\n".join(filter(None, [summary, *lines]))
+        if len(summary) > policy.summary_max_chars:
+            summary = summary[-policy.summary_max_chars :]
+            summary = summary[summary.find("\n") + 1 :]
+        summarized_through = new_turns[-1][-1].id
+    if compacted > 0:
+        compacted_through = turns[compacted - 1][-1].id
+
+    kept = [m for turn in window[start:] for m in turn]
+    return ContextWindow(kept, summary, summarized_through, compacted_through)
@@ -0,0 +1,121 @@
+"""Coalesce concurrent query embeddings into batched requests.
+
+Every conversation that looks something up needs one query embedding. Under
+load, sending each of them as its own request means many tiny HTTP calls and
+rate-limit pressure. :class:`EmbeddingBatcher` holds texts for at most
+``max_delay`` seconds, or until ``max_batch`` texts are waiting, then embeds
+them with a single request and hands each caller its own vector. Identical
+texts waiting in the same window are embedded once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from typing import Any, Optional, Sequence
+
+from react_agent import metrics
+
+batch_size = metrics.histogram(
+    "embedding_batch_size",
+    "Texts per batched embeddings request.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+queue_delay = metrics.histogram(
+    "embedding_batch_queue_seconds",
+    "Time a text waited for its batch to be sent.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+class _Window:
+    """The texts waiting to be embedded on one event loop."""
+
+    def __init__(self) -> None:
+        self.pending: dict[str, asyncio.Future[list[float]]] = {}
+        self.enqueued: dict[str, float] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbeddingBatcher:
+    """Batch concurrent embedding requests made on the same event loop.
+
+    Args:
+        client: An OpenAI-compatible async client.
+        model: The embedding model.
+        max_batch: Send as soon as this many distinct texts are waiting.
+        max_delay: Send at most this many seconds after the first text arrived.
+    """
+
+    def __init__(self, client: Any, model: str, max_batch: int = 64, max_delay: float = 0.005):
+        """Create a batcher with no requests waiting."""
+        self.client = client
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._windows: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Window] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._requests: set[asyncio.Task[None]] = set()
+
+    async def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        """Embed ``texts``, sharing a request with other callers in the same window."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        window = self._windows.get(loop)
+        if window is None:
+            window = self._windows[loop] = _Window()
+        futures = []
+        for text in texts:
+            future = window.pending.get(text)
+            if future is None:
+                future = window.pending[text] = loop.create_future()
+                window.enqueued[text] = time.perf_counter()
+                if len(window.pending) >= self.max_batch:
+                    self._flush(window)
+                elif window.timer is None:
+                    window.timer = loop.call_later(self.max_delay, self._flush, window)
+            futures.append(future)
+        # Shield the shared futures: one caller giving up must not cancel the others.
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def _flush(self, window: _Window) -> None:
+        if window.timer is not None:
+            window.timer.cancel()
+            window.timer = None
+        pending, enqueued = window.pending, window.enqueued
+        window.pending, window.enqueued = {}, {}
+        if pending:
+            task = asyncio.ensure_future(self._send(pending, enqueued))
+            self._requests.add(task)
+            task.add_done_callback(self._requests.discard)
+
+    async def _send(
+        self, pending: dict[str, asyncio.Future[list[float]]], enqueued: dict[str, float]
+    ) -> None:
+        sent = time.perf_counter()
+        batch_size.observe(len(pending))
+        for started in enqueued.values():
+            queue_delay.observe(sent - started)
+        futures = list(pending.values())
+        error: Optional[Exception] = None
+        try:
+            response = await self.client.embeddings.create(model=self.model, input=list(pending))
+            if len(response.data) != len(futures):
+                raise ValueError(
+                    f"Embeddings response has {len(response.data)} rows for {len(futures)} inputs"
+                )
+            for item in response.data:
+                future = futures[item.index]
+                if not future.done():
+                    future.set_result(item.embedding)
+        except Exception as e:
+            error = e
+        # No caller may wait forever, even on a malformed response.
+        for future in futures:
+            if not future.done():
+                future.set_exception(
+                    error or ValueError("Embeddings response has no row for this input")
+                )
@@ -0,0 +1,295 @@
+"""Persistent caches for knowledge-base embeddings."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Any, Callable, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# OpenAI accepts at most 2048 inputs per embeddings request.
+MAX_EMBEDDING_BATCH = 2048
+
+
+def content_key(model: str, text: str) -> str:
+    """Return the cache key for ``text`` embedded with ``model``."""
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+def embed_texts(client: Any, model: str, texts: Sequence[str]) -> np.ndarray:
+    """Embed ``texts`` with an OpenAI-compatible client, batching large inputs."""
+    rows: list[list[float]] = []
+    for start in range(0, len(texts), MAX_EMBEDDING_BATCH):
+        batch = list(texts[start : start + MAX_EMBEDDING_BATCH])
+        response = client.embeddings.create(model=model, input=batch)
+        rows.extend(emb.embedding for emb in response.data)
+    return np.asarray(rows, dtype=np.float32)
+
+
+def _digest(matrix: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(matrix).data).hexdigest()
+
+
+class EmbeddingStore:
+    """Content-addressed, on-disk store of document embeddings.
+
+    Vectors are kept in a ``.npy`` matrix that is memory-mapped on load, next to
+    a JSON manifest that maps each row to the hash of the model name and the
+    text it embeds, and records a digest of the matrix it describes. Loading the
+    same documents again costs no API calls; when sections are added or edited
+    only those sections are sent to the API.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike[str]], model: str):
+        """Keep the vectors of ``model`` in ``directory``."""
+        self.directory = Path(directory)
+        self.model = model
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+        self._matrix_path = self.directory / f"{slug}.npy"
+        self._manifest_path = self.directory / f"{slug}.json"
+
+    def load(self) -> tuple[list[str], Optional[np.ndarray]]:
+        """Return the stored keys and a read-only memory map of their vectors."""
+        try:
+            manifest = json.loads(self._manifest_path.read_text())
+            matrix = np.load(self._matrix_path, mmap_mode="r")
+        except FileNotFoundError:
+            return [], None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable embedding store %s: %r", self.directory, e)
+            return [], None
+        keys = manifest.get("keys", [])
+        if (
+            manifest.get("model") != self.model
+            or matrix.ndim != 2
+            or len(keys) != len(matrix)
+            or manifest.get("sha256") != _digest(matrix)
+        ):
+            logger.warning("Ignoring inconsistent embedding store %s", self.directory)
+            return [], None
+        return keys, matrix
+
+    def save(self, keys: Sequence[str], matrix: np.ndarray) -> None:
+        """Replace the stored vectors with ``matrix``.
+
+        Concurrent writers each write their own temporary files, but the matrix
+        and the manifest are replaced one after the other: :meth:`load` checks
+        the manifest's digest so that it never pairs one writer's keys with
+        another's vectors.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        manifest = {"model": self.model, "keys": list(keys), "sha256": _digest(matrix)}
+        tmp_matrix = self._write_temp(self._matrix_path, lambda f: np.save(f, matrix))
+        try:
+            tmp_manifest = self._write_temp(
+                self._manifest_path, lambda f: f.write(json.dumps(manifest).encode())
+            )
+        except BaseException:
+            os.remove(tmp_matrix)
+            raise
+        os.replace(tmp_matrix, self._matrix_path)
+        os.replace(tmp_manifest, self._manifest_path)
+
+    def _write_temp(self, target: Path, write: Callable[[IO[bytes]], Any]) -> str:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{target.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return tmp
+
+    def embed_documents(self, texts: Sequence[str], client: Any) -> np.ndarray:
+        """Return one embedding row per text, embedding only texts not yet stored."""
+        keys = [content_key(self.model, text) for text in texts]
+        stored_keys, stored = self.load()
+        if stored is not None and stored_keys == keys:
+            return stored
+
+        rows = {key: i for i, key in enumerate(stored_keys)}
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in rows:
+                missing.setdefault(key, text)
+
+        fresh = embed_texts(client, self.model, list(missing.values())) if missing else None
+        if stored is not None:
+            dim = stored.shape[1]
+        elif fresh is not None:
+            dim = fresh.shape[1]
+        else:
+            return np.empty((0, 0), dtype=np.float32)
+
+        fresh_rows = {key: i for i, key in enumerate(missing)}
+        matrix = np.empty((len(keys), dim), dtype=np.float32)
+        for i, key in enumerate(keys):
+            if fresh is not None and key in fresh_rows:
+                matrix[i] = fresh[fresh_rows[key]]
+            elif stored is not None:
+                matrix[i] = stored[rows[key]]
+        logger.info(
+            "Embedded %d of %d knowledge-base sections with %s",
+            len(missing),
+            len(keys),
+            self.model,
+        )
+        try:
+            self.save(keys, matrix)
+        except OSError as e:
+            logger.warning("Could not persist embedding store %s: %r", self.directory, e)
+        return matrix
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a user query so that trivially different spellings share a cache entry."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" \t\n?!.,;:")
+
+
+class SQLiteEmbeddingTier:
+    """A shared, on-disk tier for :class:`QueryEmbeddingCache`.
+
+    Every worker process on the host can point at the same database file, so a
+    query embedded by one worker is a cache hit for all of them.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]], ttl: Optional[float] = None):
+        """Open or create the database at ``path``; ``ttl`` limits how long rows are served."""
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the stored vector for ``key``, if any and not expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        vector, created = row
+        if self.ttl is not None and time.time() - created > self.ttl:
+            return None
+        return np.frombuffer(vector, dtype=np.float32)
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        """Store ``vector`` under ``key``."""
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, created) VALUES (?, ?, ?)",
+                (key, blob, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """A bounded LRU cache of query embeddings with a time-to-live.
+
+    Keys are the embedding model plus the normalized query text. An optional
+    :class:`SQLiteEmbeddingTier` is consulted on a miss and filled on insert.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = 3600.0,
+        tier: Optional[SQLiteEmbeddingTier] = None,
+    ):
+        """Create an empty cache; ``tier`` is consulted on a miss and filled on insert."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.tier = tier
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tier_hits = 0
+
+    @staticmethod
+    def key(model: str, query: str) -> str:
+        """Return the cache key for ``query`` embedded with ``model``."""
+        return content_key(model, normalize_query(query))
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding of ``query``, or ``None`` on a miss."""
+        key = self.key(model, query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, cached = entry
+                if self.ttl is None or now - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return cached
+                del self._entries[key]
+        vector = self.tier.get(key) if self.tier is not None else None
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tier_hits += 1
+            self._insert(key, vector, now)
+        return vector
+
+    def put(self, model: str, query: str, vector: np.ndarray) -> None:
+        """Cache the embedding of ``query``."""
+        key = self.key(model, query)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._insert(key, vector, time.monotonic())
+        if self.tier is not None:
+            self.tier.put(key, vector)
+
+    def _insert(self, key: str, vector: np.ndarray, created: float) -> None:
+        self._entries[key] = (created, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tier_hits": self.tier_hits,
+                "size": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        """Drop every in-memory entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.tier_hits = 0
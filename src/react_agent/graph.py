@@ -1,145 +1,146 @@
-import json
-from typing import Callable, Literal
+from typing import Any, Callable, Literal, Optional, Sequence, Union
 
-from langchain_core.messages import ToolMessage, AIMessage
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import StateGraph,  END, START
+from langchain_core.messages import AIMessage, ToolCall, ToolMessage
+from langchain_core.runnables import Runnable
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import tools_condition
 
-from react_agent.assistant import *
+from react_agent import registry
+from react_agent.assistant import (
+    Assistant,
+    ToHumanAssistant,
+    assistant_runnable_resource,
+    fast_assistant_runnable_resource,
+    primary_assistant_tools,
+)
+from react_agent.checkpoint import create_checkpointer
 from react_agent.configuration import Configuration
+from react_agent.handoff import human_assistant
+from react_agent.profiles import fetch_user_info_node
+from react_agent.router import pre_router
 from react_agent.state import InputState, State
-from react_agent.utils import create_tool_node_with_fallback, get_message_text
-
-builder = StateGraph(State, input=InputState, config_schema=Configuration)
-
-def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
-    def entry_node(state: State) -> dict:
-        tool_call_id = state["messages"][-1].tool_calls[0]["id"]
-        return {
-            "messages": [
-                ToolMessage(
-                    content=f"The assistant is now the {assistant_name}. Reflect on the above conversation between the host assistant and the user."
-                    f" The user's intent is unsatisfied. Use the provided tools to assist the user. Remember, you are {assistant_name},"
-                    " and the booking, update, other other action is not complete until after you have successfully invoked the appropriate tool."
-                    " If the user changes their mind or needs help for other tasks, call the CompleteOrEscalate tool to let the primary host assistant take control."
-                    " Do not mention who you are - just act as the proxy for the assistant.",
-                    tool_call_id=tool_call_id,
-                )
-            ],
-            "dialog_state": new_dialog_state,
-        }
+from react_agent.telemetry import instrument, metrics_endpoint
+from react_agent.tools.lookup_knowledge_base import (
+    batched_lookups,
+    lookup_knowledge_base,
+)
+from react_agent.utils import create_tool_node_with_fallback
 
-    return entry_node
 
+def create_entry_node(
+    assistant_name: str, new_dialog_state: str, tool_name: Optional[str] = None
+) -> Callable[[State], dict[str, Any]]:
+    """Build the node that hands the dialog to a specialized assistant.
 
-def user_info(state: State, config: RunnableConfig) -> State:
-    configurable = Configuration.from_runnable_config(config)
-    user_info = {"email":configurable.email, "name":configurable.name, "account_id":configurable.account_id}
-    return {"user_info": json.dumps(user_info)}
-
-
-def human_assistant(state: State, config: RunnableConfig) -> State:
-    if get_message_text(state["messages"][-1]).__contains__("no thanks"):
-        return {
-            "messages": [
-                AIMessage(
-                    content= "Bye, Have a great day!",
-                    tool_calls= [
-                        {
-                        "name": "CompleteOrEscalate",
-                        "args": { "cancel": False },
-                        "id": "tool_call_id",
-                        "type": "tool_call",
-                        },
-                    ]
-                ),
-            ]
-        }
-    else:
-        return {"messages": [AIMessage("How can I help you")]}
+    The first call to ``tool_name`` (by default, the first call) is answered
+    with the hand-over instructions. The handoff takes precedence over any
+    other call in the same message, and each of those is answered as not run,
+    so that every tool call has its ``ToolMessage``.
+    """
 
+    def entry_node(state: State) -> dict[str, Any]:
+        tool_calls = _tool_calls(state)
+        handoff = next(
+            (call for call in tool_calls if tool_name is None or call["name"] == tool_name),
+            tool_calls[0],
+        )
+        instructions = (
+            f"The assistant is now the {assistant_name}. Reflect on the above conversation between the host assistant and the user."
+            f" The user's intent is unsatisfied. Use the provided tools to assist the user. Remember, you are {assistant_name},"
+            " and the booking, update, other other action is not complete until after you have successfully invoked the appropriate tool."
+            " If the user changes their mind or needs help for other tasks, call the CompleteOrEscalate tool to let the primary host assistant take control."
+            " Do not mention who you are - just act as the proxy for the assistant."
+        )
+        not_run = f"Not run: the conversation was handed over to the {assistant_name}."
+        messages = [
+            ToolMessage(
+                content=instructions if call is handoff else not_run,
+                tool_call_id=call["id"],
+            )
+            for call in tool_calls
+        ]
+        return {"messages": messages, "dialog_state": new_dialog_state}
 
-builder.add_node("fetch_user_info", user_info)
-builder.add_edge(START, "fetch_user_info")
+    return entry_node
 
-# Flight booking assistant
-builder.add_node(
-    "enter_human_assistant",
-    create_entry_node("Human Assistant", "human_assistant"),
-)
 
-builder.add_node("human_assistant", human_assistant)
-builder.add_edge("enter_human_assistant", "human_assistant")
+def _tool_calls(state: State) -> list[ToolCall]:
+    last = state["messages"][-1]
+    return last.tool_calls if isinstance(last, AIMessage) else []
+
 
 # This node will be shared for exiting all specialized assistants
-def pop_dialog_state(state: State) -> dict:
+def pop_dialog_state(state: State) -> dict[str, Any]:
     """Pop the dialog stack and return to the main assistant.
 
     This lets the full graph explicitly track the dialog flow and delegate control
     to specific sub-graphs.
     """
-    messages = []
-    if state["messages"][-1].tool_calls:
-        # Note: Doesn't currently handle the edge case where the llm performs parallel tool calls
-        messages.append(
-            ToolMessage(
-                content="Resuming dialog with the host assistant. Please reflect on the past conversation and assist the user as needed.",
-                tool_call_id=state["messages"][-1].tool_calls[0]["id"],
-            )
+    messages = [
+        ToolMessage(
+            content="Resuming dialog with the host assistant. Please reflect on the past conversation and assist the user as needed.",
+            tool_call_id=call["id"],
         )
+        for call in _tool_calls(state)
+    ]
     return {
         "dialog_state": "pop",
         "messages": messages,
     }
 
 
-builder.add_node("leave_skill", pop_dialog_state)
-
 def route_from_human(
     state: State,
 ) -> Literal[
     "leave_skill",
     "__end__",
 ]:
-    if state["messages"][-1].tool_calls:
+    """Leave the human assistant once it calls a tool, or end the turn."""
+    if _tool_calls(state):
         return "leave_skill"
-    else: 
+    else:
         return "__end__"
 
-builder.add_edge("leave_skill", "primary_assistant")
-builder.add_conditional_edges("human_assistant", route_from_human)
 
-# Primary assistant
-builder.add_node("primary_assistant", Assistant(assistant_runnable))
-builder.add_node(
-    "primary_assistant_tools", create_tool_node_with_fallback(primary_assistant_tools)
-)
+def _route_tool_calls(
+    tool_calls: Sequence[ToolCall],
+) -> Literal["enter_human_assistant", "primary_assistant_tools"]:
+    # A handoff wins over lookups asked for in the same message.
+    if any(call["name"] == ToHumanAssistant.__name__ for call in tool_calls):
+        return "enter_human_assistant"
+    return "primary_assistant_tools"
 
 
 def route_primary_assistant(
     state: State,
-):
-    route = tools_condition(state)
-    if route == END:
-        return END
-    tool_calls = state["messages"][-1].tool_calls
+) -> Literal[
+    "enter_human_assistant",
+    "primary_assistant_tools",
+    "__end__",
+]:
+    """Run the tools the primary assistant called, hand over, or end the turn."""
+    if tools_condition(state["messages"]) == END:
+        return "__end__"
+    tool_calls = _tool_calls(state)
     if tool_calls:
-        if tool_calls[0]["name"] == ToHumanAssistant.__name__:
-            return "enter_human_assistant"
-        return "primary_assistant_tools"
+        return _route_tool_calls(tool_calls)
     raise ValueError("Invalid route")
 
-builder.add_conditional_edges(
+
+def route_pre_router(
+    state: State,
+) -> Literal[
     "primary_assistant",
-    route_primary_assistant,
-    [
-        "enter_human_assistant",
-        "primary_assistant_tools",
-        END,
-    ],
-)
-builder.add_edge("primary_assistant_tools", "primary_assistant")
+    "enter_human_assistant",
+    "primary_assistant_tools",
+]:
+    """Follow the tool call the pre-router made, or let the primary assistant decide."""
+    tool_calls = _tool_calls(state)
+    if tool_calls:
+        return _route_tool_calls(tool_calls)
+    return "primary_assistant"
+
 
 def route_to_workflow(
     state: State,
@@ -154,6 +155,87 @@ def route_to_workflow(
     return dialog_state[-1]
 
 
-builder.add_conditional_edges("fetch_user_info", route_to_workflow)
+def build_graph(
+    **compile_kwargs: Any,
+) -> CompiledStateGraph[State, Configuration, InputState, State]:
+    """Build and compile the support agent graph.
 
-support_agent_graph = builder.compile()
\ No newline at end of file
+    Nothing here talks to the network: the assistant's model and the
+    knowledge-base retriever are only built when the graph first runs them.
+    Unless a ``checkpointer`` is passed, the one selected by
+    ``Configuration.checkpointer`` is used. Every node records its wall time
+    (see :mod:`react_agent.telemetry`); with ``metrics_port`` set, the local
+    metrics endpoint is started too.
+    """
+    configuration = Configuration()
+    if "checkpointer" not in compile_kwargs:
+        compile_kwargs["checkpointer"] = create_checkpointer(configuration)
+    metrics_endpoint.get()
+    builder = StateGraph(State, input_schema=InputState, context_schema=Configuration)
+
+    def add_node(name: str, node: Union[Runnable[Any, Any], Callable[..., Any]]) -> None:
+        builder.add_node(name, instrument(name, node))
+
+    add_node("fetch_user_info", fetch_user_info_node)
+    builder.add_edge(START, "fetch_user_info")
+
+    # Flight booking assistant
+    add_node(
+        "enter_human_assistant",
+        create_entry_node("Human Assistant", "human_assistant", ToHumanAssistant.__name__),
+    )
+
+    add_node("human_assistant", human_assistant)
+    builder.add_edge("enter_human_assistant", "human_assistant")
+
+    add_node("leave_skill", pop_dialog_state)
+
+    builder.add_edge("leave_skill", "primary_assistant")
+    builder.add_conditional_edges("human_assistant", route_from_human)
+
+    # Primary assistant
+    add_node(
+        "primary_assistant",
+        Assistant(assistant_runnable_resource, fast_assistant_runnable_resource).as_runnable(
+            "primary_assistant"
+        ),
+    )
+    add_node(
+        "primary_assistant_tools",
+        create_tool_node_with_fallback(
+            primary_assistant_tools, batched={lookup_knowledge_base.name: batched_lookups}
+        ),
+    )
+
+    builder.add_conditional_edges(
+        "primary_assistant",
+        route_primary_assistant,
+        [
+            "enter_human_assistant",
+            "primary_assistant_tools",
+            END,
+        ],
+    )
+    builder.add_edge("primary_assistant_tools", "primary_assistant")
+
+    # Unambiguous handoff and FAQ requests skip the primary assistant's first model call.
+    add_node("pre_router", pre_router)
+    builder.add_conditional_edges("pre_router", route_pre_router)
+
+    builder.add_conditional_edges(
+        "fetch_user_info",
+        route_to_workflow,
+        {"primary_assistant": "pre_router", "human_assistant": "human_assistant"},
+    )
+
+    return builder.compile(**compile_kwargs)
+
+
+support_agent_graph_resource = registry.register("support_agent_graph", build_graph)
+
+
+def __getattr__(name: str) -> Any:
+    # ``support_agent_graph`` is compiled on first access rather than at import time.
+    if name == "support_agent_graph":
+        return support_agent_graph_resource.get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
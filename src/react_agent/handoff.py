@@ -0,0 +1,622 @@
+"""The queue of conversations handed over to human agents.
+
+When the primary assistant calls ``ToHumanAssistant``, the ``human_assistant``
+node puts the conversation in a :class:`HandoffQueue` and tells the user where
+they are in line:
+
+* Requests are served by user type (accounts, then leads, then visitors, as
+  classified by ``fetch_user_info``), oldest first within a type.
+* A user who escalates again while waiting (the same email, or the same
+  conversation for a visitor) updates their request instead of queueing twice.
+* The queue holds at most ``handoff_capacity`` requests. When it is full, a new
+  request waits up to ``handoff_enqueue_timeout_seconds`` for room; after that
+  the user is asked to try again later.
+* Agents are told about new requests in batches by a :class:`HandoffNotifier`:
+  at most ``handoff_notify_batch_size`` requests per notification, sent at
+  most ``handoff_notify_interval_seconds`` after the first of them arrived.
+  Agents take requests with :meth:`HandoffQueue.claim`.
+
+Waiting requests live in process memory (``handoff_backend="memory"``) or in a
+SQLite database (``"sqlite"``) shared by the worker processes of a host, so the
+queue can be load-tested without any outside service.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Union
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from react_agent import metrics, registry
+from react_agent.configuration import Configuration
+from react_agent.profiles import state_user_type
+from react_agent.state import State
+from react_agent.telemetry import log_event
+from react_agent.tools.user_info import ACCOUNT, LEAD, VISITOR
+from react_agent.utils import get_message_text
+
+logger = logging.getLogger(__name__)
+
+# Lower is served first.
+PRIORITIES = {ACCOUNT: 0, LEAD: 1, VISITOR: 2}
+
+handoff_requests = metrics.counter(
+    "handoff_requests_total",
+    "Handoff requests, by user type and outcome: queued, merged, rejected, cancelled "
+    "or claimed.",
+)
+queue_depth = metrics.gauge(
+    "handoff_queue_depth", "Requests waiting for a human agent, by user type."
+)
+wait_seconds = metrics.histogram(
+    "handoff_wait_seconds",
+    "Time from a request being queued to an agent claiming it, by user type.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+notification_batch_size = metrics.histogram(
+    "handoff_notification_batch_size",
+    "New requests announced per agent notification.",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+
+
+class HandoffQueueFull(Exception):
+    """The handoff queue has no room for another request."""
+
+
+@dataclass
+class HandoffRequest:
+    """A conversation waiting for a human agent.
+
+    ``key`` identifies the user across escalations: their email, or the
+    conversation's thread id for a visitor.
+    """
+
+    key: str
+    user_type: str
+    request: str
+    email: str = ""
+    name: str = ""
+    thread_id: str = ""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created: float = field(default_factory=time.time)
+    escalations: int = 1
+
+    @property
+    def priority(self) -> int:
+        """Rank in line: accounts first, then leads, then visitors."""
+        return PRIORITIES.get(self.user_type, len(PRIORITIES))
+
+    def merge(self, other: HandoffRequest) -> None:
+        """Fold a repeat escalation into this request; it keeps its place in line."""
+        self.escalations += 1
+        if other.request and other.request not in self.request:
+            self.request = f"{self.request}\n{other.request}" if self.request else other.request
+
+
+class Ticket(NamedTuple):
+    """Where a submitted request stands."""
+
+    request: HandoffRequest
+    position: int
+    merged: bool
+
+
+class MemoryHandoffStore:
+    """Waiting requests kept in process memory."""
+
+    def __init__(self) -> None:
+        """Create an empty store."""
+        self._waiting: dict[str, HandoffRequest] = {}
+        # (priority, created, id, key); entries of removed requests are skipped.
+        self._heap: list[tuple[int, float, str, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, request: HandoffRequest, capacity: int) -> tuple[HandoffRequest, bool]:
+        """Queue ``request`` or merge it into the one waiting with its key.
+
+        Returns:
+            The waiting request, and whether ``request`` was merged into it.
+
+        Raises:
+            HandoffQueueFull: A new request would exceed ``capacity``.
+        """
+        with self._lock:
+            waiting = self._waiting.get(request.key)
+            if waiting is not None:
+                waiting.merge(request)
+                return waiting, True
+            if len(self._waiting) >= capacity:
+                raise HandoffQueueFull
+            self._waiting[request.key] = request
+            heapq.heappush(
+                self._heap, (request.priority, request.created, request.id, request.key)
+            )
+            return request, False
+
+    def remove(self, key: str) -> Optional[HandoffRequest]:
+        """Remove and return the request waiting with ``key``, if any."""
+        with self._lock:
+            request = self._waiting.pop(key, None)
+            if len(self._heap) > 2 * len(self._waiting) + 64:
+                self._heap = [entry for entry in self._heap if self._is_live(entry)]
+                heapq.heapify(self._heap)
+            return request
+
+    def claim(self, limit: int) -> list[HandoffRequest]:
+        """Remove and return up to ``limit`` requests, first in line first."""
+        claimed: list[HandoffRequest] = []
+        with self._lock:
+            while self._heap and len(claimed) < limit:
+                entry = heapq.heappop(self._heap)
+                if self._is_live(entry):
+                    claimed.append(self._waiting.pop(entry[3]))
+        return claimed
+
+    def position(self, request: HandoffRequest) -> int:
+        """Return the request's 1-based place in line."""
+        with self._lock:
+            mine = (request.priority, request.created, request.id)
+            return sum(
+                (r.priority, r.created, r.id) <= mine for r in self._waiting.values()
+            )
+
+    def depth(self) -> dict[str, int]:
+        """Return the number of waiting requests per user type."""
+        with self._lock:
+            depth: dict[str, int] = {}
+            for request in self._waiting.values():
+                depth[request.user_type] = depth.get(request.user_type, 0) + 1
+            return depth
+
+    def _is_live(self, entry: tuple[int, float, str, str]) -> bool:
+        request = self._waiting.get(entry[3])
+        return request is not None and request.id == entry[2]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS handoffs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    user_type TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    created REAL NOT NULL,
+    request TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS handoffs_order ON handoffs (priority, created, id);
+"""
+
+
+class SQLiteHandoffStore:
+    """Waiting requests kept in SQLite, shared by the processes of one host.
+
+    Each operation is one ``BEGIN IMMEDIATE`` transaction, so concurrent
+    workers never queue the same key twice or overshoot the capacity.
+    """
+
+    def __init__(self, path: str):
+        """Open or create the database at ``path``."""
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=30.0, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add(self, request: HandoffRequest, capacity: int) -> tuple[HandoffRequest, bool]:
+        """Queue ``request`` or merge it, as :meth:`MemoryHandoffStore.add` does."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT request FROM handoffs WHERE key = ?", (request.key,)
+            ).fetchone()
+            if row is not None:
+                waiting = HandoffRequest(**json.loads(row[0]))
+                waiting.merge(request)
+                conn.execute(
+                    "UPDATE handoffs SET request = ? WHERE id = ?",
+                    (json.dumps(asdict(waiting)), waiting.id),
+                )
+                return waiting, True
+            (count,) = conn.execute("SELECT COUNT(*) FROM handoffs").fetchone()
+            if count >= capacity:
+                raise HandoffQueueFull
+            conn.execute(
+                "INSERT INTO handoffs (id, key, user_type, priority, created, request) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    request.id,
+                    request.key,
+                    request.user_type,
+                    request.priority,
+                    request.created,
+                    json.dumps(asdict(request)),
+                ),
+            )
+            return request, False
+
+    def remove(self, key: str) -> Optional[HandoffRequest]:
+        """Remove and return the request waiting with ``key``, if any."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT request FROM handoffs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM handoffs WHERE key = ?", (key,))
+            return HandoffRequest(**json.loads(row[0]))
+
+    def claim(self, limit: int) -> list[HandoffRequest]:
+        """Remove and return up to ``limit`` requests, first in line first."""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, request FROM handoffs ORDER BY priority, created, id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            conn.executemany("DELETE FROM handoffs WHERE id = ?", [(row[0],) for row in rows])
+        return [HandoffRequest(**json.loads(row[1])) for row in rows]
+
+    def position(self, request: HandoffRequest) -> int:
+        """Return the request's 1-based place in line."""
+        with self._lock:
+            (position,) = self._conn.execute(
+                "SELECT COUNT(*) FROM handoffs WHERE priority < ?"
+                " OR (priority = ? AND (created < ? OR (created = ? AND id <= ?)))",
+                (
+                    request.priority,
+                    request.priority,
+                    request.created,
+                    request.created,
+                    request.id,
+                ),
+            ).fetchone()
+            return int(position)
+
+    def depth(self) -> dict[str, int]:
+        """Return the number of waiting requests per user type."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_type, COUNT(*) FROM handoffs GROUP BY user_type"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+HandoffStore = Union[MemoryHandoffStore, SQLiteHandoffStore]
+
+
+def _log_notification(batch: list[HandoffRequest]) -> None:
+    # The telemetry log is not an agent channel: no emails or request text in it.
+    log_event(
+        "handoff_notification",
+        requests=[{"id": request.id, "user_type": request.user_type} for request in batch],
+    )
+
+
+class HandoffNotifier:
+    """Announce new handoff requests to agents in batches.
+
+    Args:
+        send: Called from the notifier's thread with each batch. Defaults to a
+            ``handoff_notification`` event on the telemetry logger, which only
+            names the requests and their user types; agents read the requests
+            with :meth:`HandoffQueue.claim`.
+        max_batch: The most requests per notification; a full batch is sent
+            right away.
+        max_delay: The longest a request waits to be announced, in seconds.
+    """
+
+    def __init__(
+        self,
+        send: Optional[Callable[[list[HandoffRequest]], None]] = None,
+        max_batch: int = 20,
+        max_delay: float = 5.0,
+    ):
+        """Create an idle notifier; its thread starts with the first request."""
+        self.send = send or _log_notification
+        self.max_batch = max(max_batch, 1)
+        self.max_delay = max_delay
+        # Each request with the time it arrived; the oldest sets the deadline.
+        self._pending: list[tuple[float, HandoffRequest]] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def add(self, request: HandoffRequest) -> None:
+        """Queue ``request`` for the next batch, starting the notifier thread if needed."""
+        with self._condition:
+            self._pending.append((time.monotonic(), request))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="handoff-notifier", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self) -> None:
+        """Send everything pending now, in batches of at most ``max_batch``."""
+        with self._condition:
+            pending, self._pending = [r for _, r in self._pending], []
+        for start in range(0, len(pending), self.max_batch):
+            self._send(pending[start : start + self.max_batch])
+
+    def close(self) -> None:
+        """Stop the notifier thread after sending what is pending."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and not self._due():
+                    timeout = None
+                    if self._pending:
+                        timeout = self._pending[0][0] + self.max_delay - time.monotonic()
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                batch = [r for _, r in self._pending[: self.max_batch]]
+                self._pending = self._pending[self.max_batch :]
+            self._send(batch)
+
+    def _due(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.max_batch
+            or time.monotonic() - self._pending[0][0] >= self.max_delay
+        )
+
+    def _send(self, batch: list[HandoffRequest]) -> None:
+        notification_batch_size.observe(len(batch))
+        try:
+            self.send(batch)
+        except Exception:
+            logger.exception("Failed to notify agents of %d handoff requests", len(batch))
+
+
+class HandoffQueue:
+    """A bounded priority queue of conversations waiting for human agents.
+
+    Args:
+        store: Where waiting requests are kept.
+        capacity: The most requests waiting at once.
+        notifier: Announces each new (not merged) request to agents.
+        poll_interval: Seconds between retries while waiting for room.
+    """
+
+    def __init__(
+        self,
+        store: Optional[HandoffStore] = None,
+        capacity: int = 1000,
+        notifier: Optional[HandoffNotifier] = None,
+        poll_interval: float = 0.05,
+    ):
+        """Create a queue with room for ``capacity`` waiting requests."""
+        self.store = store if store is not None else MemoryHandoffStore()
+        self.capacity = capacity
+        self.notifier = notifier
+        self.poll_interval = poll_interval
+
+    def submit(self, request: HandoffRequest, timeout: float = 0.0) -> Ticket:
+        """Queue ``request``, waiting up to ``timeout`` seconds for room.
+
+        Raises:
+            HandoffQueueFull: There was still no room after ``timeout`` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._add(request)
+            except HandoffQueueFull:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    handoff_requests.inc(user_type=request.user_type, outcome="rejected")
+                    raise
+            time.sleep(min(self.poll_interval, remaining))
+
+    async def asubmit(self, request: HandoffRequest, timeout: float = 0.0) -> Ticket:
+        """Async counterpart of :meth:`submit`; the store is used from the default executor."""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return await loop.run_in_executor(None, self._add, request)
+            except HandoffQueueFull:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    handoff_requests.inc(user_type=request.user_type, outcome="rejected")
+                    raise
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    def cancel(self, key: str) -> Optional[HandoffRequest]:
+        """Take the request with ``key`` out of line, if it is waiting."""
+        request = self.store.remove(key)
+        if request is not None:
+            handoff_requests.inc(user_type=request.user_type, outcome="cancelled")
+            self._record_depth()
+        return request
+
+    def claim(self, limit: int = 1) -> list[HandoffRequest]:
+        """Hand up to ``limit`` requests to an agent, first in line first."""
+        claimed = self.store.claim(limit)
+        now = time.time()
+        for request in claimed:
+            handoff_requests.inc(user_type=request.user_type, outcome="claimed")
+            wait_seconds.observe(max(now - request.created, 0.0), user_type=request.user_type)
+        if claimed:
+            self._record_depth()
+        return claimed
+
+    def depth(self) -> dict[str, int]:
+        """Return the number of waiting requests per user type."""
+        return self.store.depth()
+
+    def _add(self, request: HandoffRequest) -> Ticket:
+        waiting, merged = self.store.add(request, self.capacity)
+        handoff_requests.inc(
+            user_type=waiting.user_type, outcome="merged" if merged else "queued"
+        )
+        if not merged:
+            self._record_depth()
+            if self.notifier is not None:
+                self.notifier.add(waiting)
+        return Ticket(waiting, self.store.position(waiting), merged)
+
+    def _record_depth(self) -> None:
+        depth = self.store.depth()
+        for kind in {*PRIORITIES, *depth}:
+            queue_depth.set(depth.get(kind, 0), user_type=kind)
+
+
+def _build_handoff_queue() -> HandoffQueue:
+    configuration = Configuration()
+    if configuration.handoff_backend == "memory":
+        store: HandoffStore = MemoryHandoffStore()
+    elif configuration.handoff_backend == "sqlite":
+        store = SQLiteHandoffStore(configuration.handoff_db_path)
+    else:
+        raise ValueError(f"Unknown handoff backend: {configuration.handoff_backend!r}")
+    return HandoffQueue(
+        store,
+        capacity=configuration.handoff_capacity,
+        notifier=HandoffNotifier(
+            max_batch=configuration.handoff_notify_batch_size,
+            max_delay=configuration.handoff_notify_interval_seconds,
+        ),
+    )
+
+
+handoff_queue_resource = registry.register("handoff_queue", _build_handoff_queue)
+
+
+def handoff_request(state: State, config: RunnableConfig) -> HandoffRequest:
+    """Describe the conversation for the agents: who is asking and what for."""
+    configuration = Configuration.from_runnable_config(config)
+    messages = state["messages"]
+    args = next(
+        (
+            call["args"]
+            for message in reversed(messages)
+            if isinstance(message, AIMessage)
+            for call in message.tool_calls
+            if call["name"] == "ToHumanAssistant"
+        ),
+        {},
+    )
+    email = configuration.email or args.get("email") or ""
+    kind = state_user_type(state, configuration)
+    if kind == VISITOR and email:
+        kind = LEAD
+    thread_id = str((config.get("configurable") or {}).get("thread_id") or "")
+    last = messages[-1]
+    # Right after the handoff, the request is the assistant's summary; later, the user's words.
+    text = args.get("request", "") if isinstance(last, ToolMessage) else get_message_text(last)
+    return HandoffRequest(
+        key=email.strip().lower() or thread_id or uuid.uuid4().hex,
+        user_type=kind,
+        request=text,
+        email=email,
+        name=configuration.name or "",
+        thread_id=thread_id,
+    )
+
+
+QUEUED = (
+    "I've passed your request to our support team. You're number {position} in line,"
+    " and an agent will join this conversation as soon as one is free."
+)
+UPDATED = "Thanks, I've added that to your request. You're number {position} in line."
+BUSY = (
+    "Our support team can't take new requests right now. Please try again in a few"
+    " minutes."
+)
+
+
+def _wants_to_leave(state: State) -> bool:
+    last = state["messages"][-1]
+    return isinstance(last, HumanMessage) and "no thanks" in get_message_text(last).lower()
+
+
+def _leave() -> dict[str, Any]:
+    return {
+        "messages": [
+            AIMessage(
+                content="Bye, Have a great day!",
+                tool_calls=[
+                    {
+                        "name": "CompleteOrEscalate",
+                        "args": {"cancel": False},
+                        "id": str(uuid.uuid4()),
+                        "type": "tool_call",
+                    },
+                ],
+            ),
+        ]
+    }
+
+
+def _reply(ticket: Ticket) -> dict[str, Any]:
+    template = UPDATED if ticket.merged else QUEUED
+    return {"messages": [AIMessage(template.format(position=ticket.position))]}
+
+
+def queue_for_human(state: State, config: RunnableConfig) -> dict[str, Any]:
+    """Queue the conversation for a human agent, or leave the queue on "no thanks"."""
+    queue = handoff_queue_resource.get()
+    request = handoff_request(state, config)
+    if _wants_to_leave(state):
+        queue.cancel(request.key)
+        return _leave()
+    timeout = Configuration.from_runnable_config(config).handoff_enqueue_timeout_seconds
+    try:
+        return _reply(queue.submit(request, timeout))
+    except HandoffQueueFull:
+        return {"messages": [AIMessage(BUSY)]}
+
+
+async def aqueue_for_human(state: State, config: RunnableConfig) -> dict[str, Any]:
+    """Async counterpart of :func:`queue_for_human`."""
+    queue = handoff_queue_resource.get()
+    request = handoff_request(state, config)
+    if _wants_to_leave(state):
+        await asyncio.get_running_loop().run_in_executor(None, queue.cancel, request.key)
+        return _leave()
+    timeout = Configuration.from_runnable_config(config).handoff_enqueue_timeout_seconds
+    try:
+        return _reply(await queue.asubmit(request, timeout))
+    except HandoffQueueFull:
+        return {"messages": [AIMessage(BUSY)]}
+
+
+human_assistant = RunnableLambda(queue_for_human, afunc=aqueue_for_human, name="human_assistant")
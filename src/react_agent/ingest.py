@@ -0,0 +1,581 @@
+"""Incremental knowledge-base ingestion with atomically published generations.
+
+A knowledge-base root directory looks like this::
+
+    root/
+        CURRENT                 the name of the live generation
+        generations/<name>/
+            manifest.json       model, dtype, dimensions and chunk counts
+            docs.bin            the chunks as packed JSON, in row order, memory-mapped
+            doc_offsets.npy     ``docs.bin[offsets[i]:offsets[i + 1]]`` is chunk ``i``
+            vectors.npy         normalized (optionally quantized) embeddings
+            scale.npy           per-row scales of an int8 matrix
+            keys.npy, rows.npy  sorted content keys and their rows
+            index.json, ...     the vector index
+
+:func:`ingest_directory` streams the markdown files of a source directory,
+chunks them, copies the vectors of chunks that are unchanged since the live
+generation and embeds the rest in batches. Chunks and vectors are written to
+disk batch by batch, so memory is bounded by the batch size rather than the
+corpus size; the only per-chunk state held at once is the sort of the 64-byte
+content keys at the end of a run.
+
+A new generation only becomes live when ``CURRENT`` is atomically replaced,
+so readers see either the old generation or the new one, never a partial one.
+Running workers pick it up with a :class:`GenerationWatcher` and swap in a new
+retriever; lookups already in flight finish on the retriever they started with.
+
+Every file a worker serves from is memory-mapped read-only, the chunks
+included (as :class:`PackedDocs`, decoded only when a chunk is returned), so
+worker processes on one host share the pages of a single copy of the
+knowledge base. :func:`publish_documents` publishes chunks that are already
+embedded, which is how :mod:`react_agent.shared_kb` shares the built-in
+knowledge base between workers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Literal, Optional, Sequence, Union
+
+import numpy as np
+
+from react_agent.chunking import chunk_markdown
+from react_agent.configuration import Configuration
+from react_agent.embedding_cache import content_key, embed_texts
+from react_agent.vector_index import VectorIndex, build_index, load_index
+from react_agent.vectors import EmbeddingMatrix
+
+logger = logging.getLogger(__name__)
+
+CURRENT = "CURRENT"
+GENERATIONS = "generations"
+DOCS_BLOB = "docs.bin"
+DOC_OFFSETS = "doc_offsets.npy"
+DEFAULT_BATCH_SIZE = 256
+# Rows copied at a time when assembling the final ``.npy`` files.
+_COPY_BLOCK_ROWS = 65536
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+class PackedDocs(Sequence[dict[str, Any]]):
+    """Chunks stored as one buffer of JSON objects, decoded on access.
+
+    Args:
+        blob: The UTF-8 JSON of every chunk, back to back.
+        offsets: ``len(docs) + 1`` byte offsets into ``blob``.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        """Wrap the packed chunks; use :meth:`load` to read a generation."""
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def load(cls, directory: PathLike, mmap: bool = True) -> PackedDocs:
+        """Load the chunks written alongside a generation, memory-mapped by default."""
+        mode: Optional[Literal["r"]] = "r" if mmap else None
+        blob_path = Path(directory, DOCS_BLOB)
+        if blob_path.stat().st_size == 0:
+            blob = np.empty(0, dtype=np.uint8)
+        elif mmap:
+            blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.fromfile(blob_path, dtype=np.uint8)
+        return cls(blob, np.load(Path(directory, DOC_OFFSETS), mmap_mode=mode))
+
+    def __len__(self) -> int:
+        """Return the number of chunks."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Any:
+        """Decode chunk ``i``, or a list of chunks for a slice."""
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        return json.loads(self.blob[self.offsets[i] : self.offsets[i + 1]].tobytes())
+
+
+class _DocsWriter:
+    """Write chunks as the packed ``docs.bin`` and its offsets.
+
+    Generations often live on a RAM-backed filesystem, so the chunks are only
+    written once, in the form workers serve.
+    """
+
+    def __init__(self, directory: Path):
+        self._blob = open(directory / DOCS_BLOB, "wb")
+        self._offsets = _ArrayWriter(directory / DOC_OFFSETS)
+        self._offsets.append(np.zeros(1, dtype=np.int64))
+        self._size = 0
+
+    def write(self, docs: list[dict[str, Any]]) -> None:
+        """Append ``docs`` to the blob and their end offsets to the offsets file."""
+        encoded = [json.dumps(doc) for doc in docs]
+        sizes = []
+        for line in encoded:
+            data = line.encode("utf-8")
+            self._blob.write(data)
+            sizes.append(len(data))
+        self._offsets.append(self._size + np.cumsum(sizes, dtype=np.int64))
+        self._size += sum(sizes)
+
+    def close(self) -> None:
+        self._blob.close()
+        self._offsets.finish()
+
+
+@dataclass
+class Generation:
+    """A published knowledge-base generation, loaded for serving."""
+
+    name: str
+    path: Path
+    manifest: dict[str, Any]
+    docs: Sequence[dict[str, Any]]
+    index: VectorIndex
+
+
+@dataclass
+class IngestReport:
+    """What an ingestion run produced."""
+
+    generation: str
+    chunks: int
+    embedded: int
+    reused: int
+
+
+def iter_chunks(source: PathLike, max_tokens: int = 256) -> Iterator[dict[str, Any]]:
+    """Chunk every markdown file under ``source``, one file at a time."""
+    source = Path(source)
+    for path in sorted(source.rglob("*.md")):
+        text = path.read_text(encoding="utf-8")
+        for chunk in chunk_markdown(text, max_tokens=max_tokens):
+            yield {**chunk, "source": path.relative_to(source).as_posix()}
+
+
+def _batched(items: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def current_generation(root: PathLike) -> Optional[str]:
+    """Return the name of the live generation under ``root``, if any."""
+    try:
+        return Path(root, CURRENT).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(root: PathLike, name: str) -> None:
+    """Atomically make generation ``name`` the live one."""
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=f".{CURRENT}.")
+    with os.fdopen(fd, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, Path(root, CURRENT))
+
+
+def load_generation(
+    root: PathLike, name: Optional[str] = None, mmap: bool = True, **index_overrides: Any
+) -> Generation:
+    """Load a generation (the live one by default) with its index memory-mapped."""
+    name = name or current_generation(root)
+    if name is None:
+        raise FileNotFoundError(f"No knowledge-base generation has been published in {root}")
+    path = Path(root, GENERATIONS, name)
+    manifest = json.loads((path / "manifest.json").read_text())
+    if (path / DOCS_BLOB).exists():
+        docs: Sequence[dict[str, Any]] = PackedDocs.load(path, mmap=mmap)
+    else:
+        # Generations published before chunks were packed, as one JSON object per line.
+        with open(path / "docs.jsonl", encoding="utf-8") as f:
+            docs = [json.loads(line) for line in f]
+    index = load_index(path, mmap=mmap, **index_overrides)
+    return Generation(name, path, manifest, docs, index)
+
+
+class _PreviousVectors:
+    """Rows of the live generation, looked up by content key without loading them."""
+
+    def __init__(self, root: PathLike, model: str, dtype: str):
+        self.keys: Optional[np.ndarray] = None
+        self.rows: Optional[np.ndarray] = None
+        self.data: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        name = current_generation(root)
+        if name is None:
+            return
+        path = Path(root, GENERATIONS, name)
+        try:
+            manifest = json.loads((path / "manifest.json").read_text())
+            if manifest.get("model") != model or manifest.get("dtype") != dtype:
+                return
+            matrix = EmbeddingMatrix.load(path)
+            self.keys = np.load(path / "keys.npy", mmap_mode="r")
+            self.rows = np.load(path / "rows.npy", mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("Not reusing vectors from generation %s: %r", name, e)
+            return
+        self.data, self.scale = matrix.data, matrix.scale
+
+    @property
+    def dimensions(self) -> Optional[int]:
+        """The width of the previous vectors, if any were loaded."""
+        return None if self.data is None else self.data.shape[1]
+
+    def find(self, keys: list[str]) -> np.ndarray:
+        """Return the previous row of each key, or -1."""
+        if self.keys is None or self.rows is None or not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.intp)
+        wanted = np.array(keys, dtype=self.keys.dtype)
+        pos = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+        return np.where(self.keys[pos] == wanted, self.rows[pos], -1)
+
+
+class _ArrayWriter:
+    """Append rows to a raw file, then turn it into a ``.npy`` file block by block."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._raw = open(path.with_suffix(".raw"), "wb")
+        self.count = 0
+        self.dtype: Optional[np.dtype] = None
+        self.shape: tuple[int, ...] = ()
+
+    def append(self, rows: np.ndarray) -> None:
+        self.dtype, self.shape = rows.dtype, rows.shape[1:]
+        self._raw.write(np.ascontiguousarray(rows).tobytes())
+        self.count += len(rows)
+
+    def finish(self) -> None:
+        self._raw.close()
+        raw_path = self.path.with_suffix(".raw")
+        if self.count and self.dtype is not None:
+            raw = np.memmap(raw_path, dtype=self.dtype, mode="r", shape=(self.count, *self.shape))
+            out = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=self.dtype, shape=(self.count, *self.shape)
+            )
+            for start in range(0, self.count, _COPY_BLOCK_ROWS):
+                out[start : start + _COPY_BLOCK_ROWS] = raw[start : start + _COPY_BLOCK_ROWS]
+            out.flush()
+            del raw, out
+        os.remove(raw_path)
+
+
+def ingest_directory(
+    source: PathLike,
+    root: PathLike,
+    client: Any,
+    model: str = "text-embedding-3-small",
+    *,
+    dtype: str = "float32",
+    max_tokens: int = 256,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    index: str = "exact",
+    index_params: Optional[dict[str, Any]] = None,
+    keep_generations: int = 3,
+) -> IngestReport:
+    """Build and publish a new generation from the markdown files under ``source``.
+
+    Args:
+        source: The directory of markdown files.
+        root: The knowledge-base root to publish into.
+        client: An OpenAI-compatible embeddings client.
+        model: The embedding model.
+        dtype: How to store vectors: ``"float32"``, ``"float16"`` or ``"int8"``.
+        max_tokens: The token cap per chunk.
+        batch_size: Chunks processed, and at most embedded, per request.
+        index: The vector index to build, ``"exact"`` or ``"ivf"``.
+        index_params: Build parameters of the index.
+        keep_generations: How many generations to keep on disk, including the new one.
+
+    Returns:
+        The new generation's name and how many chunks were embedded or reused.
+    """
+    root = Path(root)
+    previous = _PreviousVectors(root, model, dtype)
+    name, staging = _stage(root)
+
+    try:
+        vectors = _ArrayWriter(staging / "vectors.npy")
+        scales = _ArrayWriter(staging / "scale.npy")
+        keys = _ArrayWriter(staging / "keys.npy")
+        docs_out = _DocsWriter(staging)
+        embedded = reused = 0
+        dimensions = previous.dimensions
+        try:
+            for batch in _batched(iter_chunks(source, max_tokens), batch_size):
+                batch_keys = [content_key(model, chunk["page_content"]) for chunk in batch]
+                rows = previous.find(batch_keys)
+                missing = np.flatnonzero(rows < 0)
+                fresh = None
+                if len(missing):
+                    texts = [batch[i]["page_content"] for i in missing]
+                    fresh = EmbeddingMatrix(embed_texts(client, model, texts), dtype)
+                    dimensions = fresh.data.shape[1]
+                if dimensions is None:
+                    raise RuntimeError("Neither reused nor fresh vectors give the dimensions")
+                data = np.empty((len(batch), dimensions), dtype=np.dtype(dtype))
+                scale = np.ones((len(batch), 1), dtype=np.float32)
+                old = np.flatnonzero(rows >= 0)
+                if len(old) and previous.data is not None:
+                    data[old] = previous.data[rows[old]]
+                    if previous.scale is not None:
+                        scale[old] = previous.scale[rows[old]]
+                if fresh is not None:
+                    data[missing] = fresh.data
+                    if fresh.scale is not None:
+                        scale[missing] = fresh.scale
+                vectors.append(data)
+                if dtype == "int8":
+                    scales.append(scale)
+                keys.append(np.array(batch_keys, dtype="S64"))
+                docs_out.write([{**chunk, "key": key} for chunk, key in zip(batch, batch_keys)])
+                embedded += len(missing)
+                reused += len(old)
+        finally:
+            docs_out.close()
+
+        if not vectors.count:
+            raise ValueError(f"No markdown content found under {source}")
+        for writer in (vectors, scales, keys):
+            writer.finish()
+        manifest = {
+            "model": model,
+            "dtype": dtype,
+            "dimensions": dimensions,
+            "chunks": vectors.count,
+            "embedded": embedded,
+            "reused": reused,
+            "source": str(source),
+        }
+        _seal(root, name, staging, manifest, index, index_params)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    publish(root, name)
+    _prune_generations(root, keep_generations)
+    return IngestReport(name, vectors.count, embedded, reused)
+
+
+def publish_documents(
+    root: PathLike,
+    docs: Sequence[dict[str, Any]],
+    vectors: Union[np.ndarray, list[list[float]], EmbeddingMatrix],
+    model: str = "text-embedding-3-small",
+    *,
+    dtype: str = "float32",
+    index: str = "exact",
+    index_params: Optional[dict[str, Any]] = None,
+    source: str = "",
+    keep_generations: int = 3,
+) -> str:
+    """Publish chunks that are already embedded as a new generation; return its name.
+
+    Args:
+        root: The knowledge-base root to publish into.
+        docs: The chunks, each with a ``page_content``.
+        vectors: One embedding per chunk, or an :class:`EmbeddingMatrix` of them.
+        model: The embedding model the vectors come from.
+        dtype: How to store vectors, unless ``vectors`` is already a matrix.
+        index: The vector index to build, ``"exact"`` or ``"ivf"``.
+        index_params: Build parameters of the index.
+        source: Where the chunks come from, recorded in the manifest.
+        keep_generations: How many generations to keep on disk, including the new one.
+    """
+    if not len(docs):
+        raise ValueError("Cannot publish an empty knowledge base")
+    root = Path(root)
+    matrix = vectors if isinstance(vectors, EmbeddingMatrix) else EmbeddingMatrix(vectors, dtype)
+    name, staging = _stage(root)
+    try:
+        matrix.save(staging)
+        keys = [content_key(model, doc["page_content"]) for doc in docs]
+        np.save(staging / "keys.npy", np.array(keys, dtype="S64"))
+        docs_out = _DocsWriter(staging)
+        try:
+            docs_out.write([{**doc, "key": key} for doc, key in zip(docs, keys)])
+        finally:
+            docs_out.close()
+        manifest = {
+            "model": model,
+            "dtype": matrix.dtype,
+            "dimensions": matrix.data.shape[1],
+            "chunks": len(docs),
+            "embedded": len(docs),
+            "reused": 0,
+            "source": source,
+        }
+        _seal(root, name, staging, manifest, index, index_params)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    publish(root, name)
+    _prune_generations(root, keep_generations)
+    return name
+
+
+def _stage(root: Path) -> tuple[str, Path]:
+    """Name a new generation and create its staging directory."""
+    generations = root / GENERATIONS
+    generations.mkdir(parents=True, exist_ok=True)
+    # Names sort in publication order.
+    now = time.time()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+    name = f"{stamp}.{int(now * 1e6) % 10**6:06d}-{uuid.uuid4().hex[:6]}"
+    staging = generations / f".staging-{name}"
+    staging.mkdir()
+    return name, staging
+
+
+def _seal(
+    root: Path,
+    name: str,
+    staging: Path,
+    manifest: dict[str, Any],
+    index: str,
+    index_params: Optional[dict[str, Any]],
+) -> None:
+    """Index a staged generation, write its manifest and move it into place."""
+    _write_key_lookup(staging)
+    matrix = EmbeddingMatrix.load(staging)
+    build_index(matrix, index, **(index_params or {})).save(staging, include_matrix=False)
+    del matrix
+    manifest = {"generation": name, **manifest, "index": index, "created_at": time.time()}
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    os.rename(staging, root / GENERATIONS / name)
+
+
+def _write_key_lookup(path: Path) -> None:
+    """Sort the content keys so the next run can find reusable rows by binary search."""
+    keys = np.load(path / "keys.npy")
+    order = np.argsort(keys, kind="stable")
+    np.save(path / "keys.npy", keys[order])
+    np.save(path / "rows.npy", order)
+
+
+def _prune_generations(root: Path, keep: int) -> None:
+    live = current_generation(root)
+    names = sorted(p.name for p in (root / GENERATIONS).iterdir() if not p.name.startswith("."))
+    for name in names[: max(len(names) - keep, 0)]:
+        if name != live:
+            # Workers that still map these files keep them until they swap.
+            shutil.rmtree(root / GENERATIONS / name, ignore_errors=True)
+
+
+class GenerationWatcher:
+    """Poll a knowledge-base root and hand each newly published generation to ``on_change``.
+
+    Args:
+        root: The knowledge-base root.
+        on_change: Called with the loaded :class:`Generation`.
+        interval: Seconds between checks.
+        current: The generation already being served.
+        load: Keyword arguments for :func:`load_generation`.
+    """
+
+    def __init__(
+        self,
+        root: PathLike,
+        on_change: Callable[[Generation], None],
+        interval: float = 30.0,
+        current: Optional[str] = None,
+        **load: Any,
+    ):
+        """Create a watcher; call :meth:`check` or :meth:`start` to poll ``root``."""
+        self.root = root
+        self.on_change = on_change
+        self.interval = interval
+        self.current = current
+        self._load = load
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Swap to the live generation if it changed; return whether it did."""
+        name = current_generation(self.root)
+        if name is None or name == self.current:
+            return False
+        try:
+            self.on_change(load_generation(self.root, name, **self._load))
+        except Exception:
+            logger.exception("Failed to load knowledge-base generation %s", name)
+            return False
+        logger.info("Switched to knowledge-base generation %s", name)
+        self.current = name
+        return True
+
+    def start(self) -> GenerationWatcher:
+        """Start checking in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop checking and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Ingest a directory of markdown files: ``python -m react_agent.ingest SOURCE ROOT``."""
+    configuration = Configuration()
+    parser = argparse.ArgumentParser(description="Publish a new knowledge-base generation.")
+    parser.add_argument("source", help="Directory of markdown files")
+    parser.add_argument("root", nargs="?", default=configuration.kb_path or None)
+    parser.add_argument("--model", default=configuration.embedding_model)
+    parser.add_argument("--dtype", default=configuration.embedding_dtype)
+    parser.add_argument("--max-tokens", type=int, default=configuration.kb_chunk_max_tokens)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--index", default=configuration.vector_index)
+    parser.add_argument("--keep", type=int, default=3)
+    args = parser.parse_args(argv)
+    if not args.root:
+        parser.error("a knowledge-base root is required (argument or KB_PATH)")
+
+    import openai
+
+    report = ingest_directory(
+        args.source,
+        args.root,
+        openai.Client(),
+        args.model,
+        dtype=args.dtype,
+        max_tokens=args.max_tokens,
+        batch_size=args.batch_size,
+        index=args.index,
+        index_params={"n_lists": configuration.ivf_lists} if args.index == "ivf" else None,
+        keep_generations=args.keep,
+    )
+    sys.stdout.write(json.dumps(asdict(report)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
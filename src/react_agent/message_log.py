@@ -0,0 +1,169 @@
+"""An indexed message list for ``State.messages``.
+
+LangGraph's ``add_messages`` reducer converts every message already in the
+state, assigns missing ids and builds an id -> position map from scratch on
+each update, so every graph step costs time proportional to the length of the
+conversation. :func:`merge_messages` has the same semantics, but returns a
+:class:`MessageLog`: a list that carries the position of each message id, so
+that the next update only has to look at the new messages.
+
+A log shares its id map with the log it was derived from when the update only
+appended or replaced messages. Positions never move in an append-only
+lineage, so the map stays exact for every log along it, and the first log to
+extend it from a shorter ancestor takes a fresh one. Removing messages also
+builds a fresh map.
+
+Logs are lists, so nodes, the serializer and the checkpointers see plain
+message lists; slicing and concatenation return plain lists. Serialized
+checkpoints load back as plain lists, which the next update indexes once.
+Logs must not be mutated in place, which LangGraph state never is.
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+from langchain_core.messages import (
+    BaseMessage,
+    RemoveMessage,
+    convert_to_messages,
+    message_chunk_to_message,
+)
+from langgraph.graph.message import REMOVE_ALL_MESSAGES, Messages
+
+T = TypeVar("T")
+
+# id(message) -> (message, {compute: compute(message)}) for :meth:`MessageLog.memoized`.
+_Memo = dict[int, tuple[BaseMessage, dict[Callable[[BaseMessage], Any], Any]]]
+
+
+class _Index:
+    """Message id -> position, shared by the logs of one append-only lineage."""
+
+    __slots__ = ("positions", "length")
+
+    def __init__(self, messages: list[BaseMessage]):
+        self.positions: dict[Optional[str], int] = {m.id: i for i, m in enumerate(messages)}
+        # The length of the longest log using this map: only a log this long may extend it.
+        self.length = len(messages)
+
+
+class MessageLog(list[BaseMessage]):
+    """A list of messages that knows where each message id is."""
+
+    __slots__ = ("_index", "_memo")
+
+    def __init__(self, messages: Iterable[BaseMessage] = ()):
+        """Create a log of ``messages`` and index their ids."""
+        super().__init__(messages)
+        self._index = _Index(self)
+        self._memo: _Memo = {}
+
+    def position(self, message_id: Optional[str]) -> Optional[int]:
+        """Return the position of the message with ``message_id``, or None."""
+        i = self._index.positions.get(message_id)
+        if i is not None and i < len(self) and list.__getitem__(self, i).id == message_id:
+            return i
+        return None
+
+    def merge(self, right: list[BaseMessage]) -> MessageLog:
+        """Return a log with ``right`` merged in, as ``add_messages`` would.
+
+        ``right`` must hold messages with ids, as :func:`merge_messages`
+        passes them.
+        """
+        size = len(self)
+        appended: list[BaseMessage] = []
+        appended_at: dict[Optional[str], int] = {}
+        replaced: dict[int, BaseMessage] = {}
+        removed: set[Optional[str]] = set()
+        for m in right:
+            i = self.position(m.id)
+            if i is None and m.id in appended_at:
+                i = size + appended_at[m.id]
+            if i is None:
+                if isinstance(m, RemoveMessage):
+                    raise ValueError(
+                        f"Attempting to delete a message with an ID that doesn't exist ('{m.id}')"
+                    )
+                appended_at[m.id] = len(appended)
+                appended.append(m)
+            elif isinstance(m, RemoveMessage):
+                removed.add(m.id)
+            else:
+                removed.discard(m.id)
+                if i < size:
+                    replaced[i] = m
+                else:
+                    appended[i - size] = m
+
+        log = MessageLog.__new__(MessageLog)
+        list.__init__(log, self)
+        log.extend(appended)
+        memo = self._memo
+        for i, m in replaced.items():
+            # The replaced message leaves the lineage's future; so do its results.
+            memo.pop(id(log[i]), None)
+            log[i] = m
+        if removed:
+            kept = MessageLog(m for m in log if m.id not in removed)
+            kept._memo = {k: v for k, v in memo.items() if v[0].id not in removed}
+            return kept
+        log._memo = memo
+        if not appended:
+            log._index = self._index
+        elif self._index.length == size:
+            log._index = self._index
+            for m_id, offset in appended_at.items():
+                log._index.positions[m_id] = size + offset
+            log._index.length = len(log)
+        else:
+            # Another log already extended this one's map: start a new lineage.
+            log._index = _Index(log)
+        return log
+
+    def memoized(self, message: BaseMessage, compute: Callable[[BaseMessage], T]) -> T:
+        """Return ``compute(message)``, computed once per message object for the conversation.
+
+        Used by the checkpointer to serialize each message once rather than on
+        every checkpoint; messages are not changed in place once in the state.
+        """
+        entry = self._memo.get(id(message))
+        if entry is None or entry[0] is not message:
+            entry = self._memo[id(message)] = (message, {})
+        results = entry[1]
+        if compute not in results:
+            results[compute] = compute(message)
+        result: T = results[compute]
+        return result
+
+
+def _prepare(messages: Messages) -> list[BaseMessage]:
+    listed = messages if isinstance(messages, list) else [messages]
+    prepared = [message_chunk_to_message(m) for m in convert_to_messages(listed)]
+    for m in prepared:
+        if m.id is None:
+            m.id = str(uuid.uuid4())
+    return prepared
+
+
+def merge_messages(left: Messages, right: Messages) -> MessageLog:
+    """Merge messages as the ``add_messages`` reducer does, into an indexed :class:`MessageLog`.
+
+    Only ``right`` is converted and given ids when ``left`` is already a log.
+    """
+    updates = _prepare(right)
+    remove_all = next(
+        (
+            i
+            for i in range(len(updates) - 1, -1, -1)
+            if isinstance(updates[i], RemoveMessage) and updates[i].id == REMOVE_ALL_MESSAGES
+        ),
+        None,
+    )
+    if remove_all is not None:
+        return MessageLog(updates[remove_all + 1 :])
+    log = left if isinstance(left, MessageLog) else MessageLog(_prepare(left))
+    return log.merge(updates)
+
@@ -0,0 +1,262 @@
+"""In-process metrics for the support agent.
+
+Metrics are plain thread-safe objects kept in a process-wide registry, so that
+they can be read without LangSmith or any external service: as a dict with
+:func:`snapshot`, in the Prometheus text format with :func:`render_prometheus`,
+or over HTTP from the local endpoint started by :func:`serve`.
+"""
+
+from __future__ import annotations
+
+import bisect
+import http.server
+import itertools
+import json
+import math
+import threading
+from typing import (
+    Any,
+    Callable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+_LabelKey = tuple[tuple[str, str], ...]
+
+# Upper bounds, in seconds, for the latency histograms.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: dict[str, object]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    """A monotonically increasing value, optionally split by labels."""
+
+    def __init__(self, name: str, description: str = ""):
+        """Create a counter named ``name`` with no values yet."""
+        self.name = name
+        self.description = description
+        self._values: dict[_LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        """Increase the counter for the given labels by ``amount``."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        """Return the current value for the given labels."""
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> dict[_LabelKey, float]:
+        """Return a copy of every labelled value."""
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    """A value that can go up and down, optionally split by labels."""
+
+    def set(self, value: float, **labels: object) -> None:
+        """Set the gauge for the given labels to ``value``."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class HistogramSample(NamedTuple):
+    """Observations of one label set: cumulative counts per upper bound, sum and count."""
+
+    buckets: tuple[tuple[float, int], ...]
+    sum: float
+    count: int  # type: ignore[assignment]  # Shadows tuple.count, as Prometheus names it.
+
+
+class Histogram:
+    """The distribution of observed values, optionally split by labels."""
+
+    def __init__(self, name: str, description: str = "", buckets: Sequence[float] = ()):
+        """Create a histogram with the given upper bounds; ``+Inf`` is always added."""
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: dict[_LabelKey, list[int]] = {}
+        self._sums: dict[_LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: object) -> None:
+        """Record one observation of ``value`` for the given labels."""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def sample(self, **labels: object) -> HistogramSample:
+        """Return the observations for the given labels."""
+        key = _label_key(labels)
+        with self._lock:
+            return self._sample(key)
+
+    def samples(self) -> dict[_LabelKey, HistogramSample]:
+        """Return the observations of every label set."""
+        with self._lock:
+            return {key: self._sample(key) for key in self._counts}
+
+    def _sample(self, key: _LabelKey) -> HistogramSample:
+        counts = self._counts.get(key, [0] * len(self.buckets))
+        cumulative = tuple(zip(self.buckets, itertools.accumulate(counts)))
+        return HistogramSample(cumulative, self._sums.get(key, 0.0), sum(counts))
+
+
+Metric = Union[Counter, Gauge, Histogram]
+M = TypeVar("M", Counter, Gauge, Histogram)
+
+_metrics: dict[str, Metric] = {}
+_lock = threading.Lock()
+
+
+def _get_or_create(name: str, kind: type[M], factory: Callable[[], M]) -> M:
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = factory()
+        if not isinstance(metric, kind):
+            raise ValueError(f"Metric {name!r} is already registered as a {type(metric).__name__}")
+        return metric
+
+
+def counter(name: str, description: str = "") -> Counter:
+    """Return the counter called ``name``, creating it on first use."""
+    return _get_or_create(name, Counter, lambda: Counter(name, description))
+
+
+def gauge(name: str, description: str = "") -> Gauge:
+    """Return the gauge called ``name``, creating it on first use."""
+    return _get_or_create(name, Gauge, lambda: Gauge(name, description))
+
+
+def histogram(name: str, description: str = "", buckets: Sequence[float] = ()) -> Histogram:
+    """Return the histogram called ``name``, creating it with ``buckets`` on first use."""
+    return _get_or_create(name, Histogram, lambda: Histogram(name, description, buckets))
+
+
+def snapshot(
+    prefix: Optional[str] = None,
+) -> dict[str, Mapping[_LabelKey, Union[float, HistogramSample]]]:
+    """Return the current value of every metric, optionally filtered by name prefix."""
+    with _lock:
+        metrics = list(_metrics.values())
+    return {
+        m.name: m.samples()
+        for m in metrics
+        if prefix is None or m.name.startswith(prefix)
+    }
+
+
+def _escape(text: str, quotes: bool = False) -> str:
+    text = text.replace("\\", r"\\").replace("\n", r"\n")
+    return text.replace('"', r'\"') if quotes else text
+
+
+def _format_labels(key: _LabelKey, extra: Sequence[tuple[str, str]] = ()) -> str:
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value, quotes=True)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus(prefix: Optional[str] = None) -> str:
+    """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        metrics = sorted(_metrics.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        if prefix is not None and not metric.name.startswith(prefix):
+            continue
+        if isinstance(metric, Gauge):
+            kind = "gauge"
+        else:
+            kind = "counter" if isinstance(metric, Counter) else "histogram"
+        lines.append(f"# HELP {metric.name} {_escape(metric.description)}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        if isinstance(metric, Counter):
+            for key, value in sorted(metric.samples().items()):
+                lines.append(f"{metric.name}{_format_labels(key)} {_format_value(value)}")
+            continue
+        for key, sample in sorted(metric.samples().items()):
+            for bound, count in sample.buckets:
+                labels = _format_labels(key, [("le", _format_value(bound))])
+                lines.append(f"{metric.name}_bucket{labels} {count}")
+            lines.append(f"{metric.name}_sum{_format_labels(key)} {_format_value(sample.sum)}")
+            lines.append(f"{metric.name}_count{_format_labels(key)} {sample.count}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot_json(prefix: Optional[str] = None) -> dict[str, list[dict[str, Any]]]:
+    """Return :func:`snapshot` with JSON-friendly label sets and histogram samples."""
+    result: dict[str, list[dict[str, Any]]] = {}
+    for name, samples in snapshot(prefix).items():
+        rows = []
+        for key, sample in samples.items():
+            row: dict[str, Any] = {"labels": dict(key)}
+            if isinstance(sample, HistogramSample):
+                row.update(
+                    buckets=[[_format_value(bound), count] for bound, count in sample.buckets],
+                    sum=sample.sum,
+                    count=sample.count,
+                )
+            else:
+                row["value"] = sample
+            rows.append(row)
+        result[name] = rows
+    return result
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            body = render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(snapshot_json()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes are too frequent to log.
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1") -> http.server.ThreadingHTTPServer:
+    """Serve ``/metrics`` (Prometheus) and ``/metrics.json`` from a daemon thread.
+
+    Pass port 0 to pick a free port; it is ``server.server_address[1]``.
+    Stop the endpoint with ``server.shutdown()``.
+    """
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
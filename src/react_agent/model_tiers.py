@@ -0,0 +1,353 @@
+"""Model tiering and hedged requests for the primary assistant.
+
+Most turns are a simple lookup followed by an answer, which a fast, cheap
+model handles as well as the primary one. With ``model_tiering`` enabled, a
+turn starts on the fast tier unless the question is long or the conversation
+has gone on for a while, and escalates to the primary tier for the rest of the
+turn when the fast model's reply shows a problem:
+
+* ``empty``: it returned neither text nor a tool call;
+* ``tool_choice``: its tool choice disagrees with the pre-router's rules, e.g.
+  it answers a pricing question without looking it up, or does not hand off a
+  user who asked for a human;
+* ``low_confidence``: its answer says it is not sure or cannot help.
+
+With ``hedged_requests`` enabled, a call that has not finished after the
+``hedge_percentile`` latency of its tier (``hedge_initial_delay_seconds``
+until enough calls have been seen) is sent a second time, and whichever copy
+finishes first is used. Hedging trades a few duplicate calls for a shorter
+tail.
+
+Only one reply per call reaches ``stream_mode="messages"`` clients: backup
+copies and fast-tier calls, whose reply may be thrown away on escalation, run
+with the ``nostream`` tag. A fast-tier reply that is kept is sent whole when
+the node finishes, and a winning backup's reply follows the tokens the first
+copy had streamed.
+
+The tiers called, their latencies and any escalation are logged with the
+turn's ``assistant_turn`` event.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+import numpy as np
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from langgraph.constants import TAG_NOSTREAM
+
+from react_agent import metrics, registry
+from react_agent.configuration import Configuration
+from react_agent.telemetry import acall_model, call_model
+from react_agent.tools.lookup_knowledge_base import lookup_knowledge_base
+from react_agent.utils import get_message_text, is_empty_reply
+
+if TYPE_CHECKING:
+    from react_agent.router import IntentRouter
+
+FAST = "fast"
+PRIMARY = "primary"
+HANDOFF_TOOL = "ToHumanAssistant"
+
+_UNSURE = re.compile(
+    r"\b(i'?m not (sure|certain)|i don'?t know|i do not know|i(?: am|'m)? unable to"
+    r"|i can(?:no|')t (help|find|answer))\b",
+    re.IGNORECASE,
+)
+
+tier_calls = metrics.counter(
+    "assistant_tier_calls_total", "Primary assistant model calls, by tier: fast or primary."
+)
+tier_call_seconds = metrics.histogram(
+    "assistant_tier_call_seconds",
+    "Time until each primary assistant model reply, by tier: fast or primary.",
+    buckets=metrics.LATENCY_BUCKETS,
+)
+tier_escalations = metrics.counter(
+    "assistant_tier_escalations_total",
+    "Turns moved from the fast to the primary tier, by reason: empty, tool_choice or "
+    "low_confidence.",
+)
+hedged_calls = metrics.counter(
+    "assistant_hedged_calls_total",
+    "Model calls that were sent a second time, by winner: first or backup.",
+)
+
+
+class LatencyWindow:
+    """The latencies of a tier's most recent model calls."""
+
+    def __init__(self, maxlen: int = 500):
+        """Create an empty window of the last ``maxlen`` calls."""
+        self._seconds: deque[float] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Add the latency of a call, dropping the oldest one when full."""
+        with self._lock:
+            self._seconds.append(seconds)
+
+    def percentile(self, p: float, min_samples: int) -> Optional[float]:
+        """Return the ``p``-th percentile, or None with fewer than ``min_samples`` calls."""
+        with self._lock:
+            if len(self._seconds) < max(min_samples, 1):
+                return None
+            return float(np.percentile(self._seconds, p))
+
+
+latencies = {FAST: LatencyWindow(), PRIMARY: LatencyWindow()}
+# Sync hedged calls run both copies here; the loser finishes in the background.
+hedge_executor = registry.register(
+    "hedge_executor",
+    lambda: ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedged-call"),
+)
+
+
+class ModelTiers:
+    """The primary assistant's model calls for one turn.
+
+    Args:
+        primary: The primary model's runnable.
+        fast: The fast model's runnable, or None to always use the primary one.
+        configuration: The turn's configuration.
+        messages: The whole conversation, not just the part that fits in the prompt.
+    """
+
+    def __init__(
+        self,
+        primary: Runnable[Any, Any],
+        fast: Optional[Runnable[Any, Any]],
+        configuration: Configuration,
+        messages: Sequence[AnyMessage],
+    ):
+        """Choose the turn's starting tier from the conversation."""
+        self.runnables = {PRIMARY: primary}
+        if fast is not None:
+            self.runnables[FAST] = fast
+        self.configuration = configuration
+        self.tier, self.reason = self._choose(messages)
+        self.escalation: Optional[str] = None
+        self.calls: list[dict[str, Any]] = []
+
+    def call(self, state: dict[str, Any], config: RunnableConfig) -> AIMessage:
+        """Call the current tier, escalating to the primary tier if its reply falls short."""
+        result = self._call(self.tier, state, config)
+        if self._escalate(result, state):
+            result = self._call(PRIMARY, state, config)
+        return result
+
+    async def acall(self, state: dict[str, Any], config: RunnableConfig) -> AIMessage:
+        """Async counterpart of :meth:`call`."""
+        result = await self._acall(self.tier, state, config)
+        if self._escalate(result, state):
+            result = await self._acall(PRIMARY, state, config)
+        return result
+
+    def report(self) -> dict[str, Any]:
+        """Describe the turn's tiers for the ``assistant_turn`` event."""
+        return {
+            "tier": self.tier,
+            "tier_reason": self.reason,
+            "escalation": self.escalation,
+            "model_calls": self.calls,
+        }
+
+    def _choose(self, messages: Sequence[AnyMessage]) -> tuple[str, str]:
+        configuration = self.configuration
+        if not configuration.model_tiering or FAST not in self.runnables:
+            return PRIMARY, "tiering_disabled"
+        questions = [m for m in messages if isinstance(m, HumanMessage)]
+        if len(questions) > configuration.fast_model_max_turns:
+            return PRIMARY, "long_conversation"
+        if questions and _words(questions[-1]) > configuration.fast_model_max_words:
+            return PRIMARY, "long_question"
+        return FAST, "simple"
+
+    def _escalate(self, result: AIMessage, state: dict[str, Any]) -> bool:
+        if self.tier != FAST:
+            return False
+        reason = escalation_reason(result, state)
+        if reason is None:
+            return False
+        tier_escalations.inc(reason=reason)
+        self.tier, self.escalation = PRIMARY, reason
+        return True
+
+    def _hedge_delay(self, tier: str) -> Optional[float]:
+        configuration = self.configuration
+        if not configuration.hedged_requests:
+            return None
+        delay = latencies[tier].percentile(
+            configuration.hedge_percentile, configuration.hedge_min_samples
+        )
+        return configuration.hedge_initial_delay_seconds if delay is None else delay
+
+    def _call(self, tier: str, state: dict[str, Any], config: RunnableConfig) -> AIMessage:
+        runnable, delay = self.runnables[tier], self._hedge_delay(tier)
+        if tier == FAST:
+            config = _nostream(config)
+        started = time.perf_counter()
+        if delay is None:
+            result, winner = call_model(runnable, state, config, tier), None
+            own_seconds = time.perf_counter() - started
+        else:
+            result, winner, own_seconds = _hedged(runnable, state, config, tier, delay)
+        return self._record(tier, result, time.perf_counter() - started, own_seconds, winner)
+
+    async def _acall(self, tier: str, state: dict[str, Any], config: RunnableConfig) -> AIMessage:
+        runnable, delay = self.runnables[tier], self._hedge_delay(tier)
+        if tier == FAST:
+            config = _nostream(config)
+        started = time.perf_counter()
+        if delay is None:
+            result, winner = await acall_model(runnable, state, config, tier), None
+            own_seconds = time.perf_counter() - started
+        else:
+            result, winner, own_seconds = await _ahedged(runnable, state, config, tier, delay)
+        return self._record(tier, result, time.perf_counter() - started, own_seconds, winner)
+
+    def _record(
+        self,
+        tier: str,
+        result: AIMessage,
+        seconds: float,
+        own_seconds: float,
+        winner: Optional[str],
+    ) -> AIMessage:
+        tier_calls.inc(tier=tier)
+        tier_call_seconds.observe(seconds, tier=tier)
+        # The hedge delay comes from the winning copy's own latency: the wait of a
+        # backup's caller also includes the delay before the backup was sent.
+        latencies[tier].record(own_seconds)
+        if winner is not None:
+            hedged_calls.inc(winner=winner)
+        model = self.configuration.fast_model if tier == FAST else self.configuration.model
+        self.calls.append(
+            {"tier": tier, "model": model, "seconds": round(seconds, 6), "hedged": winner}
+        )
+        return result
+
+
+def escalation_reason(result: AIMessage, state: dict[str, Any]) -> Optional[str]:
+    """Return why a fast-tier reply should be redone by the primary tier, if it should."""
+    if is_empty_reply(result):
+        return "empty"
+    messages = state["messages"]
+    if messages and isinstance(messages[-1], HumanMessage):
+        # The first call of the turn chooses the tools; check it against the rules.
+        intent = _rule_intent(get_message_text(messages[-1]))
+        tools = {call["name"] for call in result.tool_calls}
+        if intent == "handoff" and HANDOFF_TOOL not in tools:
+            return "tool_choice"
+        if intent == "faq" and not tools & {lookup_knowledge_base.name, HANDOFF_TOOL}:
+            return "tool_choice"
+    if not result.tool_calls and _UNSURE.search(get_message_text(result)):
+        return "low_confidence"
+    return None
+
+
+def _words(message: HumanMessage) -> int:
+    return len(get_message_text(message).split())
+
+
+@functools.lru_cache(maxsize=1)
+def _rules() -> IntentRouter:
+    # Imported here: react_agent.router itself imports react_agent.assistant.
+    from react_agent.router import IntentRouter
+
+    return IntentRouter()
+
+
+def _rule_intent(text: str) -> Optional[str]:
+    route = _rules().match_rules(text)
+    return route.intent if route is not None else None
+
+
+def _nostream(config: RunnableConfig) -> RunnableConfig:
+    """Keep a model call's tokens out of ``stream_mode="messages"``."""
+    return merge_configs(config, {"tags": [TAG_NOSTREAM]})
+
+
+def _hedged(
+    runnable: Runnable[Any, Any],
+    state: dict[str, Any],
+    config: RunnableConfig,
+    tier: str,
+    delay: float,
+) -> tuple[AIMessage, Optional[str], float]:
+    """Call ``runnable``, and again after ``delay`` seconds; return the first reply.
+
+    Returns:
+        The reply, which copy sent it (None when the first one did before the
+        backup was sent) and that copy's own latency.
+    """
+    executor = hedge_executor.get()
+
+    def submit(config: RunnableConfig) -> Future[AIMessage]:
+        context = contextvars.copy_context()
+        return executor.submit(context.run, call_model, runnable, state, config, tier)
+
+    started = time.perf_counter()
+    first = submit(config)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result(), None, time.perf_counter() - started
+    backup_started = time.perf_counter()
+    backup = submit(_nostream(config))
+    pending = {first, backup}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is first:
+                    return future.result(), "first", time.perf_counter() - started
+                return future.result(), "backup", time.perf_counter() - backup_started
+            error = error or future.exception()
+    if error is None:
+        raise RuntimeError("Neither copy of the hedged call finished")
+    raise error
+
+
+async def _ahedged(
+    runnable: Runnable[Any, Any],
+    state: dict[str, Any],
+    config: RunnableConfig,
+    tier: str,
+    delay: float,
+) -> tuple[AIMessage, Optional[str], float]:
+    """Async counterpart of :func:`_hedged`; the losing call is cancelled."""
+    started = time.perf_counter()
+    first = asyncio.ensure_future(acall_model(runnable, state, config, tier))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result(), None, time.perf_counter() - started
+    backup_started = time.perf_counter()
+    backup = asyncio.ensure_future(acall_model(runnable, state, _nostream(config), tier))
+    pending = {first, backup}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is first:
+                        return task.result(), "first", time.perf_counter() - started
+                    return task.result(), "backup", time.perf_counter() - backup_started
+                error = error or task.exception()
+        if error is None:
+            raise RuntimeError("Neither copy of the hedged call finished")
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
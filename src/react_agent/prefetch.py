@@ -0,0 +1,161 @@
+"""Speculative knowledge-base prefetch.
+
+Most turns call the model, which asks for ``lookup_knowledge_base``, which runs
+retrieval, after which the model runs again. With ``kb_prefetch`` enabled, the
+primary assistant starts retrieval on the latest user message at the same time
+as its first model call. If the model then asks for a lookup whose query has
+the same terms as the user message, the prefetched documents are stored in
+``State.kb_prefetch`` and the tool serves them without another embeddings
+round trip. Any other query would rank documents differently, so it is not
+served from the prefetch. A prefetch the turn does not use is cancelled, also
+when the model call fails.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from react_agent import metrics, registry
+from react_agent.bm25 import tokenize
+from react_agent.configuration import Configuration
+from react_agent.tools.lookup_knowledge_base import (
+    lookup_knowledge_base,
+    retriever_resource,
+)
+from react_agent.utils import get_message_text
+
+logger = logging.getLogger(__name__)
+
+prefetch_started = metrics.counter(
+    "kb_prefetch_started_total", "Speculative knowledge-base lookups started."
+)
+prefetch_hits = metrics.counter(
+    "kb_prefetch_hits_total", "Prefetched lookups served to the model's tool call."
+)
+prefetch_wasted = metrics.counter(
+    "kb_prefetch_wasted_total",
+    "Prefetched lookups thrown away, by reason: no_lookup, query_mismatch, error or cancelled.",
+)
+
+prefetch_executor = registry.register(
+    "prefetch_executor",
+    lambda: concurrent.futures.ThreadPoolExecutor(4, thread_name_prefix="kb-prefetch"),
+)
+
+
+def normalize_query(text: str) -> frozenset[str]:
+    """Return the terms of a query, ignoring case, order, punctuation and stopwords."""
+    return frozenset(tokenize(text))
+
+
+def prefetch_query(messages: list[AnyMessage]) -> Optional[str]:
+    """Return the query to prefetch: the user message that starts this turn, if any."""
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return None
+    return get_message_text(messages[-1]).strip() or None
+
+
+class Prefetch:
+    """A speculative lookup running alongside one model call."""
+
+    def __init__(self, query: str, k: int):
+        """Prepare a lookup of the top ``k`` sections for ``query``; :meth:`start` runs it."""
+        self.query = query
+        self.k = k
+        self._task: Optional[asyncio.Future[list[dict[str, Any]]]] = None
+        self._future: Optional[concurrent.futures.Future[list[dict[str, Any]]]] = None
+        self._done = False
+
+    @classmethod
+    def for_turn(cls, state: dict[str, Any], config: RunnableConfig) -> Optional[Prefetch]:
+        """Return a prefetch for this model call, or None if it should not speculate."""
+        configuration = Configuration.from_runnable_config(config)
+        query = prefetch_query(state["messages"]) if configuration.kb_prefetch else None
+        if query is None:
+            return None
+        prefetch_started.inc()
+        return cls(query, configuration.kb_max_chunks)
+
+    def start(self) -> Prefetch:
+        """Run the lookup in a worker thread (for the sync graph)."""
+        self._future = prefetch_executor.get().submit(
+            lambda: retriever_resource.get().query(self.query, k=self.k)
+        )
+        return self
+
+    def astart(self) -> Prefetch:
+        """Run the lookup as a task on the running event loop."""
+        self._task = asyncio.ensure_future(retriever_resource.get().aquery(self.query, k=self.k))
+        return self
+
+    def cancel(self) -> None:
+        """Stop the lookup unless the turn already resolved it.
+
+        Called once the model call is over, whether it succeeded or raised.
+        """
+        if self._done:
+            return
+        self._done = True
+        prefetch_wasted.inc(reason="cancelled")
+        if self._future is not None:
+            self._future.cancel()
+        if self._task is not None:
+            self._task.cancel()
+
+    def _match(self, result: AIMessage) -> Optional[str]:
+        """Return the tool-call query the prefetch answers, counting a miss if there is none."""
+        self._done = True
+        lookups = [
+            str(call["args"].get("query", ""))
+            for call in getattr(result, "tool_calls", None) or []
+            if call["name"] == lookup_knowledge_base.name
+        ]
+        if not lookups:
+            prefetch_wasted.inc(reason="no_lookup")
+            return None
+        terms = normalize_query(self.query)
+        query = next((q for q in lookups if normalize_query(q) == terms), None)
+        if query is None:
+            prefetch_wasted.inc(reason="query_mismatch")
+        return query
+
+    def resolve(self, result: AIMessage) -> Optional[dict[str, Any]]:
+        """Wait for the lookup if the model asked for it; return the ``kb_prefetch`` state."""
+        if self._future is None:
+            raise RuntimeError("resolve() called before start()")
+        query = self._match(result)
+        if query is None:
+            self._future.cancel()
+            return None
+        try:
+            return self._served(query, self._future.result())
+        except Exception:
+            return self._failed()
+
+    async def aresolve(self, result: AIMessage) -> Optional[dict[str, Any]]:
+        """Async counterpart of :meth:`resolve`."""
+        if self._task is None:
+            raise RuntimeError("aresolve() called before astart()")
+        query = self._match(result)
+        if query is None:
+            self._task.cancel()
+            return None
+        try:
+            return self._served(query, await self._task)
+        except Exception:
+            return self._failed()
+
+    def _served(self, query: str, docs: list[dict[str, Any]]) -> dict[str, Any]:
+        prefetch_hits.inc()
+        return {"query": query, "docs": docs}
+
+    def _failed(self) -> Optional[dict[str, Any]]:
+        logger.warning("Knowledge-base prefetch for %r failed", self.query, exc_info=True)
+        prefetch_wasted.inc(reason="error")
+        return None
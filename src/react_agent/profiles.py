@@ -0,0 +1,375 @@
+"""Resolve who the user is, once per conversation.
+
+The ``fetch_user_info`` node puts the user's profile in ``State.user_info``,
+where the prompt, the answer cache and the handoff queue read it. The profile
+starts from the identity passed in the configuration (``email``, ``name`` and
+``account_id``) and, with ``profile_backend="sqlite"``, adds what the CRM
+knows about that email. That decides the user type:
+
+* ``account``: the user has an account id, from the configuration or the CRM;
+* ``lead``: the email is known but there is no account;
+* ``visitor``: there is no email.
+
+Lookups are cheap to repeat:
+
+* the profile is kept in the conversation's state with the time it was
+  resolved, and reused until ``profile_cache_ttl_seconds`` have passed or the
+  identity changes;
+* a process-wide cache holds CRM records (and misses) for the same TTL, up to
+  ``profile_cache_size`` emails, least recently used first out;
+* concurrent lookups of emails that are not cached wait up to
+  ``profile_batch_delay_seconds`` and are sent to the backend as one query of
+  at most ``profile_batch_size`` emails. Callers asking for the same email
+  share its lookup.
+
+:class:`SQLiteProfileStore` is a local stand-in for the CRM, so that
+classification can be tested without it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Iterable, Mapping, Optional, Protocol, Union
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from react_agent import metrics, registry
+from react_agent.configuration import Configuration
+from react_agent.tools.user_info import ACCOUNT, LEAD, VISITOR, user_type
+
+logger = logging.getLogger(__name__)
+
+profile_lookups = metrics.counter(
+    "profile_lookups_total",
+    "User profile resolutions, by source: state, cache, backend, coalesced (joined a "
+    "backend query already waiting or in flight) or none (no email to look up).",
+)
+profile_batch_size = metrics.histogram(
+    "profile_lookup_batch_size",
+    "Emails per profile backend query.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+class ProfileBackend(Protocol):
+    """Where user records are looked up, e.g. the CRM."""
+
+    def lookup(self, emails: list[str]) -> dict[str, dict[str, Any]]:
+        """Return the records of the known ``emails``, keyed by email."""
+
+
+class SQLiteProfileStore:
+    """User records in a local SQLite database, standing in for the CRM."""
+
+    COLUMNS = ("email", "name", "account_id", "plan")
+
+    def __init__(self, path: str):
+        """Open or create the database at ``path``."""
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles (email TEXT PRIMARY KEY, name TEXT,"
+            " account_id TEXT, plan TEXT)"
+        )
+        self._lock = threading.Lock()
+
+    def lookup(self, emails: list[str]) -> dict[str, dict[str, Any]]:
+        """Return the records of the known ``emails``, which must be normalized."""
+        if not emails:
+            return {}
+        placeholders = ", ".join("?" * len(emails))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM profiles"
+                f" WHERE email IN ({placeholders})",
+                emails,
+            ).fetchall()
+        return {row[0]: dict(zip(self.COLUMNS, row)) for row in rows}
+
+    def upsert(self, records: Iterable[dict[str, Any]]) -> None:
+        """Add or replace user records, e.g. to seed the stand-in."""
+        rows = [
+            (_normalize(r["email"]), r.get("name"), r.get("account_id"), r.get("plan"))
+            for r in records
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?)", rows
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class ProfileResolver:
+    """Look up user records with a process-wide TTL cache and batched backend queries.
+
+    Args:
+        backend: Where records are looked up.
+        ttl: Seconds a record (or a miss) stays cached.
+        maxsize: The most emails cached.
+        max_batch: Query the backend as soon as this many emails are waiting.
+        max_delay: Query at most this many seconds after the first email arrived.
+    """
+
+    def __init__(
+        self,
+        backend: ProfileBackend,
+        ttl: float = 900.0,
+        maxsize: int = 10000,
+        max_batch: int = 64,
+        max_delay: float = 0.005,
+    ):
+        """Create a resolver with an empty cache in front of ``backend``."""
+        self.backend = backend
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_batch = max(max_batch, 1)
+        self.max_delay = max_delay
+        # email -> (expiry, record or None for an unknown email)
+        self._cache: OrderedDict[str, tuple[float, Optional[dict[str, Any]]]] = OrderedDict()
+        self._pending: dict[str, Future[Optional[dict[str, Any]]]] = {}
+        self._inflight: dict[str, Future[Optional[dict[str, Any]]]] = {}
+        self._first = 0.0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def lookup(self, email: str) -> Optional[dict[str, Any]]:
+        """Return the record of ``email``, or None if the backend does not know it."""
+        future = self._future(email)
+        return future if not isinstance(future, Future) else future.result()
+
+    async def alookup(self, email: str) -> Optional[dict[str, Any]]:
+        """Async counterpart of :meth:`lookup`."""
+        future = self._future(email)
+        if not isinstance(future, Future):
+            return future
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def invalidate(self, email: Optional[str] = None) -> None:
+        """Forget the cached record of ``email``, or of everyone."""
+        with self._condition:
+            if email is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(_normalize(email), None)
+
+    def _future(
+        self, email: str
+    ) -> Union[Optional[dict[str, Any]], Future[Optional[dict[str, Any]]]]:
+        email = _normalize(email)
+        with self._condition:
+            cached = self._cache.get(email)
+            if cached is not None and cached[0] > time.monotonic():
+                self._cache.move_to_end(email)
+                profile_lookups.inc(source="cache")
+                return cached[1]
+            future = self._inflight.get(email) or self._pending.get(email)
+            if future is not None:
+                profile_lookups.inc(source="coalesced")
+            else:
+                profile_lookups.inc(source="backend")
+                if not self._pending:
+                    self._first = time.monotonic()
+                future = self._pending[email] = Future()
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="profile-lookups", daemon=True
+                    )
+                    self._thread.start()
+                self._condition.notify()
+            return future
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._due():
+                    timeout = None
+                    if self._pending:
+                        timeout = self._first + self.max_delay - time.monotonic()
+                    self._condition.wait(timeout)
+                emails = list(self._pending)[: self.max_batch]
+                batch = {email: self._pending.pop(email) for email in emails}
+                self._inflight.update(batch)
+                self._first = time.monotonic()
+            self._send(batch)
+
+    def _due(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.max_batch
+            or time.monotonic() - self._first >= self.max_delay
+        )
+
+    def _send(self, batch: dict[str, Future[Optional[dict[str, Any]]]]) -> None:
+        profile_batch_size.observe(len(batch))
+        try:
+            records = self.backend.lookup(list(batch))
+        except Exception as e:
+            with self._condition:
+                for email in batch:
+                    del self._inflight[email]
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        expiry = time.monotonic() + self.ttl
+        with self._condition:
+            for email in batch:
+                self._cache[email] = (expiry, records.get(email))
+                self._cache.move_to_end(email)
+                del self._inflight[email]
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        for email, future in batch.items():
+            future.set_result(records.get(email))
+
+
+def _normalize(email: str) -> str:
+    return email.strip().lower()
+
+
+def _build_profile_resolver() -> Optional[ProfileResolver]:
+    configuration = Configuration()
+    if configuration.profile_backend == "none":
+        return None
+    if configuration.profile_backend != "sqlite":
+        raise ValueError(f"Unknown profile backend: {configuration.profile_backend!r}")
+    return ProfileResolver(
+        SQLiteProfileStore(configuration.profile_db_path),
+        ttl=configuration.profile_cache_ttl_seconds,
+        maxsize=configuration.profile_cache_size,
+        max_batch=configuration.profile_batch_size,
+        max_delay=configuration.profile_batch_delay_seconds,
+    )
+
+
+profile_resolver_resource = registry.register("profile_resolver", _build_profile_resolver)
+
+
+def build_profile(configuration: Configuration, record: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """Merge the configured identity with the backend's record and classify the user."""
+    record = record or {}
+    profile = {
+        "email": configuration.email or record.get("email"),
+        "name": configuration.name or record.get("name"),
+        "account_id": configuration.account_id or record.get("account_id"),
+    }
+    if record.get("plan"):
+        profile["plan"] = record["plan"]
+    if profile["account_id"]:
+        profile["user_type"] = ACCOUNT
+    else:
+        profile["user_type"] = LEAD if profile["email"] else VISITOR
+    return profile
+
+
+def state_user_type(state: Mapping[str, Any], configuration: Configuration) -> str:
+    """Return the user type resolved by ``fetch_user_info``, or classify the configuration."""
+    try:
+        resolved = json.loads(state.get("user_info") or "{}").get("user_type")
+    except ValueError:
+        resolved = None
+    return resolved or user_type(configuration)
+
+
+def _identity(configuration: Configuration) -> str:
+    email = _normalize(configuration.email or "")
+    return json.dumps([email, configuration.name, configuration.account_id])
+
+
+def _reusable(state: dict[str, Any], identity: str, ttl: float) -> bool:
+    resolved = state.get("user_profile") or {}
+    return (
+        resolved.get("identity") == identity
+        and time.time() - resolved.get("resolved_at", 0.0) < ttl
+    )
+
+
+def resolve_profile(configuration: Configuration) -> dict[str, Any]:
+    """Look up the configured user and return their classified profile.
+
+    If the backend fails, the user is classified from the configuration alone.
+    """
+    return _resolve(configuration)[0]
+
+
+async def aresolve_profile(configuration: Configuration) -> dict[str, Any]:
+    """Async counterpart of :func:`resolve_profile`."""
+    return (await _aresolve(configuration))[0]
+
+
+def _resolve(configuration: Configuration) -> tuple[dict[str, Any], bool]:
+    # The profile, and whether it may be kept: not when the backend failed.
+    resolver = profile_resolver_resource.get()
+    if resolver is None or not configuration.email:
+        profile_lookups.inc(source="none")
+        return build_profile(configuration, None), True
+    try:
+        record = resolver.lookup(configuration.email)
+    except Exception:
+        return _unresolved(configuration), False
+    return build_profile(configuration, record), True
+
+
+async def _aresolve(configuration: Configuration) -> tuple[dict[str, Any], bool]:
+    resolver = profile_resolver_resource.get()
+    if resolver is None or not configuration.email:
+        profile_lookups.inc(source="none")
+        return build_profile(configuration, None), True
+    try:
+        record = await resolver.alookup(configuration.email)
+    except Exception:
+        return _unresolved(configuration), False
+    return build_profile(configuration, record), True
+
+
+def _unresolved(configuration: Configuration) -> dict[str, Any]:
+    # A profile backend outage must not fail the turn; the next turn tries again.
+    logger.warning(
+        "Profile lookup failed; classifying the user from the configuration", exc_info=True
+    )
+    return build_profile(configuration, None)
+
+
+def _update(identity: str, profile: dict[str, Any], resolved: bool) -> dict[str, Any]:
+    update: dict[str, Any] = {"user_info": json.dumps(profile)}
+    if resolved:
+        update["user_profile"] = {"identity": identity, "resolved_at": time.time()}
+    return update
+
+
+def fetch_user_info(state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+    """Put the user's profile in the state, unless it is already there and fresh."""
+    configuration = Configuration.from_runnable_config(config)
+    identity = _identity(configuration)
+    if _reusable(state, identity, configuration.profile_cache_ttl_seconds):
+        profile_lookups.inc(source="state")
+        return {}
+    return _update(identity, *_resolve(configuration))
+
+
+async def afetch_user_info(state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+    """Async counterpart of :func:`fetch_user_info`."""
+    configuration = Configuration.from_runnable_config(config)
+    identity = _identity(configuration)
+    if _reusable(state, identity, configuration.profile_cache_ttl_seconds):
+        profile_lookups.inc(source="state")
+        return {}
+    return _update(identity, *(await _aresolve(configuration)))
+
+
+fetch_user_info_node = RunnableLambda(
+    fetch_user_info, afunc=afetch_user_info, name="fetch_user_info"
+)
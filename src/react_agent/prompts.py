@@ -0,0 +1,27 @@
+"""Default prompts used by the agent.
+
+The primary assistant's system prompt is split in two: the static
+instructions, which are identical for every conversation and can be cached by
+the model provider, and a short trailing segment with per-conversation context.
+"""
+
+PRIMARY_ASSISTANT_INSTRUCTIONS = (
+    "You are a helpful customer support assistant for SuperAGI. "
+    "Your primary role is to lookup knowledge base to answer customer queries regarding SuperAGI's product, pricing, technology, etc. "
+    "If a customer makes any request which you are unable to handle, or asks any query which you are unable to answer, "
+    "delegate the task to the human assistant by invoking the corresponding tool."
+    # " You are not able to book demo calls yourself."
+    # " Only the specialized assistants are given permission to do this for the user."
+    # "The user is not aware of the different specialized assistants, so do not mention them; just quietly delegate through function calls. "
+    # "Provide detailed information to the customer, and always double-check the database before concluding that information is unavailable. "
+    # " When searching, be persistent. Expand your query bounds if the first search returns no results. "
+    # " If a search comes up empty, expand your search before giving up."
+)
+
+USER_CONTEXT = (
+    "Current user information:\n<User>\n{user_info}\n</User>"
+    "\nCurrent time: {time}."
+)
+
+# Sent as the first message, ahead of the history window it stands in for.
+CONVERSATION_SUMMARY = "Summary of the earlier conversation:\n<Summary>\n{summary}\n</Summary>"
@@ -0,0 +1,101 @@
+"""Lazily constructed, process-wide resources.
+
+Clients, the knowledge-base retriever and the compiled graph are expensive to
+build and some of them need network access. Each of them is registered here as
+a :class:`LazyResource` so that importing the package stays cheap; the value is
+built on first use and then shared by every thread in the process.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Generic, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_resources: dict[str, LazyResource[Any]] = {}
+_registry_lock = threading.Lock()
+
+
+class LazyResource(Generic[T]):
+    """A value that is built on first use and shared across threads."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        """Name a resource built by ``factory`` on first use."""
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._initialized = False
+
+    @property
+    def initialized(self) -> bool:
+        """Whether the value has already been built."""
+        return self._initialized
+
+    def get(self) -> T:
+        """Return the shared value, building it if needed."""
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._value = self._factory()
+                    self._initialized = True
+        return self._value  # type: ignore[return-value]
+
+    def override(self, value: T) -> None:
+        """Replace the shared value, e.g. with a stand-in for tests."""
+        with self._lock:
+            self._value = value
+            self._initialized = True
+
+    def reset(self) -> None:
+        """Drop the shared value so that the next use builds it again."""
+        with self._lock:
+            self._value = None
+            self._initialized = False
+
+
+def register(name: str, factory: Callable[[], T]) -> LazyResource[T]:
+    """Register a lazily built resource under ``name``."""
+    resource = LazyResource(name, factory)
+    with _registry_lock:
+        if name in _resources:
+            raise ValueError(f"Resource {name!r} is already registered")
+        _resources[name] = resource
+    return resource
+
+
+def get(name: str) -> LazyResource[Any]:
+    """Return the registered resource called ``name``."""
+    return _resources[name]
+
+
+def initialized() -> list[str]:
+    """Return the names of the resources that have been built so far."""
+    return [name for name, resource in _resources.items() if resource.initialized]
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> dict[str, float]:
+    """Build resources ahead of the first request.
+
+    Deployments can call this from a startup hook so that the first user does
+    not pay for client construction, knowledge-base embedding and graph
+    compilation.
+
+    Args:
+        names: The resources to build. Defaults to all of them, in registration
+            order.
+
+    Returns:
+        The time in seconds spent building each resource.
+    """
+    # Importing the graph registers every resource the agent depends on.
+    import react_agent.graph  # noqa: F401
+
+    timings = {}
+    for name in list(names if names is not None else _resources):
+        start = time.perf_counter()
+        _resources[name].get()
+        timings[name] = time.perf_counter() - start
+    return timings
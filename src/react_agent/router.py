@@ -0,0 +1,309 @@
+"""A deterministic fast path in front of the primary assistant.
+
+Some requests are unambiguous: "talk to a human" always ends in a handoff and
+"what's the pricing" always starts with a knowledge-base lookup. Without a
+fast path, each of them costs a full model call that only decides to call the
+tool. The ``pre_router`` node classifies the user's message locally:
+
+1. High-precision regular expressions. A rule hit is discarded when one of
+   its intent's guards also matches: a negation ("I don't want to talk to a
+   human") or a complaint ("the integration is broken") needs the model, so
+   the message is left to it without consulting the centroids.
+2. If no rule matches, the message embedding's nearest intent centroid, built
+   from a few example utterances per intent. It is only used when the best
+   centroid is similar enough and clearly ahead of the runner-up.
+
+A confident ``handoff`` goes straight to ``enter_human_assistant``. A confident
+``faq`` runs ``lookup_knowledge_base`` on the message before the primary
+assistant's first model call. Anything else goes to the primary assistant.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from react_agent import metrics, registry
+from react_agent.assistant import human_handoff_message
+from react_agent.configuration import Configuration
+from react_agent.state import State
+from react_agent.tools.lookup_knowledge_base import (
+    lookup_knowledge_base,
+    retriever_resource,
+)
+from react_agent.utils import get_message_text
+from react_agent.vectors import l2_normalize
+
+logger = logging.getLogger(__name__)
+
+HANDOFF = "handoff"
+FAQ = "faq"
+OTHER = "other"
+
+DEFAULT_RULES: dict[str, Sequence[str]] = {
+    HANDOFF: (
+        r"\b(talk|speak|chat|connect me)\b.{0,20}\b(human|person|agent|someone|representative|rep)\b",
+        r"^\W*(human|agent|operator|representative)( please)?\W*$",
+        r"\b(agent|human|operator) please\b",
+        r"\breal (person|human)\b",
+        r"\bcustomer (service|support) (rep|representative|agent)\b",
+    ),
+    FAQ: (
+        r"\b(pricing|prices?|how much|cost)\b",
+        r"\bfree (trial|tier|plan)\b",
+        r"\b(book|schedule|get) a demo\b",
+        r"\bsign ?up\b",
+        r"\bintegrat(e|es|ion|ions)\b",
+    ),
+}
+
+# Patterns that veto a rule hit for their intent.
+_NEGATION = r"\b(don'?t|do not|doesn'?t|no need|never|not|without|stop)\b"
+_COMPLAINT = (
+    r"\b(why|wrong|broken|break|not working|(doesn|isn|won|can)'?t|cannot|error|fail\w*|bug"
+    r"|issue|problem|charged|overcharged|refund|invoice|bill(ed|ing)?)\b"
+)
+DEFAULT_GUARDS: dict[str, Sequence[str]] = {
+    HANDOFF: (
+        _NEGATION + r".{0,30}\b(talk|speak|chat|human|person|agent|someone|representative|rep|operator)\b",
+    ),
+    FAQ: (_COMPLAINT,),
+}
+
+DEFAULT_EXAMPLES: dict[str, Sequence[str]] = {
+    HANDOFF: (
+        "I want to talk to a human",
+        "Can I speak with a real person?",
+        "Please transfer me to a support agent",
+        "Get me a representative",
+        "I need to talk to someone from your team",
+        "Connect me with sales",
+    ),
+    FAQ: (
+        "What does SuperSales cost?",
+        "Is there a free trial?",
+        "Which CRMs do you integrate with?",
+        "How do I book a demo?",
+        "What features are in the Growth plan?",
+        "What is SuperSupport?",
+        "How does lead scoring work?",
+    ),
+    OTHER: (
+        "Hi there",
+        "Thanks, that's all",
+        "My invoice from last month looks wrong",
+        "I can't log in to my account",
+        "Can you update my billing email?",
+        "ok",
+    ),
+}
+
+router_decisions = metrics.counter(
+    "router_decisions_total",
+    "Pre-router decisions, by intent and method: rule, guard (a vetoed rule hit), centroid "
+    "or none (left to the model).",
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    """The pre-router's decision for one user message."""
+
+    intent: str
+    confidence: float
+    method: str
+
+
+class IntentRouter:
+    """Rule and nearest-centroid intent classifier.
+
+    Args:
+        rules: Regular expressions per intent, tried in order.
+        guards: Regular expressions per intent that veto a rule hit for it.
+        centroids: A unit-length centroid per intent, or None for rules only.
+        min_similarity: The least cosine similarity to trust a centroid.
+        min_margin: How far the best centroid must be ahead of the runner-up.
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[str, Iterable[str]] = DEFAULT_RULES,
+        guards: Mapping[str, Iterable[str]] = DEFAULT_GUARDS,
+        centroids: Optional[Mapping[str, np.ndarray]] = None,
+        min_similarity: float = 0.55,
+        min_margin: float = 0.05,
+    ):
+        """Compile the rules and guards."""
+        self.rules = {
+            intent: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for intent, patterns in rules.items()
+        }
+        self.guards = {
+            intent: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for intent, patterns in guards.items()
+        }
+        self.intents = list(centroids or {})
+        self.centroids = (
+            np.stack([centroids[intent] for intent in self.intents]) if centroids else None
+        )
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+
+    @classmethod
+    def from_examples(
+        cls,
+        embed: Callable[[list[str]], np.ndarray],
+        examples: Mapping[str, Sequence[str]] = DEFAULT_EXAMPLES,
+        **kwargs: Any,
+    ) -> IntentRouter:
+        """Build centroids by embedding ``examples`` with ``embed`` (one call)."""
+        texts = [text for utterances in examples.values() for text in utterances]
+        vectors = l2_normalize(embed(texts))
+        centroids, start = {}, 0
+        for intent, utterances in examples.items():
+            centroids[intent] = l2_normalize(vectors[start : start + len(utterances)].mean(axis=0))
+            start += len(utterances)
+        return cls(centroids=centroids, **kwargs)
+
+    @property
+    def uses_embeddings(self) -> bool:
+        """Whether the router falls back to centroids when no rule matches."""
+        return self.centroids is not None
+
+    def match_rules(self, text: str) -> Optional[Route]:
+        """Return the first intent whose rules match, or None.
+
+        A guarded hit returns ``other`` with method ``guard``: the message is
+        left to the model rather than to the centroids.
+        """
+        for intent, patterns in self.rules.items():
+            if any(pattern.search(text) for pattern in patterns):
+                if any(guard.search(text) for guard in self.guards.get(intent, ())):
+                    return Route(OTHER, 0.0, "guard")
+                return Route(intent, 1.0, "rule")
+        return None
+
+    def match_centroid(self, vector: np.ndarray) -> Route:
+        """Return the intent of the nearest centroid, or ``other`` if it is not clear-cut."""
+        similarity = self.centroids @ l2_normalize(vector)
+        order = np.argsort(-similarity)
+        best = float(similarity[order[0]])
+        runner_up = float(similarity[order[1]]) if len(order) > 1 else -1.0
+        if best < self.min_similarity or best - runner_up < self.min_margin:
+            return Route(OTHER, best, "none")
+        return Route(self.intents[order[0]], best, "centroid")
+
+    def route(self, text: str, embed: Optional[Callable[[str], np.ndarray]] = None) -> Route:
+        """Classify ``text``; ``embed`` is only called when no rule matches."""
+        route = self.match_rules(text)
+        if route is None and self.uses_embeddings and embed is not None:
+            route = self.match_centroid(embed(text))
+        return route or Route(OTHER, 0.0, "none")
+
+
+def evaluate(
+    router: IntentRouter,
+    labeled: Sequence[tuple[str, str]],
+    embed: Optional[Callable[[str], np.ndarray]] = None,
+) -> dict[str, Any]:
+    """Score the router against ``(user message, expected intent)`` pairs.
+
+    Returns:
+        ``accuracy`` (treating "left to the model" as ``other``), ``coverage``
+        (the share of messages given a fast path), the ``precision`` and
+        ``recall`` of each fast-path intent and the misrouted messages.
+    """
+    routes = [router.route(text, embed) for text, _ in labeled]
+    predicted = [route.intent for route in routes]
+    expected = [intent for _, intent in labeled]
+    report: dict[str, Any] = {
+        "messages": len(labeled),
+        "accuracy": float(np.mean([p == e for p, e in zip(predicted, expected)])),
+        "coverage": float(np.mean([p != OTHER for p in predicted])),
+        "precision": {},
+        "recall": {},
+        "errors": [],
+    }
+    for intent in (HANDOFF, FAQ):
+        chosen = [e for p, e in zip(predicted, expected) if p == intent]
+        relevant = [p for p, e in zip(predicted, expected) if e == intent]
+        report["precision"][intent] = (
+            chosen.count(intent) / len(chosen) if chosen else None
+        )
+        report["recall"][intent] = relevant.count(intent) / len(relevant) if relevant else None
+    for (text, want), route in zip(labeled, routes):
+        if route.intent != want:
+            report["errors"].append({"text": text, "expected": want, **route.__dict__})
+    return report
+
+
+def _build_router() -> IntentRouter:
+    configuration = Configuration()
+    kwargs: dict[str, Any] = {
+        "min_similarity": configuration.fast_router_min_similarity,
+        "min_margin": configuration.fast_router_min_margin,
+    }
+    if not configuration.fast_router_embeddings:
+        return IntentRouter(**kwargs)
+    return IntentRouter.from_examples(retriever_resource.get().embed_queries, **kwargs)
+
+
+router_resource = registry.register("intent_router", _build_router)
+
+
+def _message_to_route(state: State, config: RunnableConfig) -> Optional[str]:
+    if not Configuration.from_runnable_config(config).fast_router:
+        return None
+    messages = state["messages"]
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return None
+    return get_message_text(messages[-1]).strip() or None
+
+
+def _decide(state: State, route: Route) -> dict[str, Any]:
+    router_decisions.inc(intent=route.intent, method=route.method)
+    if route.intent == HANDOFF:
+        return {"messages": [human_handoff_message(state, id_prefix="route")]}
+    if route.intent == FAQ:
+        text = get_message_text(state["messages"][-1]).strip()
+        call = {
+            "name": lookup_knowledge_base.name,
+            "args": {"query": text},
+            "id": f"route_{uuid.uuid4().hex}",
+            "type": "tool_call",
+        }
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+    return {}
+
+
+def pre_route(state: State, config: RunnableConfig) -> dict[str, Any]:
+    """Take the fast path for an unambiguous handoff or FAQ request, if enabled."""
+    text = _message_to_route(state, config)
+    if text is None:
+        return {}
+    router = router_resource.get()
+    embed = retriever_resource.get().embed_query if router.uses_embeddings else None
+    return _decide(state, router.route(text, embed))
+
+
+async def apre_route(state: State, config: RunnableConfig) -> dict[str, Any]:
+    """Async counterpart of :func:`pre_route`; embeddings share the request batcher."""
+    text = _message_to_route(state, config)
+    if text is None:
+        return {}
+    router = router_resource.get()
+    route = router.match_rules(text)
+    if route is None and router.uses_embeddings:
+        vector = (await retriever_resource.get().aembed_queries([text]))[0]
+        route = router.match_centroid(vector)
+    return _decide(state, route or Route(OTHER, 0.0, "none"))
+
+
+pre_router = RunnableLambda(pre_route, afunc=apre_route, name="pre_router")
@@ -0,0 +1,95 @@
+"""Share one copy of the knowledge base between worker processes.
+
+Without a published knowledge base, every worker embeds the built-in FAQ and
+holds its own copy of the chunks and the embedding matrix, so memory grows
+with the number of workers and each one repeats the startup work. Instead, a
+loader publishes the knowledge base once as a generation (see
+:mod:`react_agent.ingest`) under a root on a RAM-backed filesystem, and the
+workers serve it with ``KB_PATH`` pointing at that root::
+
+    python -m react_agent.shared_kb /dev/shm/react-agent-kb
+    KB_PATH=/dev/shm/react-agent-kb gunicorn ...
+
+Workers memory-map the matrix, the index and the packed chunks read-only, so
+the operating system keeps one copy of their pages for all of them. When the
+knowledge base changes, running the loader again (or ``react_agent.ingest``)
+publishes a new generation, which the workers swap to on their next check.
+The loader can also run in a pre-fork hook of the server through
+:func:`publish_builtin`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from react_agent.configuration import Configuration
+from react_agent.embedding_cache import embed_texts
+from react_agent.ingest import (
+    GENERATIONS,
+    PathLike,
+    current_generation,
+    publish_documents,
+)
+
+
+def default_root() -> str:
+    """Return a directory for the shared knowledge base, in ``/dev/shm`` when available."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "react-agent-kb")
+
+
+def publish_builtin(root: PathLike, configuration: Optional[Configuration] = None) -> str:
+    """Publish the built-in knowledge base under ``root`` unless it is already live.
+
+    Returns:
+        The name of the live generation.
+    """
+    from react_agent.tools import lookup_knowledge_base as kb
+
+    configuration = configuration or Configuration()
+    model = configuration.embedding_model
+    source = f"builtin:{kb.docs_generation(kb.docs, model)}"
+    live = current_generation(root)
+    if live is not None:
+        manifest = json.loads(Path(root, GENERATIONS, live, "manifest.json").read_text())
+        dtype = manifest.get("dtype")
+        if manifest.get("source") == source and dtype == configuration.embedding_dtype:
+            return live
+
+    texts = [doc["page_content"] for doc in kb.docs]
+    store = kb.embedding_store(configuration)
+    client = kb.openai_client.get()
+    if store is not None:
+        vectors = store.embed_documents(texts, client)
+    else:
+        vectors = embed_texts(client, model, texts)
+    ivf = configuration.vector_index == "ivf"
+    return publish_documents(
+        root,
+        kb.docs,
+        vectors,
+        model,
+        dtype=configuration.embedding_dtype,
+        index=configuration.vector_index,
+        index_params={"n_lists": configuration.ivf_lists} if ivf else None,
+        source=source,
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Publish the built-in knowledge base: ``python -m react_agent.shared_kb [ROOT]``."""
+    parser = argparse.ArgumentParser(description="Publish the built-in knowledge base.")
+    parser.add_argument("root", nargs="?", default=Configuration().kb_path or default_root())
+    args = parser.parse_args(argv)
+    name = publish_builtin(args.root)
+    sys.stdout.write(json.dumps({"root": args.root, "generation": name}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
-from typing import Annotated, Literal, Optional
+from typing import Annotated, Any, Literal, Optional
 
+from langchain_core.messages import AnyMessage
 from typing_extensions import TypedDict
 
-from langgraph.graph.message import AnyMessage, add_messages
+from react_agent.message_log import merge_messages
 
 
 def update_dialog_stack(left: list[str], right: Optional[str]) -> list[str]:
@@ -14,10 +15,21 @@ def update_dialog_stack(left: list[str], right: Optional[str]) -> list[str]:
     return left + [right]
 
 class InputState(TypedDict):
-    messages: Annotated[list[AnyMessage], add_messages]
+    messages: Annotated[list[AnyMessage], merge_messages]
 
 class State(InputState):
     user_info: str = "{}"
+    # The identity user_info was resolved for and when. See react_agent.profiles.
+    user_profile: Optional[dict[str, Any]]
+    # Rolling summary of the turns that no longer fit the model's context window,
+    # and the id of the last message folded into it. See react_agent.context.
+    conversation_summary: str
+    summarized_through: Optional[str]
+    # The id of the last message whose turn has its tool results shortened.
+    compacted_through: Optional[str]
+    # Documents retrieved speculatively for the lookup the model just asked for,
+    # as {"query": ..., "docs": [...]}. See react_agent.prefetch.
+    kb_prefetch: Optional[dict[str, Any]]
     dialog_state: Annotated[
         list[
             Literal[
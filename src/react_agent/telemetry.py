@@ -0,0 +1,197 @@
+"""Latency, token and cost instrumentation for the support agent graph.
+
+Every graph node is wrapped by :func:`instrument`, which records its wall time,
+and the primary assistant's model calls go through :func:`call_model`, which
+streams the response to measure the time to first token and records token
+usage and an estimated cost. Measurements are aggregated in
+:mod:`react_agent.metrics` histograms and counters. Each one is also written
+as a single-line JSON object to the ``react_agent.telemetry`` logger at INFO
+level, for log pipelines that prefer events to scrapes.
+
+With ``metrics_port`` set, :func:`build_graph <react_agent.graph.build_graph>`
+starts the local endpoint serving ``/metrics`` and ``/metrics.json``.
+"""
+
+from __future__ import annotations
+
+import http.server
+import json
+import logging
+import time
+from typing import Any, Callable, Optional, Union, cast
+
+from langchain_core.messages import AIMessage, message_chunk_to_message
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from react_agent import metrics, registry
+from react_agent.configuration import Configuration
+
+event_logger = logging.getLogger("react_agent.telemetry")
+
+TOKEN_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+node_seconds = metrics.histogram(
+    "graph_node_seconds",
+    "Wall time of each graph node, by node and status: ok or error.",
+    buckets=metrics.LATENCY_BUCKETS,
+)
+model_ttft = metrics.histogram(
+    "assistant_time_to_first_token_seconds",
+    "Time from sending a primary assistant model call to its first streamed chunk.",
+    buckets=metrics.LATENCY_BUCKETS,
+)
+model_seconds = metrics.histogram(
+    "assistant_model_call_seconds",
+    "Wall time of each primary assistant model call.",
+    buckets=metrics.LATENCY_BUCKETS,
+)
+call_tokens = metrics.histogram(
+    "assistant_call_tokens",
+    "Tokens per model call, by kind: uncached, cache_read, cache_creation or output.",
+    buckets=TOKEN_BUCKETS,
+)
+output_tokens = metrics.counter(
+    "assistant_output_tokens_total", "Output tokens generated by the primary assistant model."
+)
+model_cost = metrics.counter(
+    "assistant_cost_usd_total",
+    "Estimated cost of the primary assistant's model calls, from the configured token prices.",
+)
+
+
+def log_event(event: str, **fields: Any) -> None:
+    """Write one measurement as a JSON log record."""
+    if event_logger.isEnabledFor(logging.INFO):
+        event_logger.info(json.dumps({"event": event, **fields}, default=str))
+
+
+def instrument(
+    name: str, node: Union[Runnable[Any, Any], Callable[..., Any]]
+) -> Runnable[Any, Any]:
+    """Wrap a graph node so that each run records its wall time."""
+    runnable = node if isinstance(node, Runnable) else RunnableLambda(node, name=name)
+
+    def invoke(state: dict[str, Any], config: RunnableConfig) -> Any:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = runnable.invoke(state, config)
+            status = "ok"
+            return result
+        finally:
+            _record_node(name, time.perf_counter() - started, status)
+
+    async def ainvoke(state: dict[str, Any], config: RunnableConfig) -> Any:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await runnable.ainvoke(state, config)
+            status = "ok"
+            return result
+        finally:
+            _record_node(name, time.perf_counter() - started, status)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=name)
+
+
+def _record_node(name: str, seconds: float, status: str) -> None:
+    node_seconds.observe(seconds, node=name, status=status)
+    log_event("node", node=name, seconds=round(seconds, 6), status=status)
+
+
+def call_model(
+    runnable: Runnable[Any, Any], input: Any, config: RunnableConfig, tier: str = "primary"
+) -> AIMessage:
+    """Stream a model call to completion, recording latency, tokens and cost.
+
+    ``tier`` names the model tier called, ``"primary"`` or ``"fast"``, which
+    selects the token prices.
+    """
+    started = time.perf_counter()
+    first: Optional[float] = None
+    message = None
+    for chunk in runnable.stream(input, config):
+        if first is None:
+            first = time.perf_counter() - started
+        message = chunk if message is None else message + chunk
+    return _record_model_call(message, first, time.perf_counter() - started, config, tier)
+
+
+async def acall_model(
+    runnable: Runnable[Any, Any], input: Any, config: RunnableConfig, tier: str = "primary"
+) -> AIMessage:
+    """Async counterpart of :func:`call_model`."""
+    started = time.perf_counter()
+    first: Optional[float] = None
+    message = None
+    async for chunk in runnable.astream(input, config):
+        if first is None:
+            first = time.perf_counter() - started
+        message = chunk if message is None else message + chunk
+    return _record_model_call(message, first, time.perf_counter() - started, config, tier)
+
+
+def token_usage(message: AIMessage) -> dict[str, int]:
+    """Split a model call's usage into uncached, cache_read, cache_creation and output tokens."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    cache_read = details.get("cache_read") or 0
+    cache_creation = details.get("cache_creation") or 0
+    return {
+        "uncached": max(usage.get("input_tokens", 0) - cache_read - cache_creation, 0),
+        "cache_read": cache_read,
+        "cache_creation": cache_creation,
+        "output": usage.get("output_tokens", 0),
+    }
+
+
+def estimate_cost(
+    tokens: dict[str, int], configuration: Configuration, tier: str = "primary"
+) -> float:
+    """Estimate the cost in USD of a model call from the configured per-million prices."""
+    prefix = "fast_model" if tier == "fast" else "model"
+
+    def price(kind: str) -> float:
+        return float(getattr(configuration, f"{prefix}_{kind}_usd_per_mtok"))
+
+    return (
+        tokens["uncached"] * price("input")
+        + tokens["cache_read"] * price("cache_read")
+        + tokens["cache_creation"] * price("cache_write")
+        + tokens["output"] * price("output")
+    ) / 1_000_000
+
+
+def _record_model_call(
+    chunk: Any, ttft: Optional[float], seconds: float, config: RunnableConfig, tier: str
+) -> AIMessage:
+    message = cast(AIMessage, message_chunk_to_message(chunk))
+    model_seconds.observe(seconds)
+    if ttft is not None:
+        model_ttft.observe(ttft)
+    tokens = token_usage(message)
+    cost = estimate_cost(tokens, Configuration.from_runnable_config(config), tier)
+    if getattr(message, "usage_metadata", None):
+        for kind, count in tokens.items():
+            call_tokens.observe(count, kind=kind)
+        output_tokens.inc(tokens["output"])
+        model_cost.inc(cost)
+    log_event(
+        "model_call",
+        tier=tier,
+        seconds=round(seconds, 6),
+        ttft_seconds=None if ttft is None else round(ttft, 6),
+        tokens=tokens,
+        cost_usd=round(cost, 8),
+    )
+    return message
+
+
+def _serve_metrics() -> Optional[http.server.ThreadingHTTPServer]:
+    configuration = Configuration()
+    if configuration.metrics_port <= 0:
+        return None
+    return metrics.serve(configuration.metrics_port, configuration.metrics_host)
+
+
+metrics_endpoint = registry.register("metrics_endpoint", _serve_metrics)
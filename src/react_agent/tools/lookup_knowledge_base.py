@@ -1,9 +1,34 @@
-import re
+import hashlib
+import time
+from typing import Annotated, Any, Optional, Sequence, Union, cast
 
 import numpy as np
-import openai
-from langchain_core.tools import tool
-import requests
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+from langgraph.prebuilt import InjectedState
+
+from react_agent import metrics, registry
+from react_agent.bm25 import BM25Index, LexicalThreshold, reciprocal_rank_fusion
+from react_agent.chunking import chunk_markdown, select_within_budget
+from react_agent.configuration import Configuration
+from react_agent.embedding_batcher import EmbeddingBatcher
+from react_agent.embedding_cache import (
+    EmbeddingStore,
+    QueryEmbeddingCache,
+    SQLiteEmbeddingTier,
+    embed_texts,
+    normalize_query,
+)
+from react_agent.ingest import (
+    Generation,
+    GenerationWatcher,
+    current_generation,
+    load_generation,
+)
+from react_agent.telemetry import log_event
+from react_agent.utils import BatchedTool
+from react_agent.vector_index import VectorIndex, index_for
+from react_agent.vectors import EmbeddingMatrix
 
 faq_text = """
 # SuperAGI
@@ -239,41 +264,537 @@ For Enterprises, we also offer custom pricing plans which you can discuss with o
     3. Agent Performance
 """
 
-docs = [{"page_content": txt} for txt in re.split(r"(?=\n##)", faq_text)]
+docs = chunk_markdown(faq_text, max_tokens=Configuration().kb_chunk_max_tokens)
 
 
 class VectorStoreRetriever:
-    def __init__(self, docs: list, vectors: list, oai_client):
-        self._arr = np.array(vectors)
+    def __init__(
+        self,
+        docs: Sequence[dict[str, Any]],
+        vectors: Union[list[list[float]], np.ndarray, EmbeddingMatrix, VectorIndex],
+        oai_client: Any,
+        model: str = "text-embedding-3-small",
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        async_client: Any = None,
+        lexical_index: Optional[BM25Index] = None,
+        lexical_threshold: Optional[LexicalThreshold] = None,
+        dtype: str = "float32",
+        index: str = "exact",
+        index_params: Optional[dict[str, Any]] = None,
+        batcher: Optional[EmbeddingBatcher] = None,
+        generation: Optional[str] = None,
+    ):
+        self.index = index_for(vectors, index, dtype=dtype, params=index_params)
         self._docs = docs
+        # Names the knowledge base being served, so caches of answers grounded
+        # on it can tell when it changes.
+        self.generation = generation or docs_generation(docs, model)
         self._client = oai_client
+        self._async_client = async_client
+        self._model = model
+        self.query_cache = query_cache
+        self.lexical_index = lexical_index
+        self.lexical_threshold = lexical_threshold
+        self.batcher = batcher
 
     @classmethod
-    def from_docs(cls, docs, oai_client):
-        embeddings = oai_client.embeddings.create(
-            model="text-embedding-3-small", input=[doc["page_content"] for doc in docs]
+    def from_docs(
+        cls,
+        docs: Sequence[dict[str, Any]],
+        oai_client: Any,
+        model: str = "text-embedding-3-small",
+        store: Optional[EmbeddingStore] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        async_client: Any = None,
+        hybrid: bool = False,
+        lexical_threshold: Optional[LexicalThreshold] = None,
+        dtype: str = "float32",
+        index: str = "exact",
+        index_params: Optional[dict[str, Any]] = None,
+        batcher: Optional[EmbeddingBatcher] = None,
+    ) -> "VectorStoreRetriever":
+        """Embed ``docs``, through ``store`` when given, and build a retriever over them."""
+        texts = [doc["page_content"] for doc in docs]
+        if store is not None:
+            vectors = store.embed_documents(texts, oai_client)
+        else:
+            vectors = embed_texts(oai_client, model, texts)
+        return cls(
+            docs,
+            vectors,
+            oai_client,
+            model=model,
+            query_cache=query_cache,
+            async_client=async_client,
+            lexical_index=BM25Index(texts) if hybrid else None,
+            lexical_threshold=lexical_threshold,
+            dtype=dtype,
+            index=index,
+            index_params=index_params,
+            batcher=batcher,
         )
-        vectors = [emb.embedding for emb in embeddings.data]
-        return cls(docs, vectors, oai_client)
 
-    def query(self, query: str, k: int = 5) -> list[dict]:
-        embed = self._client.embeddings.create(
-            model="text-embedding-3-small", input=[query]
-        )
-        # "@" is just a matrix multiplication in python
-        scores = np.array(embed.data[0].embedding) @ self._arr.T
-        top_k_idx = np.argpartition(scores, -k)[-k:]
-        top_k_idx_sorted = top_k_idx[np.argsort(-scores[top_k_idx])]
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query, serving repeated (normalized) queries from the cache."""
+        vector: np.ndarray = self.embed_queries([query])[0]
+        return vector
+
+    async def aembed_query(self, query: str) -> np.ndarray:
+        """Async counterpart of :meth:`embed_query` using the async OpenAI client."""
+        vector: np.ndarray = (await self.aembed_queries([query]))[0]
+        return vector
+
+    def embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Embed several queries with at most one embeddings request."""
+        vectors, missing = self._cached_queries(queries)
+        if missing:
+            started = time.perf_counter()
+            embed = self._client.embeddings.create(model=self._model, input=list(missing))
+            embedding_seconds.observe(time.perf_counter() - started, client="sync")
+            self._fill_missing(queries, vectors, missing, [e.embedding for e in embed.data])
+        return np.stack(cast(list[np.ndarray], vectors))
+
+    async def aembed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Async counterpart of :meth:`embed_queries` using the async OpenAI client.
+
+        With a batcher, the request is shared with other lookups made within
+        the same batching window.
+        """
+        if self._async_client is None and self.batcher is None:
+            raise ValueError("VectorStoreRetriever was built without an async client")
+        vectors, missing = self._cached_queries(queries)
+        if missing:
+            if self.batcher is not None:
+                embeddings = await self.batcher.embed(list(missing))
+            else:
+                started = time.perf_counter()
+                embed = await self._async_client.embeddings.create(
+                    model=self._model, input=list(missing)
+                )
+                embedding_seconds.observe(time.perf_counter() - started, client="async")
+                embeddings = [e.embedding for e in embed.data]
+            self._fill_missing(queries, vectors, missing, embeddings)
+        return np.stack(cast(list[np.ndarray], vectors))
+
+    def _cached_queries(
+        self, queries: Sequence[str]
+    ) -> tuple[list[Optional[np.ndarray]], dict[str, list[int]]]:
+        # Returns the cached vectors (None where missing) and, for each distinct
+        # normalized text still to embed, the positions of the queries it answers.
+        vectors: list[Optional[np.ndarray]] = []
+        missing: dict[str, list[int]] = {}
+        for i, query in enumerate(queries):
+            cached = self.query_cache.get(self._model, query) if self.query_cache else None
+            vectors.append(cached)
+            if cached is None:
+                missing.setdefault(normalize_query(query) or query, []).append(i)
+        return vectors, missing
+
+    def _fill_missing(
+        self,
+        queries: Sequence[str],
+        vectors: list[Optional[np.ndarray]],
+        missing: dict[str, list[int]],
+        embeddings: Sequence[list[float]],
+    ) -> None:
+        for positions, embedding in zip(missing.values(), embeddings):
+            vector = self._cache_query(queries[positions[0]], embedding)
+            for i in positions:
+                vectors[i] = vector
+
+    def _cache_query(self, query: str, embedding: list[float]) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32)
+        if self.query_cache is not None:
+            self.query_cache.put(self._model, query, vector)
+        return vector
+
+    def query(self, query: str, k: int = 5) -> list[dict[str, Any]]:
+        """Retrieve the top ``k`` documents for ``query``."""
+        return self.query_many([query], k)[0]
+
+    async def aquery(self, query: str, k: int = 5) -> list[dict[str, Any]]:
+        """Async counterpart of :meth:`query`."""
+        return (await self.aquery_many([query], k))[0]
+
+    def query_many(self, queries: Sequence[str], k: int = 5) -> list[list[dict[str, Any]]]:
+        """Retrieve the top ``k`` documents for each query.
+
+        Queries without a decisive lexical match share one embeddings request
+        and are scored together with a single matrix multiplication.
+        """
+        hits, results, pending = self._lexical_pass(queries, k)
+        if pending:
+            embeddings = self.embed_queries([queries[i] for i in pending])
+            self._fill_ranked(results, pending, embeddings, hits, k)
+        return results
+
+    async def aquery_many(self, queries: Sequence[str], k: int = 5) -> list[list[dict[str, Any]]]:
+        """Async counterpart of :meth:`query_many`."""
+        hits, results, pending = self._lexical_pass(queries, k)
+        if pending:
+            embeddings = await self.aembed_queries([queries[i] for i in pending])
+            self._fill_ranked(results, pending, embeddings, hits, k)
+        return results
+
+    def _lexical_pass(
+        self, queries: Sequence[str], k: int
+    ) -> tuple[list[list[tuple[int, float]]], list[list[dict[str, Any]]], list[int]]:
+        hits = [self._lexical_search(query, k) for query in queries]
+        results: list[list[dict[str, Any]]] = [[] for _ in queries]
+        pending: list[int] = []
+        for i, query_hits in enumerate(hits):
+            if self._is_decisive(query_hits):
+                results[i] = self._lexical_results(query_hits)
+            else:
+                pending.append(i)
+        return hits, results, pending
+
+    def _fill_ranked(
+        self,
+        results: list[list[dict[str, Any]]],
+        pending: list[int],
+        embeddings: np.ndarray,
+        hits: list[list[tuple[int, float]]],
+        k: int,
+    ) -> None:
+        ranked = self._rank(embeddings, k, [hits[i] for i in pending])
+        for i, docs in zip(pending, ranked):
+            results[i] = docs
+
+    def _lexical_search(self, query: str, k: int) -> list[tuple[int, float]]:
+        if self.lexical_index is None:
+            return []
+        return self.lexical_index.search(query, k)
+
+    def _is_decisive(self, hits: list[tuple[int, float]]) -> bool:
+        return self.lexical_threshold is not None and self.lexical_threshold.is_decisive(hits)
+
+    def _lexical_results(self, hits: list[tuple[int, float]]) -> list[dict[str, Any]]:
+        # The lexical match is decisive: no embeddings request is made for this query.
+        retrieval_queries.inc(path="lexical")
         return [
-            {**self._docs[idx], "similarity": scores[idx]} for idx in top_k_idx_sorted
+            {**self._docs[idx], "similarity": None, "lexical_score": score}
+            for idx, score in hits
         ]
 
+    def _rank(
+        self,
+        embeddings: np.ndarray,
+        k: int,
+        lexical_hits: Sequence[list[tuple[int, float]]],
+    ) -> list[list[dict[str, Any]]]:
+        """Rank documents for a batch of query embeddings (one per row)."""
+        k = min(k, len(self._docs))
+        # Hybrid queries fuse the top 2k dense candidates with the lexical ranking.
+        candidates = min(2 * k, len(self._docs)) if any(lexical_hits) else k
+        top_idx, top_scores = self.index.search(embeddings, candidates)
+
+        ranked = []
+        for embedding, idx, scores, hits in zip(embeddings, top_idx, top_scores, lexical_hits):
+            # Approximate indexes pad rows with -1 when they find fewer candidates.
+            found = idx >= 0
+            idx, scores = idx[found], scores[found]
+            if not hits:
+                retrieval_queries.inc(path="vector")
+                _record_scores("vector", scores[:k])
+                ranked.append(
+                    [
+                        {**self._docs[i], "similarity": float(score)}
+                        for i, score in zip(idx[:k].tolist(), scores[:k].tolist())
+                    ]
+                )
+                continue
+
+            retrieval_queries.inc(path="hybrid")
+            similarity = dict(zip(idx.tolist(), scores.tolist()))
+            lexical = dict(hits)
+            fused = [i for i, _ in reciprocal_rank_fusion([idx.tolist(), list(lexical)])[:k]]
+            outside = [i for i in fused if i not in similarity]
+            if outside:
+                similarity.update(zip(outside, self.index.score_rows(embedding, outside)))
+            _record_scores("hybrid", [similarity[i] for i in fused])
+            ranked.append(
+                [
+                    {
+                        **self._docs[i],
+                        "similarity": float(similarity[i]),
+                        "lexical_score": lexical.get(i, 0.0),
+                    }
+                    for i in fused
+                ]
+            )
+        return ranked
+
+
+def docs_generation(docs: Sequence[dict[str, Any]], model: str) -> str:
+    """Return a name for the knowledge base made of ``docs`` embedded with ``model``."""
+    digest = hashlib.sha256(model.encode())
+    for doc in docs:
+        digest.update(b"\0" + doc["page_content"].encode())
+    return f"docs-{digest.hexdigest()[:12]}"
+
+
+retrieval_queries = metrics.counter(
+    "retrieval_queries_total",
+    "Knowledge-base queries, by path: lexical (no embedding call), hybrid or vector.",
+)
+retrieval_top_similarity = metrics.histogram(
+    "retrieval_top_similarity",
+    "Cosine similarity of the best document returned for a query, by path: hybrid or vector.",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+embedding_seconds = metrics.histogram(
+    "embedding_request_seconds",
+    "Wall time of the retriever's query embeddings requests, by client: sync or async.",
+    buckets=metrics.LATENCY_BUCKETS,
+)
+
+
+def _record_scores(path: str, scores: Sequence[float]) -> None:
+    if len(scores) == 0:
+        return
+    top = float(max(scores))
+    retrieval_top_similarity.observe(top, path=path)
+    log_event("retrieval", path=path, results=len(scores), top_similarity=round(top, 4))
+
+
+def embedding_store(configuration: Configuration) -> Optional[EmbeddingStore]:
+    """Return the on-disk store of document embeddings, or None if it is disabled."""
+    if not configuration.embedding_cache_dir:
+        return None
+    return EmbeddingStore(configuration.embedding_cache_dir, configuration.embedding_model)
+
+
+def _query_cache(configuration: Configuration) -> Optional[QueryEmbeddingCache]:
+    if configuration.query_cache_size <= 0:
+        return None
+    ttl = configuration.query_cache_ttl_seconds or None
+    tier = (
+        SQLiteEmbeddingTier(configuration.query_cache_path, ttl=ttl)
+        if configuration.query_cache_path
+        else None
+    )
+    return QueryEmbeddingCache(configuration.query_cache_size, ttl=ttl, tier=tier)
+
+
+def _build_openai_client() -> Any:
+    import openai
+
+    return openai.Client()
+
+
+def _build_async_openai_client() -> Any:
+    import openai
+
+    return openai.AsyncClient()
+
+
+def _lexical_threshold(configuration: Configuration) -> Optional[LexicalThreshold]:
+    if configuration.lexical_min_score <= 0:
+        return None
+    return LexicalThreshold(configuration.lexical_min_score, configuration.lexical_margin)
+
+
+def _embedding_batcher(configuration: Configuration, model: str) -> Optional[EmbeddingBatcher]:
+    if configuration.embedding_batch_window_ms <= 0:
+        return None
+    return EmbeddingBatcher(
+        async_openai_client.get(),
+        model,
+        max_batch=configuration.embedding_batch_max_items,
+        max_delay=configuration.embedding_batch_window_ms / 1000,
+    )
+
+
+def _retriever_from_generation(
+    generation: Generation,
+    configuration: Configuration,
+    query_cache: Optional[QueryEmbeddingCache],
+) -> VectorStoreRetriever:
+    lexical_index = None
+    if configuration.hybrid_retrieval:
+        lexical_index = BM25Index(doc["page_content"] for doc in generation.docs)
+    return VectorStoreRetriever(
+        generation.docs,
+        generation.index,
+        openai_client.get(),
+        model=generation.manifest["model"],
+        query_cache=query_cache,
+        async_client=async_openai_client.get(),
+        lexical_index=lexical_index,
+        lexical_threshold=_lexical_threshold(configuration),
+        batcher=_embedding_batcher(configuration, generation.manifest["model"]),
+        generation=generation.name,
+    )
+
+
+def _build_retriever() -> VectorStoreRetriever:
+    configuration = Configuration()
+    query_cache = _query_cache(configuration)
+    if configuration.kb_path and current_generation(configuration.kb_path):
+        return _serve_published_generations(configuration, query_cache)
+    return VectorStoreRetriever.from_docs(
+        docs,
+        openai_client.get(),
+        model=configuration.embedding_model,
+        store=embedding_store(configuration),
+        query_cache=query_cache,
+        async_client=async_openai_client.get(),
+        hybrid=configuration.hybrid_retrieval,
+        lexical_threshold=_lexical_threshold(configuration),
+        batcher=_embedding_batcher(configuration, configuration.embedding_model),
+        dtype=configuration.embedding_dtype,
+        index=configuration.vector_index,
+        index_params=(
+            {"n_lists": configuration.ivf_lists, "n_probe": configuration.ivf_probe}
+            if configuration.vector_index == "ivf"
+            else None
+        ),
+    )
+
+
+_kb_watcher: Optional[GenerationWatcher] = None
+
+
+def _serve_published_generations(
+    configuration: Configuration, query_cache: Optional[QueryEmbeddingCache]
+) -> VectorStoreRetriever:
+    """Load the live generation under ``kb_path`` and hot-swap to newer ones."""
+    generation = load_generation(configuration.kb_path, n_probe=configuration.ivf_probe)
+
+    def swap(new: Generation) -> None:
+        # Lookups in flight keep the retriever they already hold.
+        retriever_resource.override(
+            _retriever_from_generation(new, configuration, query_cache)
+        )
 
-retriever = VectorStoreRetriever.from_docs(docs, openai.Client())
+    global _kb_watcher
+    if _kb_watcher is not None:
+        _kb_watcher.stop()
+        _kb_watcher = None
+    if configuration.kb_reload_interval_seconds > 0:
+        _kb_watcher = GenerationWatcher(
+            configuration.kb_path,
+            swap,
+            interval=configuration.kb_reload_interval_seconds,
+            current=generation.name,
+            n_probe=configuration.ivf_probe,
+        ).start()
+    return _retriever_from_generation(generation, configuration, query_cache)
+
+
+openai_client = registry.register("openai_client", _build_openai_client)
+async_openai_client = registry.register("async_openai_client", _build_async_openai_client)
+retriever_resource = registry.register("retriever", _build_retriever)
+
+
+def __getattr__(name: str) -> Any:
+    # Keep ``lookup_knowledge_base.retriever`` working without building it at import time.
+    if name == "retriever":
+        return retriever_resource.get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _format_docs(docs: list[dict[str, Any]]) -> str:
+    return "\n\n".join([doc["page_content"] for doc in docs])
+
+
+def _select(
+    results: list[dict[str, Any]], config: Optional[RunnableConfig]
+) -> list[dict[str, Any]]:
+    configuration = Configuration.from_runnable_config(config)
+    return select_within_budget(results, configuration.kb_result_token_budget)
+
+
+def _prefetched(query: str, state: Optional[dict[str, Any]]) -> Optional[list[dict[str, Any]]]:
+    # Documents the primary assistant retrieved speculatively for this exact query.
+    prefetch = (state or {}).get("kb_prefetch")
+    if prefetch and prefetch.get("query") == query:
+        prefetched: list[dict[str, Any]] = prefetch["docs"]
+        return prefetched
+    return None
+
+
+def lookup_many(
+    queries: Sequence[str], config: RunnableConfig, state: Optional[dict[str, Any]] = None
+) -> list[str]:
+    """Answer several lookups at once, with at most one embeddings request.
+
+    Used for the model's parallel ``lookup_knowledge_base`` calls; repeated
+    and prefetched queries are not retrieved again.
+    """
+    results, pending = _pending_lookups(queries, state)
+    found: list[list[dict[str, Any]]] = []
+    if pending:
+        k = Configuration.from_runnable_config(config).kb_max_chunks
+        found = retriever_resource.get().query_many(pending, k=k)
+    merged = _merge_lookups(queries, results, pending, found)
+    return [_format_docs(_select(docs, config)) for docs in merged]
+
+
+async def alookup_many(
+    queries: Sequence[str], config: RunnableConfig, state: Optional[dict[str, Any]] = None
+) -> list[str]:
+    """Async counterpart of :func:`lookup_many`."""
+    results, pending = _pending_lookups(queries, state)
+    found: list[list[dict[str, Any]]] = []
+    if pending:
+        k = Configuration.from_runnable_config(config).kb_max_chunks
+        found = await retriever_resource.get().aquery_many(pending, k=k)
+    merged = _merge_lookups(queries, results, pending, found)
+    return [_format_docs(_select(docs, config)) for docs in merged]
+
+
+def _pending_lookups(
+    queries: Sequence[str], state: Optional[dict[str, Any]]
+) -> tuple[list[Optional[list[dict[str, Any]]]], list[str]]:
+    results = [_prefetched(query, state) for query in queries]
+    pending = list(dict.fromkeys(q for q, docs in zip(queries, results) if docs is None))
+    return results, pending
+
+
+def _merge_lookups(
+    queries: Sequence[str],
+    results: list[Optional[list[dict[str, Any]]]],
+    pending: list[str],
+    found: list[list[dict[str, Any]]],
+) -> list[list[dict[str, Any]]]:
+    by_query = dict(zip(pending, found))
+    return [docs if docs is not None else by_query[q] for q, docs in zip(queries, results)]
+
+
+def _lookup_knowledge_base(
+    query: str,
+    config: RunnableConfig,
+    state: Annotated[Optional[dict[str, Any]], InjectedState] = None,
+) -> str:
+    """Consult the knowledge base to answer customer queries."""
+    return lookup_many([query], config, state)[0]
 
 
-@tool
-def lookup_knowledge_base(query: str) -> str:
+async def _alookup_knowledge_base(
+    query: str,
+    config: RunnableConfig,
+    state: Annotated[Optional[dict[str, Any]], InjectedState] = None,
+) -> str:
     """Consult the knowledge base to answer customer queries."""
-    docs = retriever.query(query, k=2)
-    return "\n\n".join([doc["page_content"] for doc in docs])
\ No newline at end of file
+    return (await alookup_many([query], config, state))[0]
+
+
+# Both code paths are native: ``ainvoke`` uses the async OpenAI client instead of
+# running the blocking one in a thread.
+lookup_knowledge_base = StructuredTool.from_function(
+    func=_lookup_knowledge_base,
+    coroutine=_alookup_knowledge_base,
+    name="lookup_knowledge_base",
+)
+
+# The model's parallel lookups in one message are answered together.
+batched_lookups = BatchedTool(
+    func=lambda calls, config, state: lookup_many(
+        [call["query"] for call in calls], config, state
+    ),
+    afunc=lambda calls, config, state: alookup_many(
+        [call["query"] for call in calls], config, state
+    ),
+)
@@ -1,27 +1,36 @@
-from langchain_core.tools import tool
+from typing import Any
+
 from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
 
 from react_agent.configuration import Configuration
 
+VISITOR = "visitor"
+LEAD = "lead"
+ACCOUNT = "account"
+
+
+def user_type(configuration: Configuration) -> str:
+    """Classify the user as in ``fetch_user_info``: visitor, lead or account."""
+    if configuration.account_id:
+        return ACCOUNT
+    if configuration.email:
+        return LEAD
+    return VISITOR
+
 
 @tool
-def fetch_user_info(config: RunnableConfig) -> list[dict]:
+def fetch_user_info(config: RunnableConfig) -> dict[str, Any]:
     """Fetch the user details. Users are of three types: Visitors, Leads, and Account.
     Anyone who's email id is not known, will be classified as a visitor.
     If the email id is known, but the user does not have an acccount on the platform, then the user is classified a Lead.
     Otherwise, when the user has an account on our platform, it means he is using our products and then he is a Account.
 
     Returns:
-        A list of dictionaries where each dictionary contains the user details like name, email id, and account id.
-        When the user is a visitor, empty dictionary will be returned.
+        A dictionary with the user details: name, email id, account id and user type.
+        For a visitor, only the user type is set.
     """
-    configurable = Configuration.from_runnable_config(config)
-    user_info = {
-        "email": configurable.email,
-        "name": configurable.name,
-        "account_id": configurable.account_id,
-    }
-    if not user_info:
-        return {}
-    else:
-        return user_info
+    # Imported here: react_agent.profiles imports this module for the user types.
+    from react_agent.profiles import resolve_profile
+
+    return resolve_profile(Configuration.from_runnable_config(config))
@@ -1,9 +1,12 @@
 """Utility & helper functions."""
 
+import asyncio
+from typing import Any, Awaitable, Callable, Mapping, NamedTuple, Optional
+
 from langchain.chat_models import init_chat_model
 from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import BaseMessage, ToolMessage
-from langchain_core.runnables import RunnableLambda
+from langchain_core.messages import AIMessage, BaseMessage, ToolCall, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
 from langgraph.prebuilt import ToolNode
 
 
@@ -19,6 +22,11 @@ def get_message_text(msg: BaseMessage) -> str:
         return "".join(txts).strip()
 
 
+def is_empty_reply(message: AIMessage) -> bool:
+    """Whether a model reply has neither text nor tool calls."""
+    return not message.tool_calls and not get_message_text(message)
+
+
 def load_chat_model(fully_specified_name: str) -> BaseChatModel:
     """Load a chat model from a fully specified name.
 
@@ -43,8 +51,101 @@ def handle_tool_error(state) -> dict:
     }
 
 
-def create_tool_node_with_fallback(tools: list) -> dict:
-    return ToolNode(tools).with_fallbacks(
+class BatchedTool(NamedTuple):
+    """Sync and async functions answering several calls of one tool at once.
+
+    Both take the list of call arguments, the config and the graph state and
+    return one tool output per call, in order.
+    """
+
+    func: Callable[[list[dict[str, Any]], RunnableConfig, dict[str, Any]], list[str]]
+    afunc: Callable[[list[dict[str, Any]], RunnableConfig, dict[str, Any]], Awaitable[list[str]]]
+
+
+class BatchedToolNode:
+    """Answer every tool call of the last AI message, batching where a tool allows.
+
+    Calls to a tool in ``batched`` are served together by one call of its
+    :class:`BatchedTool`. Any other calls run through a regular ``ToolNode``,
+    and under ``ainvoke`` concurrently with the batches. The returned
+    ``ToolMessage``s follow the order of the tool calls.
+    """
+
+    def __init__(self, tools: list[Any], batched: Mapping[str, BatchedTool]):
+        """Route ``batched`` tools to their batches and the rest of ``tools`` to a ``ToolNode``."""
+        self.tool_node = ToolNode(tools)
+        self.batched = batched
+
+    def _split(self, message: AIMessage) -> tuple[dict[str, list[ToolCall]], list[ToolCall]]:
+        groups: dict[str, list[ToolCall]] = {}
+        others = []
+        for call in message.tool_calls:
+            if call["name"] in self.batched:
+                groups.setdefault(call["name"], []).append(call)
+            else:
+                others.append(call)
+        return groups, others
+
+    @staticmethod
+    def _only(state: dict[str, Any], message: AIMessage, calls: list[ToolCall]) -> dict[str, Any]:
+        narrowed = message.model_copy(update={"tool_calls": calls})
+        return {**state, "messages": [*state["messages"][:-1], narrowed]}
+
+    @staticmethod
+    def _answers(name: str, calls: list[ToolCall], outputs: list[str]) -> list[ToolMessage]:
+        return [
+            ToolMessage(content=output, name=name, tool_call_id=call["id"])
+            for call, output in zip(calls, outputs)
+        ]
+
+    @staticmethod
+    def _ordered(message: AIMessage, answers: list[ToolMessage]) -> dict[str, Any]:
+        by_id: dict[Optional[str], ToolMessage] = {
+            answer.tool_call_id: answer for answer in answers
+        }
+        return {"messages": [by_id[call["id"]] for call in message.tool_calls]}
+
+    def invoke(self, state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+        """Answer the tool calls one batch after another."""
+        message = state["messages"][-1]
+        groups, others = self._split(message)
+        answers: list[ToolMessage] = []
+        for name, calls in groups.items():
+            outputs = self.batched[name].func([call["args"] for call in calls], config, state)
+            answers += self._answers(name, calls, outputs)
+        if others:
+            answers += self.tool_node.invoke(self._only(state, message, others), config)["messages"]
+        return self._ordered(message, answers)
+
+    async def ainvoke(self, state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+        """Answer the tool calls with the batches running concurrently."""
+        message = state["messages"][-1]
+        groups, others = self._split(message)
+
+        async def batch(name: str, calls: list[ToolCall]) -> list[ToolMessage]:
+            outputs = await self.batched[name].afunc([call["args"] for call in calls], config, state)
+            return self._answers(name, calls, outputs)
+
+        async def rest() -> list[ToolMessage]:
+            if not others:
+                return []
+            result = await self.tool_node.ainvoke(self._only(state, message, others), config)
+            messages: list[ToolMessage] = result["messages"]
+            return messages
+
+        results = await asyncio.gather(*(batch(n, calls) for n, calls in groups.items()), rest())
+        return self._ordered(message, [answer for answers in results for answer in answers])
+
+    def as_runnable(self, name: str = "tools") -> Runnable[Any, Any]:
+        """Wrap the node as a graph node with native sync and async paths."""
+        return RunnableLambda(self.invoke, afunc=self.ainvoke, name=name)
+
+
+def create_tool_node_with_fallback(
+    tools: list[Any], batched: Optional[Mapping[str, BatchedTool]] = None
+) -> Runnable[Any, Any]:
+    node = BatchedToolNode(tools, batched).as_runnable() if batched else ToolNode(tools)
+    return node.with_fallbacks(
         [RunnableLambda(handle_tool_error)], exception_key="error"
     )
 
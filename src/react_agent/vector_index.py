@@ -0,0 +1,251 @@
+"""Nearest-neighbour indexes over the knowledge-base embedding matrix.
+
+``ExactIndex`` scores every document and is the right choice for a few
+thousand chunks. ``IVFIndex`` is an approximate index for large knowledge
+bases: documents are clustered with spherical k-means into ``n_lists``
+inverted lists, and a query only scores the documents in the ``n_probe`` lists
+whose centroids are closest to it. Raising ``n_probe`` trades latency for
+recall; probing every list gives exact results.
+
+Both indexes can be saved to a directory of ``.npy`` files and loaded back
+memory-mapped, so worker processes share the pages of one copy on disk.
+"""
+
+from __future__ import annotations
+
+import abc
+import json
+import math
+import os
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+
+from react_agent.vectors import EmbeddingMatrix, l2_normalize, top_k
+
+_META = "index.json"
+# Rows assigned to centroids at a time while building an IVF index.
+_ASSIGN_BLOCK_ROWS = 65536
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+class VectorIndex(abc.ABC):
+    """Base class of the indexes: search a matrix of unit-length embeddings."""
+
+    kind = ""
+
+    def __init__(self, matrix: EmbeddingMatrix):
+        """Index ``matrix``; use :meth:`build` or :meth:`load` to create one."""
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        """Return the number of documents."""
+        return len(self.matrix)
+
+    @classmethod
+    @abc.abstractmethod
+    def build(cls, matrix: EmbeddingMatrix) -> VectorIndex:
+        """Build the index over ``matrix``; subclasses add their own parameters."""
+
+    @classmethod
+    @abc.abstractmethod
+    def load(cls, directory: PathLike, meta: dict[str, Any], mmap: bool = True) -> VectorIndex:
+        """Load an index saved to ``directory`` with the saved parameters ``meta``."""
+
+    @abc.abstractmethod
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` of the ``k`` best documents per query row.
+
+        Rows are sorted best first. If fewer than ``k`` documents are
+        candidates for a query, its row is padded with index ``-1``.
+        """
+
+    def score_rows(self, query: np.ndarray, indices: Sequence[int]) -> np.ndarray:
+        """Return the cosine similarity of one query with the documents at ``indices``."""
+        return self.matrix.score_rows(query, indices)
+
+    def params(self) -> dict[str, Any]:
+        """Return the parameters needed to load the index back."""
+        return {}
+
+    def save(self, directory: PathLike, include_matrix: bool = True) -> None:
+        """Write the index to ``directory``, with its matrix unless it is already there."""
+        if include_matrix:
+            self.matrix.save(directory)
+        with open(os.path.join(directory, _META), "w") as f:
+            json.dump({"kind": self.kind, **self.params()}, f)
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force search: one matrix multiplication over every document."""
+
+    kind = "exact"
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Score every document against each query."""
+        return self.matrix.search(queries, k)
+
+    @classmethod
+    def build(cls, matrix: EmbeddingMatrix) -> ExactIndex:
+        """Wrap ``matrix``: there is nothing to build."""
+        return cls(matrix)
+
+    @classmethod
+    def load(cls, directory: PathLike, meta: dict[str, Any], mmap: bool = True) -> ExactIndex:
+        """Load the saved matrix."""
+        return cls(EmbeddingMatrix.load(directory, mmap=mmap))
+
+
+class IVFIndex(VectorIndex):
+    """An inverted-file index over spherical k-means clusters.
+
+    Args:
+        matrix: The document embeddings.
+        centroids: One unit-length centroid per list.
+        order: Document indices sorted by list.
+        offsets: ``order[offsets[i]:offsets[i + 1]]`` are the documents of list ``i``.
+        n_probe: The number of lists scored per query.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        matrix: EmbeddingMatrix,
+        centroids: np.ndarray,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        n_probe: int = 8,
+    ):
+        """Wrap built lists; use :meth:`build` to cluster a matrix."""
+        super().__init__(matrix)
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(
+        cls,
+        matrix: EmbeddingMatrix,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        iterations: int = 10,
+        train_size: int = 64,
+        seed: int = 0,
+    ) -> IVFIndex:
+        """Cluster ``matrix`` into ``n_lists`` lists (``sqrt(len(matrix))`` if 0).
+
+        k-means is trained on a random sample of ``train_size`` documents per
+        list, then every document is assigned to its closest centroid.
+        """
+        n = len(matrix)
+        if n == 0:
+            raise ValueError("Cannot build an IVF index over an empty matrix")
+        n_lists = min(n_lists or max(1, round(math.sqrt(n))), n)
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(n, size=min(n, n_lists * train_size), replace=False))
+        train = matrix.take(sample)
+
+        centroids = train[rng.choice(len(train), size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            empty = np.bincount(assign, minlength=n_lists) == 0
+            # Restart empty clusters from random training points.
+            sums[empty] = train[rng.choice(len(train), size=int(empty.sum()))]
+            centroids = l2_normalize(sums)
+
+        assign = np.concatenate(
+            [
+                np.argmax(matrix.rows(start, start + _ASSIGN_BLOCK_ROWS) @ centroids.T, axis=1)
+                for start in range(0, n, _ASSIGN_BLOCK_ROWS)
+            ]
+        )
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        return cls(matrix, centroids, order, offsets, n_probe=n_probe)
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Score the documents of the ``n_probe`` lists closest to each query."""
+        queries = l2_normalize(np.atleast_2d(queries))
+        k = min(k, len(self))
+        probes, _ = top_k(queries @ self.centroids.T, self.n_probe)
+        indices = np.full((len(queries), k), -1, dtype=np.intp)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate(
+                [self.order[self.offsets[i] : self.offsets[i + 1]] for i in lists]
+            )
+            best, best_scores = top_k((self.matrix.take(candidates) @ query)[None], k)
+            found = best.shape[1]
+            indices[row, :found] = candidates[best[0]]
+            scores[row, :found] = best_scores[0]
+        return indices, scores
+
+    def params(self) -> dict[str, Any]:
+        """Return ``n_probe``, the number of lists probed per query."""
+        return {"n_probe": self.n_probe}
+
+    def save(self, directory: PathLike, include_matrix: bool = True) -> None:
+        """Write the index, its centroids and its inverted lists."""
+        super().save(directory, include_matrix)
+        np.save(os.path.join(directory, "centroids.npy"), self.centroids)
+        np.save(os.path.join(directory, "order.npy"), self.order)
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+
+    @classmethod
+    def load(cls, directory: PathLike, meta: dict[str, Any], mmap: bool = True) -> IVFIndex:
+        """Load the lists, keeping the centroids in memory."""
+        def array(name: str) -> np.ndarray:
+            loaded: np.ndarray = np.load(
+                os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None
+            )
+            return loaded
+
+        return cls(
+            EmbeddingMatrix.load(directory, mmap=mmap),
+            # Centroids are scored on every query: keep them in memory.
+            np.load(os.path.join(directory, "centroids.npy")),
+            array("order"),
+            array("offsets"),
+            n_probe=meta.get("n_probe", 8),
+        )
+
+
+INDEXES: dict[str, type[VectorIndex]] = {"exact": ExactIndex, "ivf": IVFIndex}
+
+
+def build_index(matrix: EmbeddingMatrix, kind: str = "exact", **params: Any) -> VectorIndex:
+    """Build an index of the given kind over ``matrix``."""
+    if kind not in INDEXES:
+        raise ValueError(f"Unknown vector index {kind!r}; expected one of {sorted(INDEXES)}")
+    return INDEXES[kind].build(matrix, **params)
+
+
+def load_index(directory: PathLike, mmap: bool = True, **overrides: Any) -> VectorIndex:
+    """Load an index written by :meth:`VectorIndex.save`.
+
+    ``overrides`` replace saved search parameters, e.g. ``n_probe``.
+    """
+    with open(os.path.join(directory, _META)) as f:
+        meta: dict[str, Any] = json.load(f)
+    kind = meta.pop("kind")
+    if kind not in INDEXES:
+        raise ValueError(f"Unknown vector index {kind!r} in {directory}")
+    return INDEXES[kind].load(directory, {**meta, **overrides}, mmap=mmap)
+
+
+def index_for(
+    vectors: Union[list[list[float]], np.ndarray, EmbeddingMatrix, VectorIndex],
+    kind: str = "exact",
+    dtype: str = "float32",
+    params: Optional[dict[str, Any]] = None,
+) -> VectorIndex:
+    """Return ``vectors`` as an index, building the matrix and index as needed."""
+    if isinstance(vectors, VectorIndex):
+        return vectors
+    matrix = vectors if isinstance(vectors, EmbeddingMatrix) else EmbeddingMatrix(vectors, dtype)
+    return build_index(matrix, kind, **(params or {}))
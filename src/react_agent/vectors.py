@@ -0,0 +1,152 @@
+"""A compact, pre-normalized embedding matrix with batched cosine scoring.
+
+Rows are L2-normalized once when the matrix is built, so a dot product with a
+normalized query is the exact cosine similarity. The matrix is stored as a
+contiguous ``float32`` array by default, or quantized to ``float16`` or
+``int8`` (one scale per row) to cut per-worker memory further. Quantized rows
+are upcast block by block while scoring, so the transient memory of a query
+stays bounded however large the knowledge base grows.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Literal, Optional, Sequence, Union
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+# Rows upcast to float32 at a time when scoring a quantized matrix.
+SCORE_BLOCK_ROWS = 65536
+
+
+def _check_dtype(dtype: str) -> str:
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported embedding dtype {dtype!r}; expected one of {DTYPES}")
+    return dtype
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return ``vectors`` as float32 with every row scaled to unit length."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Select the ``k`` best columns of every row of a 2-D score matrix.
+
+    Returns:
+        ``(indices, scores)``, both of shape ``(rows, k)`` and sorted best first.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.intp), empty.astype(scores.dtype)
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+class EmbeddingMatrix:
+    """Unit-length document embeddings, optionally quantized.
+
+    Args:
+        vectors: One embedding per document.
+        dtype: Storage type: ``"float32"``, ``"float16"`` or ``"int8"``.
+    """
+
+    def __init__(self, vectors: Union[np.ndarray, list[list[float]]], dtype: str = "float32"):
+        """Normalize ``vectors`` to unit length and store them as ``dtype``."""
+        self.dtype = _check_dtype(dtype)
+        array = np.asarray(vectors, dtype=np.float32)
+        if array.ndim != 2:
+            if not len(array):
+                raise ValueError(
+                    "Cannot build an embedding matrix from no vectors; pass an array of"
+                    " shape (0, dimensions) instead"
+                )
+            array = array.reshape(len(array), -1)
+        normalized = l2_normalize(array)
+        self.scale: Optional[np.ndarray] = None
+        if dtype == "int8":
+            peak = np.abs(normalized).max(axis=1, keepdims=True)
+            self.scale = (np.where(peak == 0, 1.0, peak) / 127.0).astype(np.float32)
+            normalized = np.rint(normalized / self.scale)
+        self.data = np.ascontiguousarray(normalized, dtype=np.dtype(dtype))
+
+    @classmethod
+    def from_arrays(cls, data: np.ndarray, scale: Optional[np.ndarray] = None) -> EmbeddingMatrix:
+        """Wrap already normalized (and quantized) arrays without copying them."""
+        matrix = cls.__new__(cls)
+        matrix.dtype = _check_dtype(str(data.dtype))
+        matrix.data = data
+        matrix.scale = scale
+        return matrix
+
+    def save(self, directory: Union[str, os.PathLike[str]]) -> None:
+        """Write the matrix to ``directory`` as ``.npy`` files."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "vectors.npy"), self.data)
+        if self.scale is not None:
+            np.save(os.path.join(directory, "scale.npy"), self.scale)
+
+    @classmethod
+    def load(cls, directory: Union[str, os.PathLike[str]], mmap: bool = True) -> EmbeddingMatrix:
+        """Load a matrix written by :meth:`save`, memory-mapped by default."""
+        mode: Optional[Literal["r"]] = "r" if mmap else None
+        scale_path = os.path.join(directory, "scale.npy")
+        return cls.from_arrays(
+            np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mode),
+            np.load(scale_path, mmap_mode=mode) if os.path.exists(scale_path) else None,
+        )
+
+    def __len__(self) -> int:
+        """Return the number of documents."""
+        return int(self.data.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        """The memory held by the matrix and its scales, in bytes."""
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Return rows ``start:stop`` as float32 unit vectors."""
+        block = self.data[start:stop].astype(np.float32, copy=False)
+        if self.scale is not None:
+            block = block * self.scale[start:stop]
+        return block
+
+    def take(self, indices: Union[Sequence[int], np.ndarray]) -> np.ndarray:
+        """Return the rows at ``indices`` as float32 unit vectors."""
+        indices = np.asarray(indices, dtype=np.intp)
+        rows: np.ndarray = self.data[indices].astype(np.float32, copy=False)
+        if self.scale is not None:
+            rows = rows * self.scale[indices]
+        return rows
+
+    def score_rows(self, query: np.ndarray, indices: Sequence[int]) -> np.ndarray:
+        """Cosine similarity of one query with the documents at ``indices``."""
+        similarity: np.ndarray = self.take(indices) @ l2_normalize(query)
+        return similarity
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each query (one per row) with every document."""
+        queries = l2_normalize(np.atleast_2d(queries))
+        if self.dtype == "float32":
+            scores: np.ndarray = queries @ self.data.T
+            return scores
+        out = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            stop = start + SCORE_BLOCK_ROWS
+            out[:, start:stop] = queries @ self.rows(start, stop).T
+        return out
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the ``k`` most similar documents for each query, best first."""
+        return top_k(self.scores(queries), k)
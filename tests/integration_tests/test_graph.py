@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 from langsmith import unit
 
@@ -6,10 +8,10 @@ from react_agent import graph
 
 @pytest.mark.asyncio
 @unit
-async def test_react_agent_simple_passthrough() -> None:
-    res = await graph.ainvoke(
-        {"messages": [("user", "Who is the founder of LangChain?")]},
-        {"configurable": {"system_prompt": "You are a helpful AI assistant."}},
+async def test_support_agent_answers_from_the_knowledge_base() -> None:
+    res = await graph.support_agent_graph.ainvoke(
+        {"messages": [("user", "Is there a free trial?")]},
+        {"configurable": {"thread_id": uuid.uuid4().hex}},
     )
 
-    assert "harrison" in str(res["messages"][-1].content).lower()
+    assert "trial" in str(res["messages"][-1].content).lower()
@@ -0,0 +1,13 @@
+import pytest
+
+from benchmarks.fakes import FakeAsyncEmbeddingsClient, FakeEmbeddingsClient
+
+
+@pytest.fixture
+def embeddings_client() -> FakeEmbeddingsClient:
+    return FakeEmbeddingsClient(dim=64)
+
+
+@pytest.fixture
+def async_embeddings_client(embeddings_client) -> FakeAsyncEmbeddingsClient:
+    return FakeAsyncEmbeddingsClient.sharing(embeddings_client)
@@ -0,0 +1,135 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from react_agent import answer_cache
+from react_agent.answer_cache import SemanticAnswerCache, answer_cache_resource
+from react_agent.assistant import Assistant
+from react_agent.tools.lookup_knowledge_base import (
+    VectorStoreRetriever,
+    docs,
+    retriever_resource,
+)
+from react_agent.tools.user_info import ACCOUNT, LEAD, VISITOR
+
+ANSWER_CACHE = {"configurable": {"answer_cache": True}}
+QUESTION = [1.0, 0.0, 0.0]
+SIMILAR = [0.99, 0.1, 0.0]
+OTHER = [0.0, 1.0, 0.0]
+
+
+def test_similar_questions_share_an_answer_within_scope_and_generation() -> None:
+    cache = SemanticAnswerCache(min_similarity=0.95)
+    cache.put("Is there a free trial?", QUESTION, "Yes.", VISITOR, "g1")
+
+    assert cache.get(SIMILAR, VISITOR, "g1").answer == "Yes."
+    assert cache.get(OTHER, VISITOR, "g1") is None
+    assert cache.get(QUESTION, ACCOUNT, "g1") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1, "generation": "g1"}
+
+    # A new knowledge-base generation invalidates answers grounded on the old one.
+    assert cache.get(QUESTION, VISITOR, "g2") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_lru_and_admin_api(monkeypatch) -> None:
+    clock = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: clock[0])
+    cache = SemanticAnswerCache(maxsize=2, ttl=60)
+    first = cache.put("a", QUESTION, "A", VISITOR, "g")
+    cache.put("b", OTHER, "B", LEAD, "g")
+    cache.put("c", [0.0, 0.0, 1.0], "C", LEAD, "g")
+    assert [entry["question"] for entry in cache.entries()] == ["b", "c"]
+    assert cache.get(QUESTION, VISITOR, "g") is None
+
+    assert [entry["question"] for entry in cache.entries(scope=LEAD)] == ["b", "c"]
+    cache.put("a", QUESTION, "A", VISITOR, "g")
+    assert cache.purge(scope=LEAD, ids=[cache.entries()[-1]["id"]]) == 0
+    assert cache.purge(scope=VISITOR) == 1
+    assert first.id not in {entry["id"] for entry in cache.entries()}
+
+    clock[0] += 61
+    assert cache.entries() == []
+
+
+@pytest.fixture
+def cache(embeddings_client, async_embeddings_client):
+    retriever_resource.override(
+        VectorStoreRetriever.from_docs(docs, embeddings_client, async_client=async_embeddings_client)
+    )
+    cache = SemanticAnswerCache(min_similarity=0.9)
+    answer_cache_resource.override(cache)
+    yield cache
+    answer_cache_resource.reset()
+    retriever_resource.reset()
+
+
+def _grounded_turn(question: str) -> dict:
+    call = {"name": "lookup_knowledge_base", "args": {"query": question}, "id": "1"}
+    return {
+        "messages": [
+            HumanMessage(question),
+            AIMessage("", tool_calls=[call]),
+            ToolMessage("There is a free trial.", tool_call_id="1"),
+        ]
+    }
+
+
+def _unreachable(state):
+    raise AssertionError("the model should not be called")
+
+
+def test_assistant_replays_grounded_answers(cache) -> None:
+    answer = Assistant(RunnableLambda(lambda state: AIMessage("Yes, 14 days.")))
+    answer(_grounded_turn("Is there a free trial?"), ANSWER_CACHE)
+    assert cache.stats()["size"] == 1
+
+    replay = Assistant(RunnableLambda(_unreachable))
+    result = replay({"messages": [HumanMessage("is there a free trial")]}, ANSWER_CACHE)
+    assert result["messages"].content == "Yes, 14 days."
+
+    # Leads are answered separately from visitors.
+    lead = {"configurable": {**ANSWER_CACHE["configurable"], "email": "ada@example.com"}}
+    called = Assistant(RunnableLambda(lambda state: AIMessage("Hi!")))
+    result = called({"messages": [HumanMessage("is there a free trial")]}, lead)
+    assert result["messages"].content == "Hi!"
+
+
+def test_answers_are_only_replayed_to_the_user_they_were_written_for(cache) -> None:
+    def lead(email: str) -> dict:
+        return {"configurable": {**ANSWER_CACHE["configurable"], "email": email}}
+
+    answer = Assistant(RunnableLambda(lambda state: AIMessage("Yes Ada, you can start one.")))
+    answer(_grounded_turn("Is there a free trial?"), lead("ada@example.com"))
+
+    # Another lead asking the same question does not get Ada's personalized reply.
+    called = Assistant(RunnableLambda(lambda state: AIMessage("Yes Bob.")))
+    result = called({"messages": [HumanMessage("Is there a free trial?")]}, lead("bob@example.com"))
+    assert result["messages"].content == "Yes Bob."
+
+    replay = Assistant(RunnableLambda(_unreachable))
+    result = replay({"messages": [HumanMessage("Is there a free trial?")]}, lead("Ada@Example.com"))
+    assert result["messages"].content == "Yes Ada, you can start one."
+    assert "ada@example.com" not in str(cache.entries())
+
+
+def test_ungrounded_and_follow_up_answers_are_not_cached(cache) -> None:
+    reply = Assistant(RunnableLambda(lambda state: AIMessage("Hello!")))
+    reply({"messages": [HumanMessage("hi")]}, ANSWER_CACHE)
+    follow_up = _grounded_turn("And the price?")
+    follow_up["messages"][:0] = [HumanMessage("Tell me about SuperSales"), AIMessage("Sure.")]
+    reply(follow_up, ANSWER_CACHE)
+    # Disabled by default.
+    reply(_grounded_turn("Is there a free trial?"), {})
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_assistant_acall_replays_grounded_answers(cache) -> None:
+    answer = Assistant(RunnableLambda(lambda state: AIMessage("Yes, 14 days.")))
+    await answer.acall(_grounded_turn("Is there a free trial?"), ANSWER_CACHE)
+
+    replay = Assistant(RunnableLambda(_unreachable))
+    result = await replay.acall({"messages": [HumanMessage("Is there a free trial?")]}, ANSWER_CACHE)
+    assert result["messages"].content == "Yes, 14 days."
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,102 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from react_agent.assistant import (
+    CACHE_CONTROL,
+    Assistant,
+    RetryPolicy,
+    format_prompt_time,
+    input_tokens,
+    mark_history_breakpoint,
+    primary_assistant_prompt,
+    record_prompt_usage,
+    retry_fallbacks,
+)
+
+
+def _scripted(*replies: AIMessage) -> RunnableLambda:
+    remaining = list(replies)
+    seen = []
+
+    def respond(state: dict) -> AIMessage:
+        seen.append(state)
+        return remaining.pop(0)
+
+    runnable = RunnableLambda(respond)
+    runnable.seen = seen  # type: ignore[attr-defined]
+    return runnable
+
+
+NO_BACKOFF = {"configurable": {"retry_initial_backoff_seconds": 0}}
+
+
+@pytest.mark.asyncio
+async def test_assistant_acall_retries_empty_output() -> None:
+    runnable = _scripted(AIMessage(""), AIMessage(""), AIMessage("Hello!"))
+    node = Assistant(runnable).as_runnable("primary_assistant")
+
+    result = await node.ainvoke({"messages": [HumanMessage("hi")]}, NO_BACKOFF)
+
+    assert result["messages"].content == "Hello!"
+    assert len(runnable.seen) == 3
+    # The nudge is appended once, not once per retry.
+    assert len(runnable.seen[2]["messages"]) == 2
+
+
+def test_assistant_hands_off_when_retries_are_exhausted() -> None:
+    runnable = _scripted(*[AIMessage("") for _ in range(2)])
+    config = {"configurable": {"retry_initial_backoff_seconds": 0, "retry_max_attempts": 2}}
+    fallbacks = retry_fallbacks.value()
+
+    result = Assistant(runnable)(
+        {"messages": [HumanMessage("cancel my plan")], "user_info": '{"email": "a@b.c"}'},
+        config,
+    )
+
+    (call,) = result["messages"].tool_calls
+    assert call["name"] == "ToHumanAssistant"
+    assert call["args"] == {"email": "a@b.c", "request": "cancel my plan"}
+    assert len(runnable.seen) == 2
+    assert retry_fallbacks.value() == fallbacks + 1
+
+
+def test_retry_policy_backoff_is_capped_with_jitter() -> None:
+    policy = RetryPolicy(initial_backoff=1.0, max_backoff=3.0, jitter=0.5)
+    assert 0.5 <= policy.backoff(1) <= 1.0
+    assert 1.5 <= policy.backoff(5) <= 3.0
+
+
+def test_format_prompt_time_is_stable_within_granularity() -> None:
+    base = 1_700_000_000 - 1_700_000_000 % 300
+    assert format_prompt_time(300, now=base + 1) == format_prompt_time(300, now=base + 299)
+    assert format_prompt_time(300, now=base) != format_prompt_time(300, now=base + 300)
+
+
+def test_prompt_keeps_volatile_context_after_cached_instructions() -> None:
+    prompt = primary_assistant_prompt.invoke(
+        {"user_info": '{"email": "a@b.c"}', "time": "now", "messages": [("user", "pricing?")]}
+    )
+    system, last = mark_history_breakpoint(prompt)
+
+    static, volatile = system.content
+    assert static["cache_control"] == CACHE_CONTROL
+    assert "{" not in static["text"] and "a@b.c" in volatile["text"]
+    assert last.content == [{"type": "text", "text": "pricing?", "cache_control": CACHE_CONTROL}]
+
+
+def test_record_prompt_usage_splits_cached_tokens() -> None:
+    before = {k: input_tokens.value(kind=k) for k in ("cache_read", "cache_creation", "uncached")}
+    record_prompt_usage(
+        AIMessage(
+            "hi",
+            usage_metadata={
+                "input_tokens": 1200,
+                "output_tokens": 5,
+                "total_tokens": 1205,
+                "input_token_details": {"cache_read": 1000, "cache_creation": 0},
+            },
+        )
+    )
+    assert input_tokens.value(kind="cache_read") - before["cache_read"] == 1000
+    assert input_tokens.value(kind="uncached") - before["uncached"] == 200
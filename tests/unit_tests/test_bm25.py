@@ -0,0 +1,31 @@
+from react_agent.bm25 import (
+    BM25Index,
+    LexicalThreshold,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+
+def test_tokenize_drops_stopwords() -> None:
+    assert tokenize("What is the Growth Plan?") == ["growth", "plan"]
+
+
+def test_bm25_ranks_exact_term_matches_first() -> None:
+    index = BM25Index(["Growth Plan costs $350", "Hubspot and Salesforce sync", "Free tier"])
+    hits = index.search("hubspot", k=3)
+    assert hits[0][0] == 1
+    assert len(hits) == 1
+    assert index.search("unknown words") == []
+
+
+def test_lexical_threshold() -> None:
+    threshold = LexicalThreshold(min_score=2.0, margin=1.5)
+    assert threshold.is_decisive([(0, 3.0)])
+    assert threshold.is_decisive([(0, 3.0), (1, 1.0)])
+    assert not threshold.is_decisive([(0, 3.0), (1, 2.5)])
+    assert not threshold.is_decisive([(0, 1.0)])
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]])
+    assert [doc for doc, _ in fused] == [1, 3, 2]
@@ -0,0 +1,85 @@
+import json
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from react_agent.checkpoint import SQLiteSaver, create_checkpointer
+from react_agent.configuration import Configuration
+from react_agent.graph import build_graph
+
+
+@pytest.fixture
+def echo_graph(monkeypatch):
+    def reply(state: dict) -> AIMessage:
+        return AIMessage(f"turn {sum(m.type == 'human' for m in state['messages'])}")
+
+    monkeypatch.setattr(
+        "react_agent.graph.assistant_runnable_resource", RunnableLambda(reply)
+    )
+
+    def build(checkpointer):
+        return build_graph(checkpointer=checkpointer)
+
+    return build
+
+
+def test_sqlite_saver_resumes_thread_from_new_message_only(tmp_path, echo_graph) -> None:
+    path = str(tmp_path / "checkpoints.sqlite")
+    config = {"configurable": {"thread_id": "t1"}}
+
+    echo_graph(SQLiteSaver(path)).invoke({"messages": [("user", "hi")]}, config)
+    # A new process (new saver, same file) continues the conversation.
+    state = echo_graph(SQLiteSaver(path)).invoke({"messages": [("user", "again")]}, config)
+
+    assert [m.content for m in state["messages"]] == ["hi", "turn 1", "again", "turn 2"]
+
+
+def test_sqlite_saver_stores_messages_once_and_prunes(tmp_path, echo_graph) -> None:
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SQLiteSaver(path, max_checkpoints=4)
+    graph = echo_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(10):
+        graph.invoke({"messages": [("user", f"message {i}")]}, config)
+
+    conn = sqlite3.connect(path)
+    (messages,) = conn.execute("SELECT COUNT(*) FROM message_blobs").fetchone()
+    (checkpoints,) = conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()
+    assert messages == 20
+    assert checkpoints <= 4 + 1
+    assert len(graph.get_state(config).values["messages"]) == 20
+
+
+def test_sqlite_saver_stores_only_appended_digests_and_resolves_chains(tmp_path, echo_graph) -> None:
+    path = str(tmp_path / "checkpoints.sqlite")
+    graph = echo_graph(SQLiteSaver(path, max_checkpoints=3))
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(25):
+        graph.invoke({"messages": [("user", f"message {i}")]}, config)
+
+    conn = sqlite3.connect(path)
+    refs = [
+        json.loads(blob)
+        for (blob,) in conn.execute("SELECT blob FROM channel_blobs WHERE type = 'message_refs'")
+    ]
+    assert any(isinstance(r, dict) and len(r["tail"]) <= 2 for r in refs)
+    (messages,) = conn.execute("SELECT COUNT(*) FROM message_blobs").fetchone()
+    assert messages == 50
+    # A new saver reads the chains back without the in-memory state of the first one.
+    reader = echo_graph(SQLiteSaver(path, max_checkpoints=3))
+    history = list(reader.get_state_history(config))
+    assert [len(s.values["messages"]) for s in history[:2]] == [50, 49]
+    assert [m.content for m in history[0].values["messages"][-2:]] == ["message 24", "turn 25"]
+
+
+def test_create_checkpointer_backends(tmp_path) -> None:
+    assert create_checkpointer(Configuration(checkpointer="none")) is None
+    assert create_checkpointer(Configuration(checkpointer="memory")) is not None
+    saver = create_checkpointer(
+        Configuration(checkpointer="sqlite", checkpoint_path=str(tmp_path / "c.sqlite"))
+    )
+    assert isinstance(saver, SQLiteSaver)
+    with pytest.raises(ValueError):
+        create_checkpointer(Configuration(checkpointer="redis"))
@@ -0,0 +1,59 @@
+from react_agent.chunking import chunk_markdown, select_within_budget, split_blocks
+
+MARKDOWN = """
+# Product
+
+Intro paragraph.
+
+## Pricing
+
+### **Plans**
+
+1. Free: the basics
+2. Pro: everything
+    1. Nested detail stays with its item
+
+### FAQs-
+
+""" + " ".join(f"Sentence number {i} about the product." for i in range(40))
+
+
+def test_chunks_keep_breadcrumbs() -> None:
+    chunks = chunk_markdown(MARKDOWN, max_tokens=1000)
+
+    assert [c["breadcrumbs"] for c in chunks] == [
+        ["Product"],
+        ["Product", "Pricing", "Plans"],
+        ["Product", "Pricing", "FAQs"],
+    ]
+    assert chunks[1]["page_content"].startswith("Product > Pricing > Plans\n1. Free")
+    assert "    1. Nested detail" in chunks[1]["page_content"]
+
+
+def test_chunks_respect_token_cap() -> None:
+    chunks = chunk_markdown(MARKDOWN, max_tokens=40)
+
+    faqs = [c for c in chunks if c["heading"] == "FAQs"]
+    assert len(faqs) > 1
+    assert all(c["tokens"] <= 40 for c in chunks)
+    assert all(c["page_content"].startswith("Product > Pricing > FAQs\n") for c in faqs)
+
+
+def test_split_blocks_keeps_nested_items_with_their_parent() -> None:
+    body = "Plans:\n1. Free\n2. Pro\n    1. Nested detail\n\nClosing line."
+    assert split_blocks(body) == [
+        "Plans:",
+        "1. Free",
+        "2. Pro\n    1. Nested detail",
+        "Closing line.",
+    ]
+
+
+def test_select_within_budget_prefers_smaller_chunks() -> None:
+    ranked = [
+        {"page_content": "a", "tokens": 300},
+        {"page_content": "b", "tokens": 300},
+        {"page_content": "c", "tokens": 100},
+    ]
+    assert [r["page_content"] for r in select_within_budget(ranked, 400)] == ["a", "c"]
+    assert [r["page_content"] for r in select_within_budget(ranked, 10)] == ["a"]
@@ -1,5 +1,29 @@
+from langgraph.graph import START, StateGraph
+from typing_extensions import TypedDict
+
 from react_agent.configuration import Configuration
 
 
 def test_configuration_empty() -> None:
     Configuration.from_runnable_config({})
+
+
+def test_configuration_reads_the_run_context() -> None:
+    class S(TypedDict, total=False):
+        seen: tuple
+
+    def node(state: S) -> S:
+        configuration = Configuration.from_runnable_config()
+        return {"seen": (configuration.kb_max_chunks, configuration.email)}
+
+    builder = StateGraph(S, context_schema=Configuration)
+    builder.add_node("node", node)
+    builder.add_edge(START, "node")
+    graph = builder.compile()
+
+    result = graph.invoke({}, context={"kb_max_chunks": 2, "email": "a@b.c"})
+    assert result["seen"] == (2, "a@b.c")
+    result = graph.invoke(
+        {}, {"configurable": {"email": "x@y.z"}}, context={"kb_max_chunks": 2}
+    )
+    assert result["seen"] == (2, "x@y.z")
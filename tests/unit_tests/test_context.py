@@ -0,0 +1,73 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from react_agent.context import ContextPolicy, fit_context
+
+
+def _conversation(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        messages += [
+            HumanMessage(f"question {i}", id=f"h{i}"),
+            AIMessage(
+                "",
+                id=f"a{i}",
+                tool_calls=[{"name": "lookup_knowledge_base", "args": {"query": f"q{i}"}, "id": f"c{i}"}],
+            ),
+            ToolMessage("knowledge " * 200, tool_call_id=f"c{i}", id=f"t{i}"),
+            AIMessage(f"answer {i}", id=f"r{i}"),
+        ]
+    return messages
+
+
+def test_fit_context_keeps_everything_within_budget() -> None:
+    messages = _conversation(2)
+    window = fit_context(messages, ContextPolicy(max_tokens=0))
+    assert window.messages == messages and window.summary == ""
+
+
+def test_fit_context_compacts_old_tool_results_and_keeps_pairs() -> None:
+    messages = _conversation(3)
+    # Too big for the budget: shortening the older tool results makes it fit.
+    window = fit_context(messages, ContextPolicy(max_tokens=1500))
+
+    assert [m.id for m in window.messages] == [m.id for m in messages]
+    old_tool, last_tool = window.messages[2], window.messages[-2]
+    assert old_tool.content.endswith("[truncated]") and len(old_tool.content) < 400
+    assert last_tool.content == messages[-2].content
+    assert window.compacted_through == "r1" and window.summarized_through is None
+
+
+def test_fit_context_extends_the_previous_prompt_until_it_overflows() -> None:
+    messages = _conversation(3)
+    policy = ContextPolicy(max_tokens=1500)
+    window = fit_context(messages, policy)
+
+    messages += _conversation(4)[12:]
+    again = fit_context(messages, policy, window.summary, None, window.compacted_through)
+    # Turn 2 is no longer the latest, but stays as it was sent: the prefix is unchanged.
+    assert again.messages[: len(window.messages)] == window.messages
+    assert again.compacted_through == window.compacted_through
+
+    messages += _conversation(5)[16:]
+    moved = fit_context(messages, policy, again.summary, None, again.compacted_through)
+    assert moved.summarized_through == "r1" and moved.compacted_through == "r3"
+    assert moved.messages[0].id == "h2" and "question 1" in moved.summary
+    assert sum(len(m.content) for m in moved.messages) < 1500 * 4 * policy.refill_fraction
+
+
+def test_fit_context_rolls_dropped_turns_into_summary() -> None:
+    messages = _conversation(6)
+    policy = ContextPolicy(max_tokens=700)
+    window = fit_context(messages, policy)
+
+    assert isinstance(window.messages[0], HumanMessage)
+    assert "User: question 0" in window.summary
+    assert "Assistant: answer 0" in window.summary
+    first_kept = [m.id for m in messages].index(window.messages[0].id)
+    assert window.summarized_through == messages[first_kept - 1].id
+
+    # The next turn only adds what is new to the summary.
+    messages += [HumanMessage("question 6", id="h6")]
+    again = fit_context(messages, policy, window.summary, window.summarized_through)
+    assert again.summary.count("User: question 0") == 1
+    assert "h0" not in {m.id for m in again.messages}
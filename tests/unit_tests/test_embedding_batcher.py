@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from react_agent.embedding_batcher import EmbeddingBatcher, batch_size, queue_delay
+from react_agent.tools.lookup_knowledge_base import VectorStoreRetriever, docs
+
+
+@pytest.mark.asyncio
+async def test_concurrent_texts_share_one_request(embeddings_client, async_embeddings_client):
+    batcher = EmbeddingBatcher(async_embeddings_client, "m", max_delay=0.01)
+    batches_before = batch_size.sample().count
+
+    results = await asyncio.gather(
+        *(batcher.embed([f"query {i}"]) for i in range(10)), batcher.embed(["query 3"])
+    )
+
+    assert len(embeddings_client.inputs) == 1
+    assert sorted(embeddings_client.inputs[0]) == sorted(f"query {i}" for i in range(10))
+    assert results[3] == results[10] == [embeddings_client.vector("query 3")]
+    assert batch_size.sample().count == batches_before + 1
+    assert queue_delay.sample().count >= 10
+
+
+@pytest.mark.asyncio
+async def test_full_batches_are_sent_without_waiting(embeddings_client, async_embeddings_client):
+    batcher = EmbeddingBatcher(async_embeddings_client, "m", max_batch=2, max_delay=60)
+
+    results = await asyncio.wait_for(batcher.embed(["a", "b", "c", "d"]), timeout=1)
+
+    assert embeddings_client.inputs == [["a", "b"], ["c", "d"]]
+    assert len(results) == 4
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller() -> None:
+    class FailingClient:
+        def __init__(self):
+            self.embeddings = self
+
+        async def create(self, model, input):
+            raise RuntimeError("rate limited")
+
+    batcher = EmbeddingBatcher(FailingClient(), "m")
+    results = await asyncio.gather(
+        batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+
+@pytest.mark.asyncio
+async def test_short_responses_fail_every_caller(async_embeddings_client) -> None:
+    class ShortClient:
+        def __init__(self):
+            self.embeddings = self
+
+        async def create(self, model, input):
+            response = await async_embeddings_client.create(model, input)
+            response.data.pop()
+            return response
+
+    batcher = EmbeddingBatcher(ShortClient(), "m", max_delay=0.01)
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True),
+        timeout=1,
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_rows_are_matched_by_index(embeddings_client, async_embeddings_client) -> None:
+    class ReversedClient:
+        def __init__(self):
+            self.embeddings = self
+
+        async def create(self, model, input):
+            response = await async_embeddings_client.create(model, input)
+            response.data.reverse()
+            return response
+
+    batcher = EmbeddingBatcher(ReversedClient(), "m", max_delay=0.01)
+    a, b = await asyncio.gather(batcher.embed(["a"]), batcher.embed(["b"]))
+    assert (a, b) == ([embeddings_client.vector("a")], [embeddings_client.vector("b")])
+
+
+@pytest.mark.asyncio
+async def test_retriever_batches_concurrent_lookups(embeddings_client, async_embeddings_client):
+    retriever = VectorStoreRetriever.from_docs(
+        docs, embeddings_client, batcher=EmbeddingBatcher(async_embeddings_client, "m")
+    )
+    calls = len(embeddings_client.inputs)
+
+    results = await asyncio.gather(
+        retriever.aquery("Is there a free trial?", k=1),
+        retriever.aquery("How much is the Growth Plan?", k=1),
+    )
+
+    assert len(embeddings_client.inputs) == calls + 1
+    assert "free trial" in results[0][0]["page_content"]
@@ -0,0 +1,67 @@
+import numpy as np
+
+from react_agent.embedding_cache import (
+    EmbeddingStore,
+    QueryEmbeddingCache,
+    SQLiteEmbeddingTier,
+    normalize_query,
+)
+
+
+def test_embedding_store_reuses_unchanged_sections(tmp_path, embeddings_client) -> None:
+    client = embeddings_client
+    store = EmbeddingStore(tmp_path, "test-model")
+
+    first = store.embed_documents(["## a", "## bb"], client)
+    assert client.inputs == [["## a", "## bb"]]
+
+    again = EmbeddingStore(tmp_path, "test-model").embed_documents(["## a", "## bb"], client)
+    assert len(client.inputs) == 1
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(first, again)
+
+    edited = store.embed_documents(["## a", "## ccc", "## bb"], client)
+    assert client.inputs[-1] == ["## ccc"]
+    np.testing.assert_array_equal(edited[[0, 2]], first)
+
+
+def test_embedding_store_is_keyed_by_model(tmp_path, embeddings_client) -> None:
+    EmbeddingStore(tmp_path, "model-a").embed_documents(["## a"], embeddings_client)
+    EmbeddingStore(tmp_path, "model-b").embed_documents(["## a"], embeddings_client)
+    assert len(embeddings_client.inputs) == 2
+
+
+def test_normalize_query() -> None:
+    assert normalize_query("  What's the   PRICING?? ") == "what's the pricing"
+
+
+def test_query_cache_lru_and_counters() -> None:
+    cache = QueryEmbeddingCache(maxsize=2, ttl=None)
+    cache.put("m", "pricing", np.ones(3))
+    cache.put("m", "free trial", np.zeros(3))
+    assert cache.get("m", "Pricing?") is not None
+    cache.put("m", "signup", np.zeros(3))
+    assert cache.get("m", "free trial") is None
+    assert cache.get("other-model", "pricing") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "tier_hits": 0, "size": 2}
+
+
+def test_query_cache_shared_tier(tmp_path) -> None:
+    tier = SQLiteEmbeddingTier(tmp_path / "queries.sqlite")
+    QueryEmbeddingCache(tier=tier).put("m", "pricing", np.arange(3))
+
+    other_worker = QueryEmbeddingCache(tier=SQLiteEmbeddingTier(tmp_path / "queries.sqlite"))
+    np.testing.assert_array_equal(other_worker.get("m", "pricing"), np.arange(3))
+    assert other_worker.stats()["tier_hits"] == 1
+
+
+def test_embedding_store_ignores_a_manifest_from_another_writer(tmp_path) -> None:
+    store = EmbeddingStore(tmp_path, "test-model")
+    store.save(["k1", "k2"], np.eye(2, dtype=np.float32))
+    manifest = next(tmp_path.glob("*.json")).read_text()
+    store.save(["k2", "k1"], np.eye(2, dtype=np.float32)[::-1])
+    assert store.load()[0] == ["k2", "k1"]
+
+    next(tmp_path.glob("*.json")).write_text(manifest)
+    assert store.load() == ([], None)
+    assert not list(tmp_path.glob(".*.tmp"))
@@ -0,0 +1,116 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+from langgraph.graph import START, StateGraph
+
+from react_agent.graph import (
+    create_entry_node,
+    pop_dialog_state,
+    route_primary_assistant,
+)
+from react_agent.state import State
+from react_agent.tools.lookup_knowledge_base import (
+    VectorStoreRetriever,
+    batched_lookups,
+    docs,
+    lookup_knowledge_base,
+    retriever_resource,
+)
+from react_agent.utils import BatchedToolNode
+
+
+def _call(name: str, id: str, **args) -> dict:
+    return {"name": name, "args": args, "id": id, "type": "tool_call"}
+
+
+@tool
+def echo(text: str) -> str:
+    """Repeat the text."""
+    return text
+
+
+@pytest.fixture
+def tools_node(embeddings_client, async_embeddings_client):
+    retriever_resource.override(
+        VectorStoreRetriever.from_docs(docs, embeddings_client, async_client=async_embeddings_client)
+    )
+    node = BatchedToolNode(
+        [lookup_knowledge_base, echo], {lookup_knowledge_base.name: batched_lookups}
+    )
+    builder = StateGraph(State)
+    builder.add_node("tools", node.as_runnable())
+    builder.add_edge(START, "tools")
+    yield builder.compile()
+    retriever_resource.reset()
+
+
+def _parallel_calls() -> dict:
+    message = AIMessage(
+        "",
+        tool_calls=[
+            _call("lookup_knowledge_base", "1", query="free trial"),
+            _call("echo", "2", text="hello"),
+            _call("lookup_knowledge_base", "3", query="Growth plan price"),
+            _call("lookup_knowledge_base", "4", query="free trial"),
+        ],
+    )
+    return {"messages": [HumanMessage("Tell me about pricing"), message]}
+
+
+def _check_answers(result: dict) -> None:
+    answers = result["messages"][2:]
+    assert [answer.tool_call_id for answer in answers] == ["1", "2", "3", "4"]
+    assert answers[1].content == "hello"
+    assert "free trial" in answers[0].content.lower()
+    assert answers[0].content == answers[3].content
+    assert "Growth Plan" in answers[2].content
+
+
+def test_parallel_lookups_share_one_embeddings_request(tools_node, embeddings_client) -> None:
+    calls = len(embeddings_client.inputs)
+    _check_answers(tools_node.invoke(_parallel_calls(), {}))
+    assert embeddings_client.inputs[calls:] == [["free trial", "growth plan price"]]
+
+
+@pytest.mark.asyncio
+async def test_async_parallel_lookups_share_one_embeddings_request(
+    tools_node, embeddings_client
+) -> None:
+    calls = len(embeddings_client.inputs)
+    _check_answers(await tools_node.ainvoke(_parallel_calls(), {}))
+    assert len(embeddings_client.inputs) == calls + 1
+
+
+def test_handoff_wins_and_every_call_is_answered() -> None:
+    message = AIMessage(
+        "",
+        tool_calls=[
+            _call("lookup_knowledge_base", "1", query="pricing"),
+            _call("ToHumanAssistant", "2", email="", request="wants a person"),
+            _call("lookup_knowledge_base", "3", query="trial"),
+        ],
+    )
+    state = {"messages": [HumanMessage("pricing? and get me a human"), message]}
+    assert route_primary_assistant(state) == "enter_human_assistant"
+
+    entry = create_entry_node("Human Assistant", "human_assistant", "ToHumanAssistant")
+    result = entry(state)
+    answers = result["messages"]
+    assert [answer.tool_call_id for answer in answers] == ["1", "2", "3"]
+    assert answers[1].content.startswith("The assistant is now the Human Assistant")
+    assert answers[0].content.startswith("Not run") and answers[2].content.startswith("Not run")
+    assert result["dialog_state"] == "human_assistant"
+
+
+def test_pop_dialog_state_answers_every_call() -> None:
+    message = AIMessage(
+        "",
+        tool_calls=[
+            _call("CompleteOrEscalate", "a", cancel=False),
+            _call("CompleteOrEscalate", "b", cancel=True),
+        ],
+    )
+    result = pop_dialog_state({"messages": [message]})
+    assert [m.tool_call_id for m in result["messages"]] == ["a", "b"]
+    assert all(isinstance(m, ToolMessage) for m in result["messages"])
+    assert pop_dialog_state({"messages": [AIMessage("bye")]})["messages"] == []
@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.memory import InMemorySaver
+
+from react_agent.graph import build_graph
+from react_agent.handoff import (
+    HandoffNotifier,
+    HandoffQueue,
+    HandoffQueueFull,
+    HandoffRequest,
+    MemoryHandoffStore,
+    SQLiteHandoffStore,
+    handoff_queue_resource,
+)
+from react_agent.utils import get_message_text
+
+
+def _request(key: str, user_type: str, request: str = "help", created: float = 0.0):
+    return HandoffRequest(key=key, user_type=user_type, request=request, created=created)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryHandoffStore()
+    return SQLiteHandoffStore(str(tmp_path / "handoffs.sqlite"))
+
+
+def test_serves_accounts_then_leads_then_visitors_oldest_first(store) -> None:
+    queue = HandoffQueue(store)
+    queue.submit(_request("v1", "visitor", created=1))
+    queue.submit(_request("l1", "lead", created=2))
+    ticket = queue.submit(_request("a1", "account", created=3))
+    queue.submit(_request("l0", "lead", created=0))
+
+    assert ticket.position == 1
+    assert queue.depth() == {"visitor": 1, "lead": 2, "account": 1}
+    assert [r.key for r in queue.claim(3)] == ["a1", "l0", "l1"]
+    assert [r.key for r in queue.claim(3)] == ["v1"]
+    assert queue.claim() == []
+
+
+def test_repeat_escalation_updates_the_waiting_request(store) -> None:
+    queue = HandoffQueue(store)
+    queue.submit(_request("a@b.co", "lead", "refund please", created=1))
+    queue.submit(_request("x@y.co", "lead", created=2))
+
+    ticket = queue.submit(_request("a@b.co", "lead", "order 42", created=3))
+
+    assert ticket.merged and ticket.position == 1
+    assert ticket.request.request == "refund please\norder 42"
+    (claimed,) = queue.claim()
+    assert claimed.escalations == 2 and claimed.request == "refund please\norder 42"
+    assert queue.cancel("x@y.co").key == "x@y.co"
+    assert queue.cancel("x@y.co") is None
+
+
+def test_full_queue_waits_for_room_then_rejects(store) -> None:
+    queue = HandoffQueue(store, capacity=1, poll_interval=0.01)
+    queue.submit(_request("first", "visitor"))
+
+    started = time.monotonic()
+    with pytest.raises(HandoffQueueFull):
+        queue.submit(_request("second", "account"), timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+
+    async def claim_later():
+        await asyncio.sleep(0.05)
+        queue.claim()
+
+    async def submit_when_room():
+        _, ticket = await asyncio.gather(
+            claim_later(), queue.asubmit(_request("second", "account"), timeout=1.0)
+        )
+        return ticket
+
+    assert asyncio.run(submit_when_room()).position == 1
+
+
+def test_sqlite_queue_is_shared_between_connections(tmp_path) -> None:
+    path = str(tmp_path / "handoffs.sqlite")
+    HandoffQueue(SQLiteHandoffStore(path)).submit(_request("a@b.co", "lead"))
+
+    other = HandoffQueue(SQLiteHandoffStore(path))
+    assert other.submit(_request("a@b.co", "lead", "again")).merged
+    assert [r.key for r in other.claim()] == ["a@b.co"]
+
+
+def test_notifier_batches_by_size_and_delay() -> None:
+    batches = []
+    notifier = HandoffNotifier(batches.append, max_batch=3, max_delay=0.1)
+    for i in range(4):
+        notifier.add(_request(str(i), "visitor"))
+
+    deadline = time.monotonic() + 2
+    while len(batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    notifier.close()
+
+    assert [[r.key for r in batch] for batch in batches] == [["0", "1", "2"], ["3"]]
+
+
+def test_notifier_deadline_follows_the_oldest_pending_request(caplog) -> None:
+    sent = []
+    notifier = HandoffNotifier(lambda batch: sent.append((time.monotonic(), batch)), 2, 0.2)
+    added = {}
+    for key in "abc":
+        added[key] = time.monotonic()
+        notifier.add(_request(key, "visitor", request="my card was charged twice"))
+        time.sleep(0.05)
+
+    deadline = time.monotonic() + 2
+    while len(sent) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    notifier.close()
+
+    assert [[r.key for r in batch] for _, batch in sent] == [["a", "b"], ["c"]]
+    assert all(at - added[r.key] < 0.2 + 0.1 for at, batch in sent for r in batch)
+
+    # The default sink logs ids and user types only.
+    with caplog.at_level("INFO", logger="react_agent.telemetry"):
+        HandoffNotifier()._send([_request("a@b.co", "lead", request="my card was charged")])
+    assert '"user_type": "lead"' in caplog.text
+    assert "a@b.co" not in caplog.text and "charged" not in caplog.text
+
+
+def test_handoff_node_queues_and_leaves_the_queue(monkeypatch) -> None:
+    def reply(state: dict) -> AIMessage:
+        if state["messages"][-1].type == "tool":
+            return AIMessage("Anything else?")
+        call = {"name": "ToHumanAssistant", "args": {"request": "a person"}, "id": "1"}
+        return AIMessage("", tool_calls=[call])
+
+    monkeypatch.setattr("react_agent.graph.assistant_runnable_resource", RunnableLambda(reply))
+    queue = HandoffQueue()
+    handoff_queue_resource.override(queue)
+    try:
+        graph = build_graph(checkpointer=InMemorySaver())
+        config = {"configurable": {"thread_id": "t1", "email": "a@b.co"}}
+
+        state = graph.invoke({"messages": [("user", "I want to talk to a human")]}, config)
+        assert "number 1 in line" in get_message_text(state["messages"][-1])
+        assert queue.depth() == {"lead": 1}
+
+        state = graph.invoke({"messages": [("user", "It's about my invoice")]}, config)
+        assert "added that to your request" in get_message_text(state["messages"][-1])
+
+        state = graph.invoke({"messages": [("user", "no thanks")]}, config)
+        assert get_message_text(state["messages"][-1]) == "Anything else?"
+        assert queue.depth() == {}
+        leave, answered = state["messages"][-3:-1]
+        assert answered.tool_call_id == leave.tool_calls[0]["id"] != "tool_call_id"
+    finally:
+        handoff_queue_resource.reset()
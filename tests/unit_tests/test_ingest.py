@@ -0,0 +1,144 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from react_agent.ingest import (
+    GenerationWatcher,
+    PackedDocs,
+    current_generation,
+    ingest_directory,
+    load_generation,
+    publish_documents,
+)
+from react_agent.tools.lookup_knowledge_base import VectorStoreRetriever
+
+PRICING = "# Pricing\n\n## Growth\n\nThe Growth plan costs $350 a month.\n"
+DEMO = "# Demos\n\n## Booking\n\nClick Get a Demo on the homepage.\n"
+
+
+@pytest.fixture
+def source(tmp_path):
+    directory = tmp_path / "kb"
+    (directory / "sales").mkdir(parents=True)
+    (directory / "sales" / "pricing.md").write_text(PRICING)
+    (directory / "demo.md").write_text(DEMO)
+    return directory
+
+
+def test_ingest_publishes_a_searchable_generation(tmp_path, source, embeddings_client) -> None:
+    report = ingest_directory(source, tmp_path / "root", embeddings_client, "m", batch_size=1)
+
+    assert (report.chunks, report.embedded, report.reused) == (2, 2, 0)
+    assert current_generation(tmp_path / "root") == report.generation
+    generation = load_generation(tmp_path / "root")
+    assert [d["source"] for d in generation.docs] == ["demo.md", "sales/pricing.md"]
+    assert isinstance(generation.index.matrix.data, np.memmap)
+
+    retriever = VectorStoreRetriever(generation.docs, generation.index, embeddings_client)
+    assert retriever.query("growth plan price", k=1)[0]["source"] == "sales/pricing.md"
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_reingest_embeds_only_changed_chunks(tmp_path, source, embeddings_client, dtype) -> None:
+    root = tmp_path / "root"
+    first = ingest_directory(source, root, embeddings_client, "m", dtype=dtype)
+    (source / "demo.md").write_text(DEMO.replace("homepage", "pricing page"))
+    calls = len(embeddings_client.inputs)
+
+    second = ingest_directory(source, root, embeddings_client, "m", dtype=dtype)
+
+    assert (second.embedded, second.reused) == (1, 1)
+    assert len(embeddings_client.inputs) == calls + 1
+    old, new = load_generation(root, first.generation), load_generation(root)
+    np.testing.assert_array_equal(old.index.matrix.take([1]), new.index.matrix.take([1]))
+
+
+def test_keeps_a_bounded_number_of_generations(tmp_path, source, embeddings_client) -> None:
+    root = tmp_path / "root"
+    for _ in range(4):
+        ingest_directory(source, root, embeddings_client, "m", keep_generations=2)
+    assert len(list((root / "generations").iterdir())) == 2
+
+
+def test_watcher_swaps_to_new_generations(tmp_path, source, embeddings_client) -> None:
+    root = tmp_path / "root"
+    first = ingest_directory(source, root, embeddings_client, "m")
+    seen = []
+    watcher = GenerationWatcher(root, seen.append, current=first.generation)
+
+    assert not watcher.check()
+    second = ingest_directory(source, root, embeddings_client, "m", index="ivf")
+    assert watcher.check()
+    assert [g.name for g in seen] == [second.generation]
+    assert seen[0].index.kind == "ivf"
+
+
+def test_chunks_are_served_packed_and_memory_mapped(tmp_path, source, embeddings_client) -> None:
+    ingest_directory(source, tmp_path / "root", embeddings_client, "m")
+    generation = load_generation(tmp_path / "root")
+    assert isinstance(generation.docs, PackedDocs)
+    assert isinstance(generation.docs.blob, np.memmap)
+    assert [doc["source"] for doc in generation.docs] == ["demo.md", "sales/pricing.md"]
+    assert generation.docs[-1] == generation.docs[1] == generation.docs[1:][0]
+    with pytest.raises(IndexError):
+        generation.docs[2]
+
+    assert not (generation.path / "docs.jsonl").exists()
+
+    # Generations published before chunks were packed still load.
+    legacy = list(generation.docs)
+    (generation.path / "docs.jsonl").write_text("".join(json.dumps(doc) + "\n" for doc in legacy))
+    (generation.path / "docs.bin").unlink()
+    assert load_generation(tmp_path / "root").docs == legacy
+
+
+def test_publish_documents(tmp_path, embeddings_client) -> None:
+    docs = [{"page_content": "Refunds take five days."}, {"page_content": "Demos are free."}]
+    vectors = [embeddings_client.vector(doc["page_content"]) for doc in docs]
+    name = publish_documents(tmp_path, docs, vectors, "m", dtype="int8", source="faq")
+    generation = load_generation(tmp_path)
+    assert generation.name == name == current_generation(tmp_path)
+    assert generation.manifest["source"] == "faq" and generation.manifest["chunks"] == 2
+    retriever = VectorStoreRetriever(generation.docs, generation.index, embeddings_client)
+    assert retriever.query("refunds", k=1)[0]["page_content"] == docs[0]["page_content"]
+
+
+def test_empty_source_publishes_nothing(tmp_path, embeddings_client) -> None:
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(ValueError):
+        ingest_directory(tmp_path / "empty", tmp_path / "root", embeddings_client, "m")
+    assert current_generation(tmp_path / "root") is None
+    assert list((tmp_path / "root" / "generations").iterdir()) == []
+
+
+def test_retriever_resource_hot_swaps(
+    tmp_path, source, monkeypatch, embeddings_client, async_embeddings_client
+) -> None:
+    from react_agent.tools import lookup_knowledge_base as kb
+
+    root = tmp_path / "root"
+    ingest_directory(source, root, embeddings_client, "m")
+    monkeypatch.setenv("KB_PATH", str(root))
+    monkeypatch.setenv("KB_RELOAD_INTERVAL_SECONDS", "0.01")
+    kb.openai_client.override(embeddings_client)
+    kb.async_openai_client.override(async_embeddings_client)
+    kb.retriever_resource.reset()
+    try:
+        serving = kb.retriever_resource.get()
+        (source / "refunds.md").write_text("# Refunds\n\nRefunds take five days.\n")
+        ingest_directory(source, root, embeddings_client, "m")
+
+        deadline = time.monotonic() + 2.0
+        while kb.retriever_resource.get() is serving and time.monotonic() < deadline:
+            time.sleep(0.01)
+        swapped = kb.retriever_resource.get()
+        assert swapped is not serving
+        assert swapped.query("refunds", k=1)[0]["source"] == "refunds.md"
+        # The old retriever still serves lookups that already hold it.
+        assert serving.query("refunds", k=1)[0]["source"] != "refunds.md"
+    finally:
+        kb._kb_watcher.stop()
+        for resource in (kb.retriever_resource, kb.openai_client, kb.async_openai_client):
+            resource.reset()
@@ -0,0 +1,57 @@
+import pytest
+
+from react_agent.bm25 import LexicalThreshold
+from react_agent.embedding_cache import QueryEmbeddingCache
+from react_agent.tools.lookup_knowledge_base import VectorStoreRetriever, docs
+
+
+def test_retriever_caches_query_embeddings(embeddings_client) -> None:
+    retriever = VectorStoreRetriever.from_docs(
+        docs, embeddings_client, query_cache=QueryEmbeddingCache()
+    )
+    first = retriever.query("Is there a free trial?", k=2)
+    again = retriever.query("is there a free trial", k=2)
+
+    assert len(embeddings_client.inputs) == 2
+    assert [d["page_content"] for d in first] == [d["page_content"] for d in again]
+    assert "free trial" in first[0]["page_content"].lower()
+    assert retriever.query_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retriever_async_query(embeddings_client, async_embeddings_client) -> None:
+    retriever = VectorStoreRetriever.from_docs(
+        docs, embeddings_client, async_client=async_embeddings_client
+    )
+    sync_docs = retriever.query("How much is the Growth Plan?", k=2)
+    async_docs = await retriever.aquery("How much is the Growth Plan?", k=2)
+
+    assert [d["page_content"] for d in async_docs] == [d["page_content"] for d in sync_docs]
+
+
+def test_decisive_lexical_match_skips_embedding(embeddings_client) -> None:
+    retriever = VectorStoreRetriever.from_docs(
+        docs, embeddings_client, hybrid=True, lexical_threshold=LexicalThreshold()
+    )
+    calls = len(embeddings_client.inputs)
+
+    results = retriever.query("Can I book a demo?", k=2)
+    assert len(embeddings_client.inputs) == calls
+    assert "book a demo" in results[0]["page_content"]
+
+    results = retriever.query("tell me about your company", k=2)
+    assert len(embeddings_client.inputs) == calls + 1
+    assert len(results) == 2 and all("lexical_score" in r for r in results)
+
+
+def test_query_many_batches_embeddings(embeddings_client) -> None:
+    retriever = VectorStoreRetriever.from_docs(docs, embeddings_client)
+    queries = ["Is there a free trial?", "How much is the Growth Plan?", "is there a free trial"]
+
+    batched = retriever.query_many(queries, k=3)
+    assert embeddings_client.inputs[-1] == ["is there a free trial", "how much is the growth plan"]
+    single = [retriever.query(query, k=3) for query in queries]
+    assert [[d["page_content"] for d in r] for r in batched] == [
+        [d["page_content"] for d in r] for r in single
+    ]
+    assert batched[0][0]["similarity"] == pytest.approx(single[0][0]["similarity"])
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES, add_messages
+
+from react_agent.checkpoint import SQLiteSaver
+from react_agent.message_log import MessageLog, merge_messages
+from react_agent.utils import get_message_text
+
+
+def _dump(messages) -> list[tuple]:
+    return [(type(m).__name__, m.id, m.content) for m in messages]
+
+
+def _updates(seed: int, steps: int):
+    rng = random.Random(seed)
+    ids: list[str] = []
+    for step in range(steps):
+        kind = rng.random()
+        if kind < 0.5 or not ids:
+            ids.append(f"m{step}")
+            update = [HumanMessage(f"q{step}", id=ids[-1]), ("assistant", f"a{step}")]
+        elif kind < 0.75:
+            update = AIMessage(f"edited {step}", id=rng.choice(ids))
+        elif kind < 0.95:
+            update = [RemoveMessage(id=ids.pop(rng.randrange(len(ids))))]
+        else:
+            ids.clear()
+            update = [RemoveMessage(id=REMOVE_ALL_MESSAGES), ToolMessage("t", tool_call_id="c")]
+        yield update
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merge_messages_matches_add_messages(seed) -> None:
+    expected = [HumanMessage("start", id="start")]
+    actual = [HumanMessage("start", id="start")]
+    for update in _updates(seed, 200):
+        # Generated ids differ between the two reducers; give both the same ones.
+        if isinstance(update, list):
+            update = [
+                AIMessage(u[1], id=f"gen-{len(expected)}") if isinstance(u, tuple) else u
+                for u in update
+            ]
+        expected = add_messages(expected, update)
+        actual = merge_messages(actual, update)
+        assert isinstance(actual, MessageLog)
+        assert _dump(actual) == _dump(expected)
+
+
+def test_logs_share_their_index_and_forks_stay_correct() -> None:
+    base = merge_messages([], [HumanMessage("a", id="a"), AIMessage("b", id="b")])
+    longer = merge_messages(base, HumanMessage("c", id="c"))
+    fork = merge_messages(base, HumanMessage("d", id="d"))
+
+    assert longer._index is base._index and fork._index is not base._index
+    assert base.position("c") is None and longer.position("c") == 2
+    assert fork.position("c") is None and fork.position("d") == 2
+    assert _dump(merge_messages(fork, AIMessage("d2", id="d"))) == _dump(
+        [HumanMessage("a", id="a"), AIMessage("b", id="b"), AIMessage("d2", id="d")]
+    )
+    assert type(longer[1:]) is list
+
+    with pytest.raises(ValueError):
+        merge_messages(base, RemoveMessage(id="missing"))
+
+
+def test_sqlite_saver_serializes_each_message_once(tmp_path) -> None:
+    saver = SQLiteSaver(str(tmp_path / "checkpoints.sqlite"))
+    dumped = []
+    serialize = saver._dump_message
+
+    def counting(message):
+        dumped.append(message.id)
+        return serialize(message)
+
+    saver._dump_message = counting
+    log = MessageLog()
+    with saver._pool.connection() as conn:
+        for i in range(5):
+            log = merge_messages(log, HumanMessage(str(i), id=str(i)))
+            saver._dump_channel(conn, "t", log)
+        assert dumped == ["0", "1", "2", "3", "4"]
+        saver._dump_channel(conn, "t", list(log))
+    assert len(dumped) == 10
+
+
+def test_replaced_and_removed_messages_leave_the_memo() -> None:
+    log = merge_messages([], [HumanMessage("a", id="a"), AIMessage("b", id="b")])
+    first = log[1]
+    assert log.memoized(first, get_message_text) == "b"
+    assert log.memoized(first, get_message_text) is log._memo[id(first)][1][get_message_text]
+
+    log = merge_messages(log, AIMessage("b2", id="b"))
+    assert id(first) not in log._memo
+    assert log.memoized(log[1], get_message_text) == "b2"
+    log = merge_messages(log, RemoveMessage(id="b"))
+    assert [entry[0].id for entry in log._memo.values()] == []
@@ -0,0 +1,64 @@
+import json
+import math
+import urllib.request
+
+import pytest
+
+from react_agent import metrics
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    histogram = metrics.Histogram("h", buckets=(1, 5))
+    for value in (0.5, 1, 3, 9):
+        histogram.observe(value, node="a")
+
+    sample = histogram.sample(node="a")
+    assert sample.buckets == ((1, 2), (5, 3), (math.inf, 4))
+    assert (sample.sum, sample.count) == (13.5, 4)
+    assert histogram.sample(node="b").count == 0
+
+
+def test_metric_names_are_unique_across_kinds() -> None:
+    metrics.counter("test_metrics_kind_total")
+    with pytest.raises(ValueError):
+        metrics.histogram("test_metrics_kind_total")
+
+
+def test_render_prometheus() -> None:
+    counter = metrics.counter("test_render_requests_total", "Requests.")
+    counter.inc(2, path='a"b')
+    histogram = metrics.histogram("test_render_seconds", "Latency.", buckets=(0.5,))
+    histogram.observe(0.25)
+    gauge = metrics.gauge("test_render_depth", "Depth.")
+    gauge.set(3, queue="a")
+    gauge.inc(-1, queue="a")
+
+    text = metrics.render_prometheus(prefix="test_render_")
+
+    assert text.splitlines() == [
+        "# HELP test_render_depth Depth.",
+        "# TYPE test_render_depth gauge",
+        'test_render_depth{queue="a"} 2',
+        "# HELP test_render_requests_total Requests.",
+        "# TYPE test_render_requests_total counter",
+        'test_render_requests_total{path="a\\"b"} 2',
+        "# HELP test_render_seconds Latency.",
+        "# TYPE test_render_seconds histogram",
+        'test_render_seconds_bucket{le="0.5"} 1',
+        'test_render_seconds_bucket{le="+Inf"} 1',
+        "test_render_seconds_sum 0.25",
+        "test_render_seconds_count 1",
+    ]
+
+
+def test_metrics_endpoint() -> None:
+    metrics.counter("test_endpoint_total").inc()
+    server = metrics.serve(0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert "test_endpoint_total 1" in response.read().decode()
+        with urllib.request.urlopen(f"{base}/metrics.json") as response:
+            assert json.load(response)["test_endpoint_total"] == [{"labels": {}, "value": 1.0}]
+    finally:
+        server.shutdown()
@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.constants import TAG_NOSTREAM
+
+from react_agent.assistant import Assistant
+from react_agent.configuration import Configuration
+from react_agent.model_tiers import (
+    FAST,
+    PRIMARY,
+    LatencyWindow,
+    ModelTiers,
+    escalation_reason,
+    latencies,
+)
+
+TIERING = {"model_tiering": True, "retry_initial_backoff_seconds": 0}
+
+
+def _call(name: str, **args) -> dict:
+    return {"name": name, "args": args, "id": name, "type": "tool_call"}
+
+
+def _model(*replies: AIMessage) -> RunnableLambda:
+    remaining, tags = list(replies), []
+
+    def respond(state, config):
+        tags.append(config.get("tags", []))
+        return remaining.pop(0)
+
+    runnable = RunnableLambda(respond)
+    runnable.remaining, runnable.tags = remaining, tags  # type: ignore[attr-defined]
+    return runnable
+
+
+def _state(text: str) -> dict:
+    return {"messages": [HumanMessage(text)]}
+
+
+def test_escalation_reasons() -> None:
+    pricing, human = _state("How much is the Growth plan?"), _state("talk to a human please")
+    lookup = AIMessage("", tool_calls=[_call("lookup_knowledge_base", query="Growth plan")])
+    assert escalation_reason(lookup, pricing) is None
+    assert escalation_reason(AIMessage(""), pricing) == "empty"
+    assert escalation_reason(AIMessage("It is $350."), pricing) == "tool_choice"
+    assert escalation_reason(AIMessage("Sure, what about?"), human) == "tool_choice"
+    assert escalation_reason(AIMessage("I'm not sure, sorry."), _state("hi")) == "low_confidence"
+    assert escalation_reason(AIMessage("Hello! How can I help?"), _state("hi")) is None
+
+
+def test_simple_turns_use_the_fast_tier_and_escalate(caplog) -> None:
+    fast = _model(AIMessage("The Growth plan costs $350."))
+    primary = _model(
+        AIMessage("", tool_calls=[_call("lookup_knowledge_base", query="Growth plan price")])
+    )
+    node = Assistant(primary, fast).as_runnable("primary_assistant")
+    with caplog.at_level("INFO", logger="react_agent.telemetry"):
+        result = node.invoke(_state("What is the Growth plan price?"), {"configurable": TIERING})
+    assert result["messages"].tool_calls[0]["name"] == "lookup_knowledge_base"
+    assert fast.remaining == primary.remaining == []
+    # The fast reply was thrown away, so its tokens were never streamed.
+    assert TAG_NOSTREAM in fast.tags[0] and TAG_NOSTREAM not in primary.tags[0]
+    turn = next(r for r in caplog.records if '"assistant_turn"' in r.getMessage())
+    assert '"escalation": "tool_choice"' in turn.getMessage()
+
+    # Disabled by default; long questions start on the primary tier.
+    configuration = Configuration(**TIERING, fast_model_max_words=5)
+    long_question = [HumanMessage("Can you explain how the Growth plan is billed for ten?")]
+    assert ModelTiers(primary, fast, configuration, long_question).tier == PRIMARY
+    assert ModelTiers(primary, fast, Configuration(), [HumanMessage("hi")]).tier == PRIMARY
+    assert ModelTiers(primary, fast, configuration, [HumanMessage("hi")]).tier == FAST
+
+
+def test_long_conversations_use_the_primary_tier_when_the_prompt_is_windowed() -> None:
+    messages = []
+    for i in range(5):
+        messages += [HumanMessage(f"Question {i}", id=f"h{i}"), AIMessage("ok " * 40, id=f"a{i}")]
+    messages.append(HumanMessage("hi", id="h5"))
+    fast, primary = _model(AIMessage("Hello!")), _model(AIMessage("Hello!"))
+    node = Assistant(primary, fast).as_runnable("primary_assistant")
+
+    # Only the last turn fits in the prompt, but six questions have been asked.
+    node.invoke({"messages": messages}, {"configurable": {**TIERING, "context_max_tokens": 40}})
+
+    assert primary.remaining == [] and fast.remaining == [AIMessage("Hello!")]
+
+
+def test_latency_window_percentile() -> None:
+    window = LatencyWindow()
+    for seconds in range(1, 11):
+        window.record(float(seconds))
+    assert window.percentile(50, min_samples=20) is None
+    assert window.percentile(90, min_samples=5) == pytest.approx(9.1)
+
+
+HEDGED = Configuration(hedged_requests=True, hedge_initial_delay_seconds=0.05)
+
+
+def _slow_then_fast():
+    calls = []
+
+    def respond(state, config):
+        calls.append(config.get("tags", []))
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return AIMessage("slow")
+        return AIMessage("fast")
+
+    async def arespond(state, config):
+        calls.append(config.get("tags", []))
+        await asyncio.sleep(0.5 if len(calls) == 1 else 0)
+        return AIMessage("slow" if len(calls) == 1 else "fast")
+
+    return RunnableLambda(respond, afunc=arespond), calls
+
+
+def test_hedged_call_takes_the_first_reply(monkeypatch) -> None:
+    window = LatencyWindow()
+    monkeypatch.setitem(latencies, PRIMARY, window)
+    primary, calls = _slow_then_fast()
+    tiers = ModelTiers(primary, None, HEDGED, [HumanMessage("hi")])
+    started = time.monotonic()
+    assert tiers.call(_state("hi"), {}).content == "fast"
+    assert time.monotonic() - started < 0.4
+    assert len(calls) == 2 and tiers.calls[0]["hedged"] == "backup"
+    # Only the first copy streams its tokens.
+    assert TAG_NOSTREAM not in calls[0] and TAG_NOSTREAM in calls[1]
+    # The window gets the backup's own latency, not the wait that includes the hedge delay.
+    assert tiers.calls[0]["seconds"] >= HEDGED.hedge_initial_delay_seconds
+    assert window.percentile(100, min_samples=1) < HEDGED.hedge_initial_delay_seconds
+
+
+@pytest.mark.asyncio
+async def test_async_hedged_call_takes_the_first_reply() -> None:
+    primary, calls = _slow_then_fast()
+    tiers = ModelTiers(primary, None, HEDGED, [HumanMessage("hi")])
+    started = time.monotonic()
+    assert (await tiers.acall(_state("hi"), {})).content == "fast"
+    assert time.monotonic() - started < 0.4
+    assert tiers.report()["model_calls"][0]["hedged"] == "backup"
+    assert TAG_NOSTREAM not in calls[0] and TAG_NOSTREAM in calls[1]
@@ -0,0 +1,103 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from react_agent.assistant import Assistant
+from react_agent.prefetch import normalize_query, prefetch_hits, prefetch_wasted
+from react_agent.tools.lookup_knowledge_base import (
+    VectorStoreRetriever,
+    docs,
+    lookup_knowledge_base,
+    retriever_resource,
+)
+
+PREFETCH = {"configurable": {"kb_prefetch": True}}
+
+
+def _lookup(query: str) -> AIMessage:
+    return AIMessage(
+        "", tool_calls=[{"name": "lookup_knowledge_base", "args": {"query": query}, "id": "1"}]
+    )
+
+
+@pytest.fixture
+def retriever(embeddings_client, async_embeddings_client):
+    retriever = VectorStoreRetriever.from_docs(
+        docs, embeddings_client, async_client=async_embeddings_client
+    )
+    retriever_resource.override(retriever)
+    yield retriever
+    retriever_resource.reset()
+
+
+def test_normalize_query() -> None:
+    assert normalize_query("Is there a free trial?") == normalize_query("trial, free")
+    assert normalize_query("Is there a free trial?") != normalize_query("free trial length")
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_served_to_matching_lookup(retriever, embeddings_client) -> None:
+    hits = prefetch_hits.value()
+    node = Assistant(RunnableLambda(lambda state: _lookup("free trial"))).as_runnable("a")
+
+    result = await node.ainvoke({"messages": [HumanMessage("Is there a free trial?")]}, PREFETCH)
+
+    prefetch = result["kb_prefetch"]
+    assert prefetch["query"] == "free trial"
+    assert prefetch_hits.value() == hits + 1
+    calls = len(embeddings_client.inputs)
+    output = await lookup_knowledge_base.ainvoke({"query": "free trial", "state": result})
+    assert "free trial" in output.lower()
+    assert len(embeddings_client.inputs) == calls
+
+
+def test_prefetch_is_wasted_without_a_lookup(retriever) -> None:
+    wasted = prefetch_wasted.value(reason="no_lookup")
+    mismatched = prefetch_wasted.value(reason="query_mismatch")
+
+    state = {"messages": [HumanMessage("Is there a free trial?")]}
+    reply = Assistant(RunnableLambda(lambda state: AIMessage("Hi!")))
+    assert reply(state, PREFETCH)["kb_prefetch"] is None
+    other = Assistant(RunnableLambda(lambda state: _lookup("linkedin automation")))
+    assert other(state, PREFETCH)["kb_prefetch"] is None
+    # Sharing terms is not enough: the documents were ranked for another query.
+    narrower = Assistant(RunnableLambda(lambda state: _lookup("free trial cancellation")))
+    assert narrower(state, PREFETCH)["kb_prefetch"] is None
+
+    assert prefetch_wasted.value(reason="no_lookup") == wasted + 1
+    assert prefetch_wasted.value(reason="query_mismatch") == mismatched + 2
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_cancelled_when_the_model_call_fails(retriever) -> None:
+    cancelled = prefetch_wasted.value(reason="cancelled")
+
+    def fail(state):
+        raise RuntimeError("model unavailable")
+
+    state = {"messages": [HumanMessage("Is there a free trial?")]}
+    with pytest.raises(RuntimeError):
+        Assistant(RunnableLambda(fail))(state, PREFETCH)
+    with pytest.raises(RuntimeError):
+        await Assistant(RunnableLambda(fail)).acall(state, PREFETCH)
+
+    assert prefetch_wasted.value(reason="cancelled") == cancelled + 2
+
+
+def test_no_prefetch_after_tool_results_and_stale_prefetch_is_cleared(retriever) -> None:
+    state = {
+        "messages": [
+            HumanMessage("Is there a free trial?"),
+            _lookup("free trial"),
+            ToolMessage("yes", tool_call_id="1"),
+        ],
+        "kb_prefetch": {"query": "free trial", "docs": []},
+    }
+    result = Assistant(RunnableLambda(lambda state: AIMessage("Yes.")))(state, PREFETCH)
+    assert result["kb_prefetch"] is None
+
+    # Disabled by default.
+    result = Assistant(RunnableLambda(lambda state: _lookup("free trial")))(
+        {"messages": [HumanMessage("Is there a free trial?")]}, {}
+    )
+    assert "kb_prefetch" not in result
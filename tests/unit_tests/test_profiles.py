@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+
+from react_agent.profiles import (
+    ProfileResolver,
+    SQLiteProfileStore,
+    afetch_user_info,
+    fetch_user_info,
+    profile_lookups,
+    profile_resolver_resource,
+)
+
+
+class CountingStore:
+    def __init__(self, store: SQLiteProfileStore) -> None:
+        self.store = store
+        self.queries: list[list[str]] = []
+
+    def lookup(self, emails: list[str]) -> dict[str, dict]:
+        self.queries.append(sorted(emails))
+        return self.store.lookup(emails)
+
+
+@pytest.fixture
+def crm(tmp_path) -> CountingStore:
+    store = SQLiteProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.upsert(
+        [
+            {"email": "Ada@Example.com", "name": "Ada", "account_id": "acc-1", "plan": "Growth"},
+            {"email": "bob@example.com", "name": "Bob"},
+        ]
+    )
+    return CountingStore(store)
+
+
+@pytest.fixture
+def resolver(crm):
+    resolver = ProfileResolver(crm, max_delay=0.01)
+    profile_resolver_resource.override(resolver)
+    yield resolver
+    profile_resolver_resource.reset()
+
+
+def _config(**configurable) -> dict:
+    return {"configurable": configurable}
+
+
+def test_profiles_are_classified_from_the_crm(resolver) -> None:
+    def profile(**configurable) -> dict:
+        return json.loads(fetch_user_info({}, _config(**configurable))["user_info"])
+
+    ada = profile(email="ada@example.com")
+    assert ada == {
+        "email": "ada@example.com",
+        "name": "Ada",
+        "account_id": "acc-1",
+        "plan": "Growth",
+        "user_type": "account",
+    }
+    assert profile(email="bob@example.com")["user_type"] == "lead"
+    assert profile(email="new@example.com")["user_type"] == "lead"
+    assert profile()["user_type"] == "visitor"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_query_then_hit_the_cache(crm, resolver) -> None:
+    emails = ["ada@example.com", "bob@example.com", "new@example.com", "ADA@example.com"]
+    backend, coalesced = (profile_lookups.value(source=s) for s in ("backend", "coalesced"))
+
+    records = await asyncio.gather(*(resolver.alookup(email) for email in emails))
+
+    assert crm.queries == [["ada@example.com", "bob@example.com", "new@example.com"]]
+    assert profile_lookups.value(source="backend") == backend + 3
+    assert profile_lookups.value(source="coalesced") == coalesced + 1
+    assert records[0] == records[3] and records[0]["account_id"] == "acc-1"
+    assert records[2] is None
+    assert resolver.lookup("bob@example.com")["name"] == "Bob"
+    assert len(crm.queries) == 1
+
+    resolver.invalidate("bob@example.com")
+    resolver.lookup("bob@example.com")
+    assert crm.queries[1:] == [["bob@example.com"]]
+
+
+def test_conversation_reuses_its_profile_until_identity_changes(crm, resolver) -> None:
+    config = _config(email="ada@example.com")
+    state = fetch_user_info({}, config)
+    resolver.invalidate()
+
+    assert fetch_user_info(state, config) == {}
+    assert len(crm.queries) == 1
+    bob = fetch_user_info(state, _config(email="bob@example.com"))
+    assert json.loads(bob["user_info"])["name"] == "Bob"
+    assert len(crm.queries) == 2
+
+
+class FailingStore:
+    def lookup(self, emails: list[str]) -> dict[str, dict]:
+        raise ConnectionError("CRM unavailable")
+
+
+@pytest.mark.asyncio
+async def test_backend_outage_classifies_from_the_configuration_without_caching() -> None:
+    profile_resolver_resource.override(ProfileResolver(FailingStore(), max_delay=0.01))
+    try:
+        config = _config(email="ada@example.com", name="Ada")
+        update = fetch_user_info({}, config)
+        assert json.loads(update["user_info"])["user_type"] == "lead"
+        assert "user_profile" not in update
+        update = await afetch_user_info({}, _config(account_id="acc-1", email="a@b.c"))
+        assert json.loads(update["user_info"])["user_type"] == "account"
+        assert "user_profile" not in update
+    finally:
+        profile_resolver_resource.reset()
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import threading
+
+from react_agent.registry import LazyResource
+
+
+def test_lazy_resource_is_built_once_across_threads() -> None:
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def factory() -> object:
+        calls.append(1)
+        return object()
+
+    resource = LazyResource("test", factory)
+    assert not resource.initialized
+    results = []
+
+    def worker() -> None:
+        barrier.wait()
+        results.append(resource.get())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+    resource.reset()
+    assert resource.get() is not results[0]
+    assert len(calls) == 2
+
+
+def test_importing_graph_builds_nothing() -> None:
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY")}
+    code = (
+        "import react_agent.graph\n"
+        "from react_agent import registry\n"
+        "assert registry.initialized() == [], registry.initialized()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
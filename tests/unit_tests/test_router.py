@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from langchain_core.messages import HumanMessage
+
+from react_agent.router import (
+    FAQ,
+    HANDOFF,
+    OTHER,
+    IntentRouter,
+    apre_route,
+    evaluate,
+    pre_route,
+    router_resource,
+)
+from react_agent.tools.lookup_knowledge_base import (
+    VectorStoreRetriever,
+    docs,
+    retriever_resource,
+)
+
+FAST_ROUTER = {"configurable": {"fast_router": True}}
+
+
+@pytest.fixture
+def centroid_router(embeddings_client):
+    def embed(texts):
+        return np.array([embeddings_client.vector(text) for text in texts])
+
+    return IntentRouter.from_examples(
+        embed,
+        {HANDOFF: ["transfer me to support staff"], FAQ: ["lead scoring features"]},
+        rules={},
+        min_similarity=0.5,
+    )
+
+
+@pytest.fixture
+def routing(embeddings_client, async_embeddings_client):
+    retriever_resource.override(
+        VectorStoreRetriever.from_docs(docs, embeddings_client, async_client=async_embeddings_client)
+    )
+    router_resource.override(IntentRouter())
+    yield
+    router_resource.reset()
+    retriever_resource.reset()
+
+
+def test_rules() -> None:
+    router = IntentRouter()
+    assert router.route("Can I talk to a human?").intent == HANDOFF
+    assert router.route("agent please").intent == HANDOFF
+    assert router.route("What's the pricing for Growth?").intent == FAQ
+    assert router.route("My invoice looks wrong") == router.route("hello")
+    assert router.route("hello").method == "none"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "I don't want to talk to a human",
+        "No need to connect me to an agent, just answer",
+        "Why is the price on my invoice wrong?",
+        "the integration is broken",
+        "I was charged twice for the free trial",
+    ],
+)
+def test_negations_and_complaints_are_left_to_the_model(text) -> None:
+    def embed(text):
+        raise AssertionError("a guarded rule hit must not fall through to the centroids")
+
+    router = IntentRouter(centroids={HANDOFF: np.array([1.0, 0.0]), FAQ: np.array([0.0, 1.0])})
+    route = router.route(text, embed)
+    assert (route.intent, route.method) == (OTHER, "guard")
+
+
+def test_centroids_need_similarity_and_margin(centroid_router, embeddings_client) -> None:
+    def embed(text):
+        return np.array(embeddings_client.vector(text))
+
+    route = centroid_router.route("please transfer me to support staff", embed)
+    assert (route.intent, route.method) == (HANDOFF, "centroid")
+    assert centroid_router.route("lead scoring", embed).intent == FAQ
+    assert centroid_router.route("unrelated words entirely", embed).intent == OTHER
+
+
+def test_evaluate() -> None:
+    report = evaluate(
+        IntentRouter(),
+        [("talk to a human", HANDOFF), ("free trial?", FAQ), ("hi", OTHER), ("get me a rep", HANDOFF)],
+    )
+    assert report["accuracy"] == 0.75
+    assert report["coverage"] == 0.5
+    assert report["precision"] == {HANDOFF: 1.0, FAQ: 1.0}
+    assert report["recall"] == {HANDOFF: 0.5, FAQ: 1.0}
+    assert [error["text"] for error in report["errors"]] == ["get me a rep"]
+
+
+def test_pre_route_synthesizes_tool_calls(routing) -> None:
+    state = {
+        "messages": [HumanMessage("I want to speak to a real person")],
+        "user_info": '{"email": "ada@example.com"}',
+    }
+    (message,) = pre_route(state, FAST_ROUTER)["messages"]
+    (call,) = message.tool_calls
+    assert call["name"] == "ToHumanAssistant"
+    assert call["args"] == {"email": "ada@example.com", "request": "I want to speak to a real person"}
+
+    state = {"messages": [HumanMessage("Is there a free trial?")]}
+    (call,) = pre_route(state, FAST_ROUTER)["messages"][0].tool_calls
+    assert call["name"] == "lookup_knowledge_base"
+    assert call["args"] == {"query": "Is there a free trial?"}
+
+    assert pre_route({"messages": [HumanMessage("hello")]}, FAST_ROUTER) == {}
+    # Disabled by default.
+    assert pre_route(state, {}) == {}
+
+
+@pytest.mark.asyncio
+async def test_apre_route(routing) -> None:
+    result = await apre_route({"messages": [HumanMessage("human")]}, FAST_ROUTER)
+    assert result["messages"][0].tool_calls[0]["name"] == "ToHumanAssistant"
@@ -0,0 +1,24 @@
+from react_agent.configuration import Configuration
+from react_agent.ingest import load_generation
+from react_agent.shared_kb import publish_builtin
+from react_agent.tools import lookup_knowledge_base as kb
+
+
+def test_builtin_knowledge_base_is_published_once(tmp_path, monkeypatch, embeddings_client):
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", "")
+    kb.openai_client.override(embeddings_client)
+    try:
+        name = publish_builtin(tmp_path)
+        calls = len(embeddings_client.inputs)
+        assert publish_builtin(tmp_path) == name
+        assert len(embeddings_client.inputs) == calls
+        # Another storage type is published as a new generation.
+        assert publish_builtin(tmp_path, Configuration(embedding_dtype="int8")) != name
+    finally:
+        kb.openai_client.reset()
+
+    generation = load_generation(tmp_path)
+    assert generation.manifest["dtype"] == "int8"
+    assert [doc["page_content"] for doc in generation.docs] == [
+        doc["page_content"] for doc in kb.docs
+    ]
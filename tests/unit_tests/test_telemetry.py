@@ -0,0 +1,100 @@
+import json
+import logging
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import RunnableLambda
+
+from react_agent.assistant import assistant_runnable_resource
+from react_agent.configuration import Configuration
+from react_agent.graph import build_graph
+from react_agent.telemetry import (
+    call_model,
+    estimate_cost,
+    model_cost,
+    model_ttft,
+    node_seconds,
+    token_usage,
+)
+from react_agent.tools.lookup_knowledge_base import (
+    VectorStoreRetriever,
+    docs,
+    retrieval_top_similarity,
+    retriever_resource,
+)
+
+USAGE = {
+    "input_tokens": 1200,
+    "output_tokens": 100,
+    "total_tokens": 1300,
+    "input_token_details": {"cache_read": 1000, "cache_creation": 0},
+}
+
+
+def test_token_usage_and_cost() -> None:
+    tokens = token_usage(AIMessage("hi", usage_metadata=USAGE))
+    assert tokens == {"uncached": 200, "cache_read": 1000, "cache_creation": 0, "output": 100}
+    configuration = Configuration(model_input_usd_per_mtok=3.0, model_output_usd_per_mtok=15.0)
+    expected = (200 * 3.0 + 1000 * 0.3 + 100 * 15.0) / 1e6
+    assert estimate_cost(tokens, configuration) == pytest.approx(expected)
+
+
+def test_call_model_merges_streamed_chunks() -> None:
+    def stream(_):
+        yield AIMessageChunk("Hel")
+        yield AIMessageChunk("lo", usage_metadata=USAGE)
+
+    ttft_calls = model_ttft.sample().count
+    cost = model_cost.value()
+
+    message = call_model(RunnableLambda(stream), {}, {})
+
+    assert type(message) is AIMessage
+    assert message.content == "Hello"
+    assert model_ttft.sample().count == ttft_calls + 1
+    assert model_cost.value() > cost
+
+
+@pytest.fixture
+def graph(embeddings_client, async_embeddings_client):
+    replies = iter(
+        [
+            AIMessage(
+                "",
+                tool_calls=[
+                    {"name": "lookup_knowledge_base", "args": {"query": "free trial"}, "id": "1"}
+                ],
+            ),
+            AIMessage("Yes, there is a free trial."),
+        ]
+    )
+    assistant_runnable_resource.override(RunnableLambda(lambda state: next(replies)))
+    retriever = VectorStoreRetriever.from_docs(
+        docs, embeddings_client, async_client=async_embeddings_client
+    )
+    retriever_resource.override(retriever)
+    yield build_graph(checkpointer=None)
+    assistant_runnable_resource.reset()
+    retriever_resource.reset()
+
+
+def test_graph_nodes_are_timed_and_logged(graph, caplog) -> None:
+    nodes = ("fetch_user_info", "pre_router", "primary_assistant", "primary_assistant_tools")
+    before = {node: node_seconds.sample(node=node, status="ok").count for node in nodes}
+    scores = retrieval_top_similarity.sample(path="vector").count
+
+    with caplog.at_level(logging.INFO, logger="react_agent.telemetry"):
+        result = graph.invoke({"messages": [("user", "Is there a free trial?")]})
+
+    assert result["messages"][-1].content == "Yes, there is a free trial."
+    after = {node: node_seconds.sample(node=node, status="ok").count for node in before}
+    assert after == {
+        "fetch_user_info": before["fetch_user_info"] + 1,
+        "pre_router": before["pre_router"] + 1,
+        "primary_assistant": before["primary_assistant"] + 2,
+        "primary_assistant_tools": before["primary_assistant_tools"] + 1,
+    }
+    assert retrieval_top_similarity.sample(path="vector").count == scores + 1
+    events = [json.loads(record.getMessage()) for record in caplog.records]
+    kinds = {event["event"] for event in events}
+    assert kinds >= {"node", "model_call", "assistant_turn", "retrieval"}
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from react_agent.tools.lookup_knowledge_base import VectorStoreRetriever, docs
+from react_agent.vector_index import (
+    ExactIndex,
+    IVFIndex,
+    VectorIndex,
+    build_index,
+    load_index,
+)
+from react_agent.vectors import EmbeddingMatrix
+
+
+@pytest.fixture
+def matrix() -> EmbeddingMatrix:
+    rng = np.random.default_rng(0)
+    return EmbeddingMatrix(rng.normal(size=(500, 32)))
+
+
+def test_ivf_probing_every_list_is_exact(matrix) -> None:
+    queries = np.random.default_rng(1).normal(size=(8, 32))
+    ivf = IVFIndex.build(matrix, n_lists=10, n_probe=10)
+
+    exact_idx, exact_scores = ExactIndex(matrix).search(queries, 5)
+    ivf_idx, ivf_scores = ivf.search(queries, 5)
+    np.testing.assert_array_equal(ivf_idx, exact_idx)
+    np.testing.assert_allclose(ivf_scores, exact_scores, rtol=1e-5)
+    assert sorted(ivf.order.tolist()) == list(range(500))
+
+
+@pytest.mark.parametrize("kind", ["exact", "ivf"])
+def test_index_round_trips_through_mmap(tmp_path, matrix, kind) -> None:
+    index = build_index(matrix, kind)
+    index.save(tmp_path)
+    loaded = load_index(tmp_path)
+
+    assert type(loaded) is type(index)
+    assert isinstance(loaded.matrix.data, np.memmap)
+    query = matrix.take([3])
+    np.testing.assert_array_equal(loaded.search(query, 3)[0], index.search(query, 3)[0])
+    if kind == "ivf":
+        assert load_index(tmp_path, n_probe=2).n_probe == 2
+
+
+def test_retriever_with_ivf_index(embeddings_client) -> None:
+    retriever = VectorStoreRetriever.from_docs(
+        docs, embeddings_client, index="ivf", index_params={"n_lists": 8, "n_probe": 1}
+    )
+    results = retriever.query("Is there a free trial?", k=len(docs))
+
+    assert 0 < len(results) <= len(docs)
+    assert all(r["similarity"] is not None for r in results)
+
+
+def test_unknown_index_kind(matrix) -> None:
+    with pytest.raises(ValueError):
+        build_index(matrix, "hnsw")
+
+
+def test_indexes_must_implement_search(matrix) -> None:
+    class Partial(VectorIndex):
+        kind = "partial"
+
+    with pytest.raises(TypeError):
+        Partial(matrix)
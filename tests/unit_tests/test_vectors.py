@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from react_agent.vectors import EmbeddingMatrix, top_k
+
+
+def test_matrix_scores_are_cosine_similarity() -> None:
+    matrix = EmbeddingMatrix([[3.0, 4.0], [0.0, 2.0], [0.0, 0.0]])
+
+    assert matrix.data.dtype == np.float32 and matrix.data.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(matrix.scores(np.array([0.0, 10.0])), [[0.8, 1.0, 0.0]])
+
+
+def test_top_k_is_vectorized_and_sorted() -> None:
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.4, 0.3, 0.2, 0.1]])
+    idx, best = top_k(scores, 2)
+
+    assert idx.tolist() == [[1, 3], [0, 1]]
+    np.testing.assert_allclose(best, [[0.9, 0.7], [0.4, 0.3]])
+    assert top_k(scores, 10)[0].shape == (2, 4)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_matrix_preserves_ranking(dtype) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 64))
+    queries = rng.normal(size=(5, 64))
+    exact = EmbeddingMatrix(vectors)
+    quantized = EmbeddingMatrix(vectors, dtype=dtype)
+
+    assert quantized.nbytes < exact.nbytes
+    np.testing.assert_allclose(quantized.scores(queries), exact.scores(queries), atol=0.02)
+    assert (quantized.search(queries, 1)[0] == exact.search(queries, 1)[0]).all()
+    np.testing.assert_allclose(
+        quantized.score_rows(queries[0], [3, 7]), exact.scores(queries[0])[0, [3, 7]], atol=0.02
+    )
+
+
+def test_unknown_dtype_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        EmbeddingMatrix([[1.0]], dtype="float64")
+
+
+def test_empty_matrix_needs_a_dimension() -> None:
+    with pytest.raises(ValueError, match="no vectors"):
+        EmbeddingMatrix([])
+    for dtype in ("float32", "int8"):
+        matrix = EmbeddingMatrix(np.empty((0, 3)), dtype=dtype)
+        assert len(matrix) == 0 and matrix.data.shape == (0, 3)
+        assert matrix.scores(np.ones(3)).shape == (1, 0)
+